@@ -0,0 +1,17 @@
+"""
+Benchmarks of the data and plot hot paths, run with airspeed velocity (https://asv.readthedocs.io).
+Nothing here needs a display: plotting is done on the Agg backend and no QApplication is created.
+
+Record baseline results for the current commit (stored under .asv/results):
+
+    asv run
+
+Compare a change against the baseline, failing if anything got more than 10% slower:
+
+    asv continuous master HEAD --factor 1.1
+
+Or against results already stored, eg. `asv compare <baseline commit> HEAD`. The synthetic netCDF
+files are generated on first use into $PYNTPG_BENCHMARK_DATA (by default a directory in the system
+temporary directory) and reused after, see benchmarks/fixtures.py. The largest ones (1e8 samples)
+take a few GB of disk, use eg. `asv run --bench "Read.*"` or `--quick` to limit what runs.
+"""
@@ -0,0 +1,23 @@
+""" Benchmarks of the calculations behind the analysis wizards. """
+import numpy as np
+
+from pyntpg.analysis.discrete_fourier_transform.discrete_fourier_transform import dft
+from pyntpg.analysis.spectrogram.spectrogram import compute_spectrogram
+
+FREQUENCY = 10.  # Hz
+
+
+class Analysis(object):
+    params = [10 ** 5, 10 ** 6, 10 ** 7]
+    param_names = ["n"]
+    timeout = 600
+
+    def setup(self, n):
+        self.values = np.sin(np.arange(n) * 2 * np.pi / 600.) + np.random.rand(n)
+
+    def time_dft(self, n):
+        dft(self.values, FREQUENCY)
+
+    def time_spectrogram(self, n):
+        compute_spectrogram(self.values, FREQUENCY, nperseg=256, noverlap=128, window="hann",
+                            scaling="density", detrend="constant")
@@ -0,0 +1,125 @@
+"""
+Benchmarks of opening and reading data. The picker widgets' get_data (DatetimePicker.get_data,
+FlatDatasetVarPicker.get_data) are thin wrappers around the axis_data functions timed here, which
+don't need a QApplication.
+"""
+import os
+import tempfile
+
+import netCDF4 as nc
+from ncagg.aggregator import Config, generate_aggregation_list, evaluate_aggregation_list
+
+from pyntpg.dataset_var_picker.axis_data import read_datetime, read_flat, resolve_lines
+from pyntpg.datasets_container import DatasetsContainer, netcdf_lock
+
+from .fixtures import timeseries, get_data_from, CHANNELS
+
+SIZES = [10 ** 5, 10 ** 6, 10 ** 7, 10 ** 8]
+
+
+class Open(object):
+    params = (SIZES, [False, True])
+    param_names = ["n", "chunked"]
+    timeout = 600
+
+    def setup(self, n, chunked):
+        self.path = timeseries(n, chunked=chunked)[0]
+        self.container = DatasetsContainer()
+
+    def time_open(self, n, chunked):
+        self.container.open("dataset", self.path)
+        self.container.wait(["dataset"])  # opened in the background
+
+    def teardown(self, n, chunked):
+        self.container.close("dataset")
+
+
+class Read(object):
+    params = (SIZES, [False, True], [False, True])
+    param_names = ["n", "masked", "chunked"]
+    timeout = 600
+
+    def setup(self, n, masked, chunked):
+        self.dataset = nc.Dataset(timeseries(n, masked=masked, chunked=chunked)[0])
+        self.get_data = get_data_from(self.dataset)
+
+    def teardown(self, n, masked, chunked):
+        self.dataset.close()
+
+    def time_read_flat(self, n, masked, chunked):
+        read_flat(self.get_data, "", "values", [[0, n]], [False])
+
+    def time_read_flat_2d(self, n, masked, chunked):
+        read_flat(self.get_data, "", "spectra", [[0, n // CHANNELS], [0, CHANNELS]], [False, False])
+
+    def time_read_flat_decimated(self, n, masked, chunked):
+        read_flat(self.get_data, "", "values", [[0, n]], [False], step=10)
+
+    def peakmem_read_flat(self, n, masked, chunked):
+        read_flat(self.get_data, "", "values", [[0, n]], [False])
+
+
+class ReadDatetime(object):
+    # datetimes are python objects, 1e8 of them doesn't fit in a workstation's memory.
+    params = (SIZES[:-1], [False, True])
+    param_names = ["n", "masked"]
+    timeout = 600
+
+    def setup(self, n, masked):
+        self.dataset = nc.Dataset(timeseries(n, masked=masked)[0])
+        self.get_data = get_data_from(self.dataset)
+        self.units = self.dataset.variables["time"].units
+
+    def teardown(self, n, masked):
+        self.dataset.close()
+
+    def time_read_datetime(self, n, masked):
+        read_datetime(self.get_data, "", "time", self.units, [[0, n]])
+
+    def peakmem_read_datetime(self, n, masked):
+        read_datetime(self.get_data, "", "time", self.units, [[0, n]])
+
+
+class ResolveLines(object):
+    """ Resolving lines from several files, read concurrently by resolve_lines. """
+    params = ([10 ** 5, 10 ** 6, 10 ** 7], [1, 4])
+    param_names = ["n", "nfiles"]
+    timeout = 600
+
+    def setup(self, n, nfiles):
+        self.datasets = {path: nc.Dataset(path) for path in timeseries(n, nfiles=nfiles)}
+
+    def teardown(self, n, nfiles):
+        for dataset in self.datasets.values():
+            dataset.close()
+
+    def get_data(self, dataset, variable, oslice=slice(None)):
+        # netCDF4 isn't thread safe, locked like Application.get_data
+        with netcdf_lock:
+            return self.datasets[dataset].variables[variable][oslice]
+
+    def time_resolve_lines(self, n, nfiles):
+        lines = [{
+            "xaxis": {"type": "datetime", "dataset": path, "variable": "time", "units": "seconds since 2000-01-01",
+                      "slices": [[0, None]]},
+            "yaxis": {"dataset": path, "variable": "values", "slices": [[0, None]], "flatten": [False]},
+        } for path in self.datasets]
+        resolve_lines(lines, self.get_data)
+
+
+class Aggregate(object):
+    params = ([10 ** 5, 10 ** 6, 10 ** 7], [2, 8])
+    param_names = ["n", "nfiles"]
+    timeout = 600
+
+    def setup(self, n, nfiles):
+        self.paths = timeseries(n, nfiles=nfiles)
+        _, self.output = tempfile.mkstemp()
+
+    def teardown(self, n, nfiles):
+        os.remove(self.output)
+
+    def time_aggregate(self, n, nfiles):
+        config = Config.from_nc(self.paths[0])
+        agg_list = generate_aggregation_list(config, self.paths)
+        evaluate_aggregation_list(config, agg_list, self.output)
@@ -0,0 +1,62 @@
+""" Benchmarks of plotting configured lines, on the Agg backend. """
+import matplotlib
+matplotlib.use("Agg")
+from matplotlib.backends.backend_agg import FigureCanvasAgg
+from matplotlib.figure import Figure
+
+import netCDF4 as nc
+
+from pyntpg.dataset_var_picker.axis_data import read_datetime, read_flat
+from pyntpg.plot_tabs.plot_widget import plot_lines
+
+from .fixtures import timeseries, get_data_from, CHANNELS
+
+
+class PlotLines(object):
+    # drawing 1e8 points takes minutes and several GB, already beyond what's usable interactively.
+    params = ([10 ** 5, 10 ** 6, 10 ** 7], ["index", "datetime"])
+    param_names = ["n", "xaxis"]
+    timeout = 600
+
+    def setup(self, n, xaxis):
+        with nc.Dataset(timeseries(n)[0]) as dataset:
+            get_data = get_data_from(dataset)
+            self.values = read_flat(get_data, "", "values", [[0, n]], [False])
+            self.spectra = read_flat(get_data, "", "spectra", [[0, n // CHANNELS], [0, CHANNELS]], [False, False])
+            if xaxis == "datetime":
+                units = dataset.variables["time"].units
+                self.x = read_datetime(get_data, "", "time", units, [[0, n]])
+                self.x_spectra = self.x[::CHANNELS][:n // CHANNELS]
+            else:
+                self.x = None
+        self.figure = Figure()
+        FigureCanvasAgg(self.figure)
+
+    def make_line(self, xaxis, xdata, ydata, **kwargs):
+        line = {
+            "xaxis": {"type": xaxis, "data": xdata if xdata is not None else range(len(ydata))},
+            "yaxis": {"variable": "values", "units": "counts", "data": ydata},
+            "color": "#1f77b4", "linestyle": "-", "marker": "", "label": "values",
+        }
+        line.update(kwargs)
+        return line
+
+    def time_plot_lines(self, n, xaxis):
+        ax = self.figure.add_subplot(111)
+        plot_lines(ax, [self.make_line(xaxis, self.x, self.values)])
+        self.figure.canvas.draw()
+        self.figure.clear()
+
+    def time_plot_lines_2d(self, n, xaxis):
+        ax = self.figure.add_subplot(111)
+        x = self.x_spectra if xaxis == "datetime" else None
+        plot_lines(ax, [self.make_line(xaxis, x, self.spectra)])
+        self.figure.canvas.draw()
+        self.figure.clear()
+
+    def time_plot_lines_heatmap(self, n, xaxis):
+        ax = self.figure.add_subplot(111)
+        x = self.x_spectra if xaxis == "datetime" else None
+        plot_lines(ax, [self.make_line(xaxis, x, self.spectra, **{"render-mode": "heatmap"})])
+        self.figure.canvas.draw()
+        self.figure.clear()
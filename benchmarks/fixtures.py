@@ -0,0 +1,89 @@
+"""
+Synthetic netCDF time series for the benchmarks. Each file has an unlimited (or, if not chunked,
+fixed size) time dimension, and:
+
+- time(time): double, "seconds since 2000-01-01", 10 Hz, optionally with every MASK_EVERY'th value fill
+- values(time): float32
+- spectra(time/CHANNELS, channel): float32, same number of values in total as values
+"""
+import os
+import tempfile
+
+import netCDF4 as nc
+import numpy as np
+
+from pyntpg.datasets_container import netcdf_lock
+
+FIXTURE_DIR = os.environ.get("PYNTPG_BENCHMARK_DATA", os.path.join(tempfile.gettempdir(), "pyntpg_benchmarks"))
+
+TIME_UNITS = "seconds since 2000-01-01"
+CADENCE = 0.1  # seconds between samples
+MASK_EVERY = 1000
+CHANNELS = 16
+WRITE_BLOCK = 10 ** 6  # samples written at once, to bound memory making the big files
+CHUNK_SIZE = 2 ** 16
+
+
+def make_timeseries(path, n, masked=False, chunked=True, offset=0):
+    """
+    Write a synthetic time series file.
+
+    :param path: file to write
+    :param n: number of samples
+    :param masked: if True, every MASK_EVERY'th time is fill
+    :param chunked: if True, time is unlimited and chunked, otherwise fixed size and contiguous
+    :param offset: index of first sample, to make consecutive files for aggregation
+    :return: path
+    """
+    with nc.Dataset(path, "w") as dataset:
+        dataset.createDimension("time", None if chunked else n)
+        dataset.createDimension("spectra_time", None if chunked else n // CHANNELS)
+        dataset.createDimension("channel", CHANNELS)
+        storage = {"chunksizes": (CHUNK_SIZE,)} if chunked else {"contiguous": True}
+        time = dataset.createVariable("time", "f8", ("time",), fill_value=-1., **storage)
+        time.units = TIME_UNITS
+        values = dataset.createVariable("values", "f4", ("time",), **storage)
+        values.units = "counts"
+        spectra_storage = {"chunksizes": (CHUNK_SIZE // CHANNELS, CHANNELS)} if chunked else {"contiguous": True}
+        spectra = dataset.createVariable("spectra", "f4", ("spectra_time", "channel"), **spectra_storage)
+
+        for start in range(0, n, WRITE_BLOCK):
+            stop = min(start + WRITE_BLOCK, n)
+            index = np.arange(offset + start, offset + stop)
+            times = index * CADENCE
+            if masked:
+                times[index % MASK_EVERY == 0] = -1.
+            time[start:stop] = times
+            values[start:stop] = np.sin(index * 2 * np.pi / 600.).astype("f4")
+            spectra[start // CHANNELS:stop // CHANNELS] = np.random.rand(stop // CHANNELS - start // CHANNELS,
+                                                                         CHANNELS).astype("f4")
+    return path
+
+
+def timeseries(n, masked=False, chunked=True, nfiles=1):
+    """
+    Get paths to a synthetic time series of n samples split over nfiles consecutive files,
+    generating them if they don't exist yet.
+
+    :return: list of paths
+    """
+    if not os.path.isdir(FIXTURE_DIR):
+        os.makedirs(FIXTURE_DIR)
+    per_file = n // nfiles
+    paths = []
+    for i in range(nfiles):
+        path = os.path.join(FIXTURE_DIR, "timeseries_n{}_{}_{}_{}of{}.nc".format(
+            n, "masked" if masked else "unmasked", "chunked" if chunked else "contiguous", i + 1, nfiles))
+        if not os.path.exists(path):
+            make_timeseries(path + ".tmp", per_file, masked, chunked, offset=i * per_file)
+            os.rename(path + ".tmp", path)
+        paths.append(path)
+    return paths
+
+
+def get_data_from(dataset):
+    """ A get_data function (see pyntpg.dataset_var_picker.axis_data) reading from an open netCDF4.Dataset. """
+    def get_data(_, variable, oslice=slice(None)):
+        with netcdf_lock:  # like Application.get_data
+            return dataset.variables[variable][oslice]
+    return get_data
@@ -1,10 +1,28 @@
-from pyntpg.analysis.discrete_fourier_transform.discrete_fourier_transform import DiscreteFourierTransform
-from pyntpg.analysis.spectrogram.spectrogram import Spectrogram
+from collections import OrderedDict
+from importlib import import_module
 
 """
-List the Wizards here.
+List the Wizards here, by name and the module they're defined in. They're only imported
+when used (see load_wizard), since they pull in eg. scipy which is slow to import.
 DO NOT list ipython_console. It is taken care of and inserted
 into the analysis menu separately in main.py.
 """
 
-__all__ = ["DiscreteFourierTransform", "Spectrogram"]
+WIZARDS = OrderedDict([
+    ("DiscreteFourierTransform", "pyntpg.analysis.discrete_fourier_transform.discrete_fourier_transform"),
+    ("Spectrogram", "pyntpg.analysis.spectrogram.spectrogram"),
+])
+
+__all__ = list(WIZARDS.keys())
+
+
+def load_wizard(name):
+    """ Import and return the wizard class called name, one of WIZARDS. """
+    return getattr(import_module(WIZARDS[name]), name)
+
+
+def __getattr__(name):
+    # keep eg. `from pyntpg.analysis import Spectrogram` working, importing on first access.
+    if name in WIZARDS:
+        return load_wizard(name)
+    raise AttributeError("module {!r} has no attribute {!r}".format(__name__, name))
@@ -0,0 +1,57 @@
+import numpy as np
+from PyQt5.QtCore import QCoreApplication, QObject, pyqtSignal
+
+from pyntpg import memory_ledger
+
+
+class ConsoleProxy(QObject):
+    """
+    Stands in for the IPythonConsole until it's actually needed. Importing IPython and qtconsole
+    and starting the in process kernel is most of the startup time otherwise, so the console is
+    only created the first time it's shown (or a variable from it is requested). Until then, there
+    simply aren't any console variables to plot.
+
+    Provides the parts of the IPythonConsole interface the rest of the application uses.
+    """
+    sig_newvar = pyqtSignal(str)
+    sig_delvar = pyqtSignal(str)
+
+    def __init__(self):
+        super(ConsoleProxy, self).__init__()
+        self.console = None  # the IPythonConsole, once created
+        memory_ledger.add_source("IPython console", self.get_vars_nbytes)
+
+    def get_console(self):
+        """ Get the IPythonConsole, creating it if this is the first time.
+        :return: IPythonConsole
+        """
+        if self.console is None:
+            from pyntpg.analysis.ipython_console import IPythonConsole
+            self.console = IPythonConsole()
+            self.console.sig_newvar.connect(self.sig_newvar)
+            self.console.sig_delvar.connect(self.sig_delvar)
+            # the console only pushes datasets opened after it's created, so catch it up.
+            for name in QCoreApplication.instance().datasets.list_datasets():
+                self.console.add_dataset(name)
+        return self.console
+
+    def show(self):
+        self.get_console().show()
+
+    def raise_(self):
+        self.get_console().raise_()
+
+    def get_plot_vars(self):
+        if self.console is None:
+            return []
+        return self.console.get_plot_vars()
+
+    def get_var_value(self, k):
+        return self.get_console().get_var_value(k)
+
+    def get_vars_nbytes(self):
+        """ Get the bytes held by each of the plottable console variables, see pyntpg.memory_ledger. """
+        if self.console is None:
+            return {}
+        return {k: memory_ledger.data_nbytes(np.asarray(self.console.get_var_value(k)))
+                for k in self.console.get_plot_vars()}
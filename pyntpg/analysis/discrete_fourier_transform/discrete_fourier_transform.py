@@ -31,11 +31,20 @@ class DiscreteFourierTransform(QWizard):
         """
         frequency, oslice = self.choose_params_pg1.choose_frequency.get_frequency_and_slice()
         values = self.choose_params_pg1.choose_signal.get_data(oslice)
-        xf = fftfreq(len(values), d=frequency**-1)  # note inverse to get sample spacing
-        positive_index = np.where(xf > 0)
-        freqs = xf[positive_index]
-        yf = np.abs(fft(values)[positive_index])
-        return freqs, yf
+        return dft(values, frequency)
+
+
+def dft(values, frequency):
+    """ The discrete fourier decomposition of values sampled at frequency.
+    :param values: 1D array of signal values
+    :param frequency: sampling frequency of values
+    :return: positive freqs, and fourier coeffs (norm)
+    """
+    xf = fftfreq(len(values), d=frequency**-1)  # note inverse to get sample spacing
+    positive_index = np.where(xf > 0)
+    freqs = xf[positive_index]
+    yf = np.abs(fft(values)[positive_index])
+    return freqs, yf
 
 
 class ChooseParameters(QWizardPage, object):
@@ -9,10 +9,16 @@ class SignalPicker(FlatDatasetVarPicker):
 
     def __init__(self):
         super(SignalPicker, self).__init__(title="Select signal")
+        self.sig_anticipated_length.connect(self.emit_y_picked)
 
-    def emit_y_picked(self):
+    def emit_y_picked(self, _=None):
+        """ Emit y_picked for the signal selected. The length comes from the shape of the variable and
+        the slices selected (see FlatDatasetVarPicker.accept_slice_selection), nothing is read.
+        """
+        if self.anticipated_length is None:
+            return  # no signal selected yet
         self.y_picked.emit(
-            len(self.get_data()),
-            self.slices(),
+            self.anticipated_length,
+            self.slices,
             str(self.dataset_widget.currentText())
         )
@@ -102,6 +102,7 @@ class IPythonConsole(RichJupyterWidget):
         self.datasets = QCoreApplication.instance().datasets  # type: DatasetsContainer
         # On new dict, push to console
         self.datasets.sig_opened.connect(self.add_dataset)
+        self.datasets.sig_refreshed.connect(self.add_dataset)
         self.datasets.sig_closed.connect(self.rm_dataset)
         self.datasets.sig_rename.connect(self.rename_dataset)
 
@@ -20,12 +20,19 @@ class Spectrogram(QWizard):
         self.button(QWizard.NextButton).clicked.connect(lambda _: self.page2.do_calculation(self.calculate))
 
     def calculate(self):
-        from scipy.signal import spectrogram
         frequency, oslice = self.page1.choose_frequency.get_frequency_and_slice()
         args = self.page1.get_arguments_for_spectrogram()
         values = self.page1.choose_signal.get_data(oslice)
-        f, t, Sxx = spectrogram(values, frequency, **args)
-        return t, f, Sxx
+        return compute_spectrogram(values, frequency, **args)
+
+
+def compute_spectrogram(values, frequency, **args):
+    """ The spectrogram of values sampled at frequency, see scipy.signal.spectrogram for args.
+    :return: times, frequencies, and spectrogram
+    """
+    from scipy.signal import spectrogram
+    f, t, Sxx = spectrogram(values, frequency, **args)
+    return t, f, Sxx
 
 
 class ChooseSpectroParameters(ChooseParameters):
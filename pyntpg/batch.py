@@ -0,0 +1,193 @@
+"""
+Headless batch plotting. Draws a saved plot tab config for each of a list of file sets and saves the
+figures, without starting the GUI, eg. to make daily quicklooks:
+
+    pyntpg-batch tab_config.json filesets.json [-j PROCESSES] [--dpi DPI] [--size WIDTHxHEIGHT]
+
+The tab config is described in pyntpg.plot_tabs.tab_config. filesets.json is a list of file sets like:
+
+    [
+        {
+            "output": "quicklook_20200101.png",
+            "datasets": {"dataset": ["file1.nc", "file2.nc"]},
+            "start": "2020-01-01T00:00:00",
+            "end": "2020-01-02T00:00:00"
+        },
+        ...
+    ]
+
+Datasets not listed in a file set are taken from the tab config, and multiple files for a dataset are
+aggregated with ncagg, keeping only the variables the tab config uses (see tab_config.used_variables).
+The files of each set usually don't have the same number of records as the ones the tab was configured
+with, so the whole first dimension of each variable is plotted, masked to the optional "start" and "end"
+of the file set instead of the datetime bounds from the tab config.
+
+File sets are drawn in parallel, each in its own process, with the Agg backend.
+"""
+import argparse
+import copy
+import json
+import os
+import sys
+import traceback
+from datetime import datetime
+from multiprocessing import Pool
+
+import matplotlib
+matplotlib.use("Agg")
+from matplotlib.backends.backend_agg import FigureCanvasAgg
+from matplotlib.figure import Figure
+
+import netCDF4 as nc
+from ncagg.aggregator import Config, generate_aggregation_list, evaluate_aggregation_list
+
+from pyntpg.dataset_var_picker.axis_data import resolve_lines
+from pyntpg.dataset_tabs.aggregation_config import subset_config, estimate_nbytes, make_target
+from pyntpg.datasets_container import netcdf_lock
+from pyntpg.plot_tabs.plot_widget import draw_panels
+from pyntpg.plot_tabs.tab_config import load_tab_config, get_panel, used_variables
+
+DEFAULT_SIZE = (16, 9)  # inches
+DEFAULT_DPI = 100
+
+
+def open_datasets(datasets, variables=None):
+    """
+    Open each dataset from its files, aggregating them if more than one.
+
+    :param datasets: dict {name: [files]}
+    :param variables: optional dict {name: [variables]}, only aggregate these variables of a dataset
+    :return: dict {name: netCDF4.Dataset}, list of temporary files made by aggregating. If a dataset
+        can't be opened, the ones already opened are closed and their temporary files removed.
+    """
+    opened = {}
+    temporary = []
+    complete = False
+    try:
+        for name, files in datasets.items():
+            if len(files) > 1:
+                config = Config.from_nc(files[0])
+                if variables and variables.get(name):
+                    config = subset_config(config, variables[name])
+                agg_list = generate_aggregation_list(config, files)
+                path = make_target(estimate_nbytes(config, agg_list))
+                temporary.append(path)
+                evaluate_aggregation_list(config, agg_list, path)
+            else:
+                path = files[0]
+            opened[name] = nc.Dataset(path)
+        complete = True
+    finally:
+        if not complete:
+            close_datasets(opened, temporary)
+    return opened, temporary
+
+
+def close_datasets(opened, temporary):
+    """ Close the datasets from open_datasets and remove its temporary files. """
+    for dataset in opened.values():
+        dataset.close()
+    for path in temporary:
+        if os.path.exists(path):
+            os.remove(path)
+
+
+def for_fileset(lines, start=None, end=None):
+    """
+    Adapt the line configs of the tab config to plot the whole first dimension of the files in a
+    file set, between start and end.
+
+    :param lines: list of line configs, not modified
+    :param start: optional datetime lower bound for datetime axes
+    :param end: optional datetime upper bound for datetime axes
+    :return: list of adapted line configs
+    """
+    lines = copy.deepcopy(lines)
+    for line in lines:
+        for axis in (line["xaxis"], line["yaxis"]):
+            if axis.get("slices"):
+                axis["slices"][0] = [0, None]
+            if axis.get("type") == "index":
+                axis["length"] = None
+            elif axis.get("type") == "datetime":
+                axis["start"] = start
+                axis["end"] = end
+    return lines
+
+
+def render_fileset(job):
+    """
+    Draw the tab config for one file set and save it. Runs in a worker process.
+
+    :param job: tuple of (tab config, file set, figure size, dpi)
+    :return: tuple of output path, and list of error messages
+    """
+    tab_config, fileset, size, dpi = job
+    output = fileset["output"]
+    datasets = dict(tab_config.get("datasets", {}), **fileset.get("datasets", {}))
+    start, end = [datetime.fromisoformat(fileset[key]) if fileset.get(key) else None for key in ("start", "end")]
+
+    try:
+        opened, temporary = open_datasets(datasets, used_variables(tab_config))
+    except Exception as e:
+        return output, ["Problem opening datasets: {}".format(repr(e))]
+
+    def get_data(dataset, variable, oslice=slice(None)):
+        with netcdf_lock:
+            return opened[dataset].variables[variable][oslice]
+
+    try:
+        specs = tab_config["layout"]
+        num_panels = sum(len(row) for row in specs["width_ratios"])
+        panel_lines = [for_fileset(get_panel(tab_config, npanel), start, end) for npanel in range(num_panels)]
+        resolve_lines([line for lines in panel_lines for line in lines], get_data)
+
+        figure = Figure(figsize=size, dpi=dpi, tight_layout=True)
+        FigureCanvasAgg(figure)
+        _, errors = draw_panels(figure, specs, panel_lines)
+        figure.savefig(output)
+        return output, ["Problem with panel {}: {}".format(npanel, repr(e)) for npanel, e in errors.items()]
+    except Exception:
+        return output, [traceback.format_exc()]
+    finally:
+        close_datasets(opened, temporary)
+
+
+def parse_size(size):
+    """ argparse type for "WIDTHxHEIGHT" figure sizes, in inches. """
+    try:
+        width, height = size.lower().split("x")
+        return float(width), float(height)
+    except ValueError:
+        raise argparse.ArgumentTypeError("size must be like WIDTHxHEIGHT, got {}".format(size))
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Draw a pyntpg tab config for each of a list of file sets.")
+    parser.add_argument("tab_config", help="tab config JSON, see pyntpg.plot_tabs.tab_config")
+    parser.add_argument("filesets", help="JSON list of file sets to draw, see pyntpg.batch")
+    parser.add_argument("-j", "--processes", type=int, default=None,
+                        help="number of file sets to draw in parallel, default number of cpus")
+    parser.add_argument("--dpi", type=float, default=DEFAULT_DPI)
+    parser.add_argument("--size", type=parse_size, default=DEFAULT_SIZE, help="WIDTHxHEIGHT in inches")
+    args = parser.parse_args()
+
+    with open(args.tab_config) as f:
+        tab_config = load_tab_config(f)
+    with open(args.filesets) as f:
+        filesets = json.load(f)
+
+    failed = 0
+    jobs = [(tab_config, fileset, args.size, args.dpi) for fileset in filesets]
+    with Pool(args.processes) as pool:
+        for output, errors in pool.imap_unordered(render_fileset, jobs):
+            print(output)
+            for error in errors:
+                print("  {}".format(error), file=sys.stderr)
+            failed += bool(errors)
+
+    sys.exit(1 if failed else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,204 @@
+"""
+Shaping the ncagg config an aggregation is made with, so that less is read from the files and
+written to the aggregated file than the whole of every file, laid out for how it's read back,
+picking where the aggregated file goes (see make_target), and making it (see aggregate_files).
+
+Config.from_nc makes a config copying every dimension and variable of the first file, chunked as in
+that file. The functions here take and return ncagg Configs, going through Config.to_dict/from_dict
+so that the result is validated by ncagg like any other config.
+"""
+import logging
+import os
+import shutil
+from collections import OrderedDict
+from tempfile import mkstemp
+
+import numpy as np
+from ncagg.aggregator import Config, generate_aggregation_list, evaluate_aggregation_list
+
+from pyntpg.dataset_tabs import time_coverage
+
+logger = logging.getLogger(__name__)
+
+# layouts of the aggregated file to pick from: name -> size of chunks in bytes, see chunk_config, or
+# None to keep the chunking of the files
+CHUNK_PROFILES = OrderedDict([
+    ("fast read", 4 * 1024 ** 2),
+    ("as input", None),
+])
+
+# aggregations expected to be smaller than MEMORY_THRESHOLD are made in MEMORY_DIR, a tmpfs on linux,
+# ie. in memory, rather than the default temporary directory, possibly on a slow or shared disk. As
+# long as they take at most MEMORY_SHARE of the room left there.
+MEMORY_DIR = "/dev/shm"
+MEMORY_THRESHOLD = 512 * 1024 ** 2
+MEMORY_SHARE = 0.5
+
+
+def subset_config(config, variables):
+    """
+    Trim an aggregation config to variables, along with the variables they need to make sense: the
+    coordinate variables of their dimensions, the variables listed in their "coordinates" attribute
+    and the variables their dimensions are indexed by. Dimensions no variable uses any more are
+    dropped too, ncagg refuses configs with unused dimensions.
+
+    :param config: ncagg Config, eg. from Config.from_nc
+    :param variables: list of names of the variables of interest
+    :return: the trimmed ncagg Config
+    :raises ValueError: if none of variables are in config
+    """
+    config = config.to_dict()
+    by_name = {variable["name"]: variable for variable in config["variables"]}
+    dimensions = {dimension["name"]: dimension for dimension in config["dimensions"]}
+    missing = [name for name in variables if name not in by_name]
+    if len(missing) == len(variables):
+        raise ValueError("None of the variables %s are in the files" % ", ".join(variables))
+    elif missing:
+        logger.warning("Variables %s aren't in the files, ignoring them", ", ".join(missing))
+
+    keep = set(variables) - set(missing)
+    while True:
+        used = set(dim for name in keep for dim in by_name[name]["dimensions"])
+        needed = set(dim for dim in used if dim in by_name)
+        needed.update(dimensions[dim]["index_by"] for dim in used if dimensions[dim]["index_by"] is not None)
+        for name in keep:
+            needed.update(c for c in str(by_name[name]["attributes"].get("coordinates", "")).split() if c in by_name)
+        if needed.issubset(keep):
+            break
+        keep.update(needed)
+
+    config["variables"] = [variable for variable in config["variables"] if variable["name"] in keep]
+    config["dimensions"] = [dimension for dimension in config["dimensions"] if dimension["name"] in used]
+    for dimension in config["dimensions"]:
+        dimension["other_dim_inds"] = {k: v for k, v in dimension["other_dim_inds"].items() if k in used}
+    return Config.from_dict(config)
+
+
+def chunk_config(config, aggregation_list, chunk_bytes):
+    """
+    Chunk the variables along the unlimited dimension the way they're read back, ie. in time
+    slices of whole records (see pyntpg.dataset_var_picker.axis_data): chunks of about chunk_bytes
+    spanning the whole of the other dimensions, rather than the chunking copied from the first file,
+    often a record or so per chunk. Chunks aren't made longer than the records aggregated.
+
+    ncagg always compresses with zlib, so the chunking is all that can be picked.
+
+    :param config: ncagg Config
+    :param aggregation_list: list of ncagg nodes, from generate_aggregation_list
+    :param chunk_bytes: integer size of a chunk, uncompressed
+    :return: the rechunked ncagg Config
+    """
+    records = count_records(config, aggregation_list)
+    config = config.to_dict()
+    sizes = {dimension["name"]: dimension["size"] for dimension in config["dimensions"]}
+    for variable in config["variables"]:
+        unlimited = [dim for dim in variable["dimensions"] if dim in records]
+        dtype = np.dtype(variable["datatype"])
+        if len(unlimited) != 1 or dtype.itemsize == 0 or np.issubdtype(dtype, np.str_):
+            continue  # eg. string variables, or nothing to chunk along
+        record_bytes = dtype.itemsize * int(np.prod([sizes[dim] for dim in variable["dimensions"] if dim not in records]))
+        length = max(1, min(records[unlimited[0]], chunk_bytes // record_bytes))
+        variable["chunksizes"] = [length if dim in records else sizes[dim] for dim in variable["dimensions"]]
+    return Config.from_dict(config)
+
+
+def count_records(config, aggregation_list):
+    """
+    Count the records along each unlimited dimension an aggregation list makes.
+
+    :param config: ncagg Config
+    :param aggregation_list: list of ncagg nodes, from generate_aggregation_list
+    :return: dict of unlimited dimension name to number of records
+    """
+    return {name: sum(max(0, node.get_size_along(dimension)) for node in aggregation_list)
+            for name, dimension in config.dims.items() if dimension["size"] is None}
+
+
+def estimate_nbytes(config, aggregation_list):
+    """
+    Estimate the size of an aggregated file, uncompressed, so at most what it takes on disk. String
+    variables are counted a byte a value.
+
+    :param config: ncagg Config
+    :param aggregation_list: list of ncagg nodes, from generate_aggregation_list
+    :return: integer number of bytes
+    """
+    sizes = dict((name, dimension["size"]) for name, dimension in config.dims.items())
+    sizes.update(count_records(config, aggregation_list))
+    return sum(max(1, np.dtype(variable["datatype"]).itemsize)
+               * int(np.prod([sizes[dim] for dim in variable["dimensions"]]))
+               for variable in config.vars.values())
+
+
+def make_target(nbytes):
+    """
+    Make the file to aggregate to, in memory (MEMORY_DIR) if it's expected to be small enough and
+    there's room, otherwise in the default temporary directory.
+
+    :param nbytes: estimated size of the aggregated file, see estimate_nbytes
+    :return: path to the new empty file
+    """
+    directory = None
+    if nbytes <= MEMORY_THRESHOLD and os.path.isdir(MEMORY_DIR):
+        try:
+            if nbytes <= shutil.disk_usage(MEMORY_DIR).free * MEMORY_SHARE:
+                directory = MEMORY_DIR
+        except OSError:
+            pass  # can't tell how much room is left, use the disk
+    handle, path = mkstemp(prefix="pyntpg_", suffix=".nc", dir=directory)
+    os.close(handle)
+    return path
+
+
+def aggregate_files(filenames, messages, window=None, variables=None, chunk_bytes=None):
+    """
+    Aggregate files to a new file from make_target, meant to be run in a process of its own (see
+    pyntpg.dataset_tabs.dataset_tab.AggregationWorker): ncagg reads and writes netCDF throughout, and
+    the netCDF library can't be called from several threads at once, see netcdf_lock.
+
+    Progress is reported by putting (kind, value) tuples on messages:
+
+    - ("files", n): number of files with records in window, once they're trimmed to it
+    - ("target", path): the file being aggregated to
+    - ("progress", n): n files aggregated so far
+    - ("done", path) or ("error", message): how it ended, always the last message
+
+    :param filenames: list of paths of the files to aggregate
+    :param messages: queue to report progress on, eg. a multiprocessing Queue
+    :param window: optional (start, end) datetimes, only aggregate the records in between
+    :param variables: optional list of names, only aggregate these variables, see subset_config
+    :param chunk_bytes: optional size of chunks, see chunk_config, otherwise as in the files
+    :return: None
+    """
+    path = None
+    try:
+        config = Config.from_nc(filenames[0])
+        if variables:
+            try:
+                config = subset_config(config, variables)
+            except ValueError as e:
+                messages.put(("error", str(e)))
+                return
+        agg_list = generate_aggregation_list(config, filenames)
+        if window is not None:
+            agg_list = time_coverage.trim_records(agg_list, *window)
+            if not agg_list:
+                messages.put(("error", "No records between %s and %s" % window))
+                return
+            messages.put(("files", len(agg_list)))
+        if chunk_bytes:
+            config = chunk_config(config, agg_list, chunk_bytes)
+        path = make_target(estimate_nbytes(config, agg_list))
+        messages.put(("target", path))
+        progress = [0]
+
+        def callback():
+            progress[0] += 1
+            messages.put(("progress", progress[0]))
+        evaluate_aggregation_list(config, agg_list, path, callback=callback)
+        messages.put(("done", path))
+    except Exception as e:
+        logger.exception("Aggregation failed")
+        if path is not None and os.path.exists(path):
+            os.remove(path)
+        messages.put(("error", "Aggregation failed: %r" % e))
@@ -1,14 +1,18 @@
 import logging
+import multiprocessing
 import os
-from tempfile import mkstemp
+import queue
+import re
 
 from PyQt5.Qt import Qt
 from PyQt5.QtCore import pyqtSignal, pyqtSlot, QThread, QObject, QMetaObject, QMutex
-from PyQt5.QtWidgets import QWidget, QGridLayout
-from ncagg.aggregator import Config, generate_aggregation_list, evaluate_aggregation_list
+from PyQt5.QtWidgets import QWidget, QGridLayout, QCheckBox, QDateTimeEdit, QLabel, QLineEdit, QComboBox
 
+from pyntpg.dataset_tabs import time_coverage
+from pyntpg.dataset_tabs.aggregation_config import aggregate_files, CHUNK_PROFILES
 from pyntpg.dataset_tabs.file_picker import FilePicker
 from pyntpg.dataset_tabs.ncinfo_preview import NcinfoPreview
+from pyntpg.horizontal_pair import HorizontalPair
 
 logger = logging.getLogger(__name__)
 
@@ -37,14 +41,82 @@ class DatasetTab(QWidget):
         self.layout.addWidget(self.filepicker, 0, 0)
 
         self.preview = NcinfoPreview()
-        self.dataset_ready.connect(self.preview.update)
         self.layout.addWidget(self.preview, 0, 1)
 
+        # only aggregate the records of a time window, see pyntpg.dataset_tabs.time_coverage
+        self.pick_window = QCheckBox("Only times between")
+        self.pick_window.setToolTip("aggregate only the records in the window, from the files whose times "
+                                    "overlap it, the times of each file are scanned once and remembered")
+        self.window_start = QDateTimeEdit()
+        self.window_start.setDisplayFormat("yyyy-MM-dd hh:mm:ss")
+        self.window_start.setCalendarPopup(True)
+        self.window_end = QDateTimeEdit()
+        self.window_end.setDisplayFormat("yyyy-MM-dd hh:mm:ss")
+        self.window_end.setCalendarPopup(True)
+        self.pick_window.toggled.connect(self.options_changed)
+        self.window_start.editingFinished.connect(self.options_changed)
+        self.window_end.editingFinished.connect(self.options_changed)
+        window = HorizontalPair(self.pick_window, self.window_start, QLabel("and"), self.window_end)
+        window.layout.setContentsMargins(0, 0, 0, 0)
+        self.layout.addWidget(window, 1, 0, 1, 2)
+
+        # only aggregate some of the variables, see pyntpg.dataset_tabs.aggregation_config.subset_config
+        self.variables = QLineEdit()
+        self.variables.setPlaceholderText("all variables")
+        self.variables.setToolTip("aggregate only these variables, separated by commas or spaces, "
+                                  "and the coordinates they need")
+        self.variables.editingFinished.connect(self.options_changed)
+        # and how to lay out the aggregated file, see pyntpg.dataset_tabs.aggregation_config.chunk_config
+        self.profile = QComboBox()
+        self.profile.addItems(list(CHUNK_PROFILES.keys()))
+        self.profile.setToolTip("chunking of the aggregated file, fast read: chunks of whole records "
+                                "matching how they're read for plotting, as input: as in the files")
+        self.profile.currentIndexChanged.connect(self.options_changed)
+        variables = HorizontalPair(QLabel("Only variables"), self.variables, QLabel("Layout"), self.profile)
+        variables.layout.setContentsMargins(0, 0, 0, 0)
+        self.layout.addWidget(variables, 2, 0, 1, 2)
+        self.options = None  # (window, variables, chunk size) the files were last aggregated with
+        self.aggregated = None  # path to the file the files were last aggregated to, removed once replaced
+
         self.worker = None
         self.worker_mutex = QMutex()
         self.worker_thread = QThread()  # hold a thread to aggregation selected files if necessary
         self.worker_err = None
 
+    def get_window(self):
+        """ The time window to aggregate the records of, if one is picked.
+        :return: tuple of start and end datetimes, or None
+        """
+        if not self.pick_window.isChecked():
+            return None
+        return self.window_start.dateTime().toPyDateTime(), self.window_end.dateTime().toPyDateTime()
+
+    def get_variables(self):
+        """ The variables to aggregate, if only some are.
+        :return: list of variable names, or None for all of them
+        """
+        names = [name for name in re.split(r"[\s,]+", str(self.variables.text())) if name]
+        return names or None
+
+    def set_variables(self, variables):
+        """ Set the variables to aggregate, without aggregating the files again.
+        :param variables: list of variable names, or None for all of them
+        :return: None
+        """
+        self.variables.setText(", ".join(variables or []))
+
+    def get_options(self):
+        """ The options to aggregate the files with.
+        :return: tuple of the time window, variables and chunk size, see AggregationWorker
+        """
+        return self.get_window(), self.get_variables(), CHUNK_PROFILES[str(self.profile.currentText())]
+
+    def options_changed(self):
+        """ Aggregate the files again when the time window, variables or layout change, if there are
+        files to aggregate. """
+        if len(self.filepicker.get_file_list()) > 1 and self.options != self.get_options():
+            self.handle_files_selected(self.filepicker.get_file_list())
+
     @pyqtSlot(list)
     def handle_files_selected(self, filelist):
         """ Executed only for side effect, this function is intended to be a slot connected
@@ -58,12 +130,14 @@ class DatasetTab(QWidget):
             # also reconnect finished to discard --> minimize dangling temp files
             self.worker_mutex.lock()
             try:
-                self.worker.sig_finished.disconnect(self.dataset_ready)  # raises type error if already disconnected
+                self.worker.sig_finished.disconnect(self.aggregation_ready)  # raises type error if already disconnected
                 self.worker.sig_finished.connect(self.discard_aggregation)  # won't need to reconnect if already discon
             except TypeError:
                 pass
             try:
                 self.worker.sig_progress.disconnect(self.preview.progress.setValue)
+                self.worker.sig_files.disconnect(self.preview.show_progress)
+                self.worker.sig_error.disconnect(self.aggregation_error)
             except TypeError:
                 pass
             self.worker_mutex.unlock()
@@ -79,12 +153,13 @@ class DatasetTab(QWidget):
             #     self.worker_thread.wait()
 
             # initialize the worker, connect progress and finished signals
-            self.preview.show_progress(0)
-            _, to_filename = mkstemp()  # returns (os.open() handle, and abs path to file) tuple
             self.preview.show_progress(len(filelist))
-            self.worker = AggregationWorker(filelist, to_filename, self.worker_mutex)
-            self.worker.sig_finished.connect(self.dataset_ready)  # dataset ready, pass that signal through!
+            self.options = self.get_options()
+            self.worker = AggregationWorker(filelist, self.worker_mutex, *self.options)
+            self.worker.sig_finished.connect(self.aggregation_ready)  # dataset ready, pass that signal through!
             self.worker.sig_progress.connect(self.preview.progress.setValue)
+            self.worker.sig_files.connect(self.preview.show_progress)
+            self.worker.sig_error.connect(self.aggregation_error)
 
             # finally, move worker to thread and start it.
             self.worker.moveToThread(self.worker_thread)
@@ -93,9 +168,57 @@ class DatasetTab(QWidget):
 
         elif isinstance(filelist, list) and len(filelist) == 1:
             self.dataset_ready.emit(filelist[0])
+            self.drop_aggregated()
         else:
             # fixes crash on remove last datafile -- DO NOT emit None through pyqtSignal
             self.dataset_ready.emit("")
+            self.drop_aggregated()
+
+    def defer_files(self, filelist):
+        """ Show filelist as the files of this dataset, but don't open them until open_files
+        is called, eg. through DatasetsContainer.require.
+        :param filelist: An array of strings filenames of netcdf files
+        :return: None
+        """
+        self.filepicker.set_file_list(filelist)
+
+    def open_files(self):
+        """ Open the files listed right away, blocking until they are aggregated if necessary,
+        for when the dataset is needed now.
+        :return: None
+        """
+        filelist = self.filepicker.get_file_list()
+        if len(filelist) > 1:
+            self.options = self.get_options()
+            worker = AggregationWorker(filelist, self.worker_mutex, *self.options)
+            worker.sig_finished.connect(self.aggregation_ready)
+            worker.sig_error.connect(self.aggregation_error)
+            worker.start_aggregation()
+        else:
+            self.handle_files_selected(filelist)
+
+    @pyqtSlot(str, str)
+    def aggregation_error(self, filename, message):
+        self.preview.show_message("%s %s" % (filename, message) if filename else message)
+
+    @pyqtSlot(str)
+    def aggregation_ready(self, path):
+        """ Pass on the file the files were aggregated to, and remove the one it replaces.
+        :param path: path to the aggregated file
+        :return: None
+        """
+        self.dataset_ready.emit(path)
+        self.drop_aggregated()
+        self.aggregated = path
+
+    def drop_aggregated(self):
+        """ Remove the file the files were last aggregated to, if any, eg. once it's been replaced or
+        the tab is closed. The dataset opened from it stays readable until it's closed.
+        :return: None
+        """
+        if self.aggregated is not None:
+            self.discard_aggregation(self.aggregated)
+            self.aggregated = None
 
     @pyqtSlot(str)
     def discard_aggregation(self, result):
@@ -106,35 +229,91 @@ class DatasetTab(QWidget):
         
         :param result: filename of an aggregation to disregard.
         """
-        if os.path.exists(result):
-            os.remove(result)
+        try:
+            if os.path.exists(result):
+                os.remove(result)
+        except OSError as e:
+            logger.warning("Couldn't remove the aggregated file %s: %r", result, e)  # eg. still open on windows
 
 
 class AggregationWorker(QObject):
 
-    sig_finished = pyqtSignal(str)    # path to aggregated file
+    sig_finished = pyqtSignal(str)    # path to aggregated file, see aggregation_config.make_target
     sig_progress = pyqtSignal(int)    # number of files completed
+    sig_files = pyqtSignal(int)       # number of files to aggregate, once filtered by the time window
     sig_error = pyqtSignal(str, str)  # error during aggregation, filename, message
 
-    def __init__(self, filenames, to_filename, mutex, *args, **kwargs):
+    def __init__(self, filenames, mutex, window=None, variables=None, chunk_bytes=None, *args, **kwargs):
         super(AggregationWorker, self).__init__(*args, **kwargs)
         assert isinstance(filenames, list) and len(filenames) > 1
         self.mutex = mutex  # type: QMutex
         self.filenames = filenames
-        self.to_filename = to_filename
+        self.to_filename = None  # made once the size of the aggregation is known, see make_target
+        self.window = window  # optional (start, end) datetimes, only aggregate the records in between
+        self.variables = variables  # optional list of names, only aggregate these variables
+        self.chunk_bytes = chunk_bytes  # optional size of chunks, see chunk_config, otherwise as in the files
         self.count_callbacks = 0  # one callback for each file, count them -> progress
 
     @pyqtSlot()
     def start_aggregation(self):
+        try:
+            finished = self.aggregate()
+        except Exception as e:
+            # eg. files that can't be read or don't aggregate, reported like any other aggregation error
+            # rather than left to kill the thread silently
+            logger.exception("Aggregation failed")
+            self.sig_error.emit("", "Aggregation failed: %r" % e)
+            if self.to_filename is not None:
+                try:
+                    os.remove(self.to_filename)
+                except OSError:
+                    pass
+            return
 
-        config = Config.from_nc(self.filenames[0])
-        agg_list = generate_aggregation_list(config, self.filenames)
-        evaluate_aggregation_list(config, agg_list, self.to_filename, callback=self.agg_loop_callback)
-
-        if self.mutex.tryLock(0):
+        if finished and self.mutex.tryLock(0):
             self.sig_finished.emit(self.to_filename)
             self.mutex.unlock()
 
+    def aggregate(self):
+        """ Aggregate the files to self.to_filename, in a process of its own, see aggregate_files.
+        :return: True if aggregated, False if not (sig_error is emitted)
+        """
+        if self.window is not None:
+            self.filenames = time_coverage.overlapping(self.filenames, *self.window)
+            if not self.filenames:
+                self.sig_error.emit("", "No files between %s and %s" % self.window)
+                return False
+            self.sig_files.emit(len(self.filenames))
+
+        # spawned rather than forked, a fork of this process could inherit netcdf_lock held by another thread
+        context = multiprocessing.get_context("spawn")
+        messages = context.Queue()
+        process = context.Process(target=aggregate_files, args=(self.filenames, messages),
+                                  kwargs=dict(window=self.window, variables=self.variables,
+                                              chunk_bytes=self.chunk_bytes))
+        process.start()
+        try:
+            while True:
+                try:
+                    kind, value = messages.get(timeout=1)
+                except queue.Empty:
+                    if not process.is_alive():
+                        raise RuntimeError("aggregation process exited with code %s" % process.exitcode)
+                    continue
+                if kind == "files":
+                    self.sig_files.emit(value)
+                elif kind == "target":
+                    self.to_filename = value
+                elif kind == "progress":
+                    self.agg_loop_callback()
+                elif kind == "error":
+                    self.sig_error.emit("", value)
+                    return False
+                elif kind == "done":
+                    return True
+        finally:
+            process.join()
+
     def agg_loop_callback(self):
         self.count_callbacks += 1
         self.sig_progress.emit(self.count_callbacks)
@@ -1,7 +1,96 @@
-from PyQt5.QtCore import pyqtSignal, Qt, QSize
-from PyQt5.QtWidgets import QLabel, QListWidget, QListWidgetItem, QFileDialog
+import fnmatch
+import os
+
+from PyQt5.QtCore import pyqtSignal, Qt, QSize, QAbstractListModel, QModelIndex
+from PyQt5.QtWidgets import QLabel, QListView, QFileDialog, QProgressBar
 from PyQt5.QtWidgets import QWidget, QVBoxLayout, QHBoxLayout, QStyle, QSizePolicy, QPushButton, QAbstractItemView
 
+from pyntpg.worker_thread import WorkerThread
+
+# files added from a directory (and its subdirectories) are those matching any of these
+NETCDF_PATTERNS = ["*.nc", "*.nc4", "*.cdf"]
+
+
+class FileListModel(QAbstractListModel):
+    """ The files of a dataset, in the order added, without duplicates. Files are added and removed
+    in bulk, one model update for any number of files, so lists of tens of thousands of granules
+    stay quick to build and to show (only the rows in view are ever asked for).
+    """
+
+    def __init__(self):
+        super(FileListModel, self).__init__()
+        self.files = []
+        self.known = set()  # same as files, for checking duplicates
+
+    def rowCount(self, parent=QModelIndex()):
+        return 0 if parent.isValid() else len(self.files)
+
+    def data(self, index, role=Qt.DisplayRole):
+        if not index.isValid():
+            return None
+        if role in (Qt.DisplayRole, Qt.ToolTipRole):
+            return self.files[index.row()]
+        if role == Qt.TextAlignmentRole:
+            return Qt.AlignLeft
+        return None
+
+    def add_files(self, file_names):
+        """ Append the files not already listed.
+        :param file_names: list of paths
+        :return: number of files added
+        """
+        new = []
+        for file_name in file_names:
+            if file_name not in self.known:
+                self.known.add(file_name)
+                new.append(file_name)
+        if new:
+            self.beginInsertRows(QModelIndex(), len(self.files), len(self.files) + len(new) - 1)
+            self.files.extend(new)
+            self.endInsertRows()
+        return len(new)
+
+    def remove_rows(self, rows):
+        """ Remove the files at rows, one contiguous run at a time from the end.
+        :param rows: iterable of row numbers
+        :return: None
+        """
+        rows = sorted(set(rows), reverse=True)
+        while rows:
+            last = first = rows.pop(0)
+            while rows and rows[0] == first - 1:
+                first = rows.pop(0)
+            self.beginRemoveRows(QModelIndex(), first, last)
+            del self.files[first:last + 1]
+            self.endRemoveRows()
+        self.known = set(self.files)
+
+    def set_files(self, file_names):
+        """ Replace all the files listed. """
+        self.beginResetModel()
+        self.files = []
+        self.known = set()
+        for file_name in file_names:
+            if file_name not in self.known:
+                self.known.add(file_name)
+                self.files.append(file_name)
+        self.endResetModel()
+
+
+def find_files(directory, patterns=NETCDF_PATTERNS):
+    """ Find the files in directory and its subdirectories matching any of patterns, eg. on a
+    background thread since it can take a while for big or remote directories.
+    :param directory: path to the directory
+    :param patterns: list of fnmatch patterns
+    :return: sorted list of paths
+    """
+    found = []
+    for root, _, file_names in os.walk(directory):
+        for file_name in file_names:
+            if any(fnmatch.fnmatch(file_name, pattern) for pattern in patterns):
+                found.append(os.path.join(root, file_name))
+    return sorted(found)
+
 
 class FilePicker(QWidget):
     selected_files = pyqtSignal(list)
@@ -24,6 +113,13 @@ class FilePicker(QWidget):
         add_file.setIconSize(QSize(10, 10))
         add_file.clicked.connect(self.add_file_clicked)
         self.buttons_layout.addWidget(add_file)
+        self.add_directory = QPushButton("Add Directory")
+        self.add_directory.setIcon(self.add_directory.style().standardIcon(QStyle.SP_DirOpenIcon))
+        self.add_directory.setIconSize(QSize(10, 10))
+        self.add_directory.setToolTip("add the netCDF files (%s) in a directory and its subdirectories"
+                                      % ", ".join(NETCDF_PATTERNS))
+        self.add_directory.clicked.connect(self.add_directory_clicked)
+        self.buttons_layout.addWidget(self.add_directory)
         #self.buttons_layout.addStretch()
         self.remove_file = QPushButton("Remove File")
         self.remove_file.setIcon(self.remove_file.style().standardIcon(QStyle.SP_DialogCloseButton))
@@ -34,39 +130,74 @@ class FilePicker(QWidget):
         buttons.setSizePolicy(QSizePolicy.Preferred, QSizePolicy.Maximum)
         self.layout.addWidget(buttons)
 
+        # progress bar to display while a directory is being scanned for files
+        self.progress = QProgressBar()
+        self.progress.setRange(0, 0)
+        self.progress.setVisible(False)
+        self.layout.addWidget(self.progress)
+        self.scan = None  # WorkerThread finding the files of a directory, while running
+
         # Create the actual file listing
-        self.filelist = QListWidget()
+        self.model = FileListModel()
+        self.filelist = QListView()
+        self.filelist.setModel(self.model)
+        self.filelist.setUniformItemSizes(True)  # otherwise every row is measured to lay out the list
         self.filelist.setVerticalScrollMode(QAbstractItemView.ScrollPerPixel)
         # self.filelist.setMaximumHeight(300)
         # self.filelist.setMinimumHeight(300)
         self.filelist.setGridSize(QSize(100, 20))
         self.filelist.setTextElideMode(Qt.ElideMiddle)
         self.filelist.setSelectionMode(QAbstractItemView.MultiSelection)
-        self.filelist.itemClicked.connect(self.file_item_clicked)
-        self.filelist.itemSelectionChanged.connect(self.file_item_clicked)
+        self.filelist.selectionModel().selectionChanged.connect(self.file_item_clicked)
         self.layout.addWidget(self.filelist)
 
     def add_file_clicked(self):
         # Add files to the list of selected files
-        file_list = [i.text() for i in self.filelist.findItems("", Qt.MatchContains)]
         file_names = QFileDialog.getOpenFileNames(None, "Open files", "~")[0]  # [0] is the list of files, seelcted
         if len(file_names) > 0:  # file_names will be empty if cancel pressed
+            self.add_files([str(name) for name in file_names])  # Convert to Python string
+
+    def add_directory_clicked(self):
+        # Add the netcdf files of a directory, found in the background
+        directory = QFileDialog.getExistingDirectory(None, "Open directory", "~")
+        if directory:  # empty if cancel pressed
+            # one scan at a time, the button is enabled again once it's done
+            self.add_directory.setEnabled(False)
+            self.progress.setVisible(True)
+            scan = WorkerThread(lambda: find_files(str(directory)), parent=self)
+            scan.finished.connect(lambda file_names: self.directory_scanned(scan, file_names))
+            self.scan = scan
+            scan.start()
+
+    def directory_scanned(self, scan, file_names):
+        """ Add the files found by a directory scan.
+        :param scan: the WorkerThread that scanned the directory
+        :param file_names: list of paths found
+        :return: None
+        """
+        scan.wait()  # finished is emitted at the very end of run
+        scan.deleteLater()
+        if scan is self.scan:
+            self.scan = None
+        self.add_directory.setEnabled(True)
+        self.progress.setVisible(False)
+        self.add_files(file_names)
+
+    def add_files(self, file_names):
+        """ Add files to the list, all at once, and emit the new list once if any were new.
+        :param file_names: list of paths
+        :return: None
+        """
+        if self.model.add_files(file_names):
             self.remove_file.setVisible(True)
-            file_names = [str(name) for name in file_names]  # Convert to Python string
-            for file_name in file_names:
-                if file_name not in file_list:
-                    item = QListWidgetItem(file_name)
-                    item.setTextAlignment(Qt.AlignLeft)
-                    self.filelist.addItem(item)
-            self.filelist.setCurrentIndex(self.filelist.indexFromItem(item))
+            self.filelist.setCurrentIndex(self.model.index(self.model.rowCount() - 1))
             self.file_item_clicked()
             self.emit_file_list()
 
     def remove_file_clicked(self):
         # Remove a file from the list of selected files
-        for item in self.filelist.selectedItems():
-            self.filelist.takeItem(self.filelist.row(item))
-        if len(self.filelist) == 0:
+        self.model.remove_rows(index.row() for index in self.filelist.selectionModel().selectedRows())
+        if self.model.rowCount() == 0:
             self.remove_file.setHidden(True)
         else:
             self.filelist.setCurrentIndex(self.filelist.currentIndex())
@@ -75,15 +206,21 @@ class FilePicker(QWidget):
     def file_item_clicked(self):
         # Depending on the number of items selected, make sure the
         # remove files button has the correct plural
-        if len(self.filelist.selectedItems()) > 1:
+        if len(self.filelist.selectionModel().selectedRows()) > 1:
             self.remove_file.setText("Remove Files")
         else:
             self.remove_file.setText("Remove File")
 
     def emit_file_list(self):
-        # updated_file_list = [i.text() for i in self.filelist.findItems("", Qt.MatchContains)]
-        updated_file_list = [self.filelist.item(i).text() for i in range(self.filelist.count())]
-        self.selected_files.emit(updated_file_list)  # empty list is ok
+        self.selected_files.emit(self.get_file_list())  # empty list is ok
+
+    def get_file_list(self):
+        return list(self.model.files)
+
+    def set_file_list(self, file_names):
+        # Replace the list of files, without emitting it
+        self.model.set_files(file_names)
+        self.remove_file.setVisible(len(file_names) > 0)
 
 
 
@@ -39,23 +39,78 @@ class DatasetTabs(QTabWidget):
         self.tabCloseRequested.connect(self.close_tab)
 
         self.datasets = QCoreApplication.instance().datasets  # type: DatasetsContainer
+        self.datasets.sig_opened.connect(self.dataset_opened)
+        self.datasets.sig_error.connect(self.dataset_error)
+        # aggregated files made in memory would otherwise stay there until reboot
+        QCoreApplication.instance().aboutToQuit.connect(self.drop_aggregated)
 
     def tab_changed(self, index):
         maxindex = self.count() - 1
         if (index == maxindex or index == -1) and self.mutex.tryLock():
-            dataset_tab = DatasetTab(self)
-            dataset_tab.dataset_ready.connect(lambda path: self.publish_dataset(path, dataset_tab))
-            self.insertTab(maxindex, dataset_tab, "dataset_"
-                           + ascii_lowercase[self.number_tabs_added % len(ascii_lowercase)])
+            self.add_dataset_tab("dataset_" + ascii_lowercase[self.number_tabs_added % len(ascii_lowercase)])
             self.number_tabs_added += 1
             self.setCurrentIndex(maxindex)
             self.mutex.unlock()
+        elif index >= 0:
+            # looking at a dataset whose files were deferred, open them now.
+            self.datasets.require([self.tabText(index)])
+
+    def add_dataset_tab(self, name):
+        """ Insert a new dataset tab called name before the "+" tab.
+        :param name: name of the dataset
+        :return: the new DatasetTab
+        """
+        dataset_tab = DatasetTab(self)
+        dataset_tab.dataset_ready.connect(lambda path: self.publish_dataset(path, dataset_tab))
+        self.insertTab(self.count() - 1, dataset_tab, name)
+        return dataset_tab
+
+    def get_datasets(self):
+        """ Get the files of each dataset tab.
+        :return: dict of dataset name to list of files, for the tabs having files
+        """
+        datasets = {}
+        for index in range(self.count()):
+            widget = self.widget(index)
+            if isinstance(widget, DatasetTab) and widget.filepicker.get_file_list():
+                datasets[self.tabText(index)] = widget.filepicker.get_file_list()
+        return datasets
+
+    def get_variables(self):
+        """ Get the variables aggregated of each dataset tab, see DatasetTab.get_variables.
+        :return: dict of dataset name to list of variables, for the tabs aggregating only some
+        """
+        variables = {}
+        for index in range(self.count()):
+            widget = self.widget(index)
+            if isinstance(widget, DatasetTab) and widget.get_variables():
+                variables[self.tabText(index)] = widget.get_variables()
+        return variables
+
+    def defer_datasets(self, datasets, variables=None):
+        """ Set the files of the dataset tabs, making tabs for the datasets that don't have one
+        yet, without opening them until they are needed. See DatasetsContainer.defer.
+        :param datasets: dict of dataset name to list of files
+        :param variables: optional dict of dataset name to the list of variables to aggregate
+        :return: None
+        """
+        variables = variables or {}
+        for name, files in datasets.items():
+            dataset_tab = self.find_tab(name) or self.add_dataset_tab(name)
+            if (dataset_tab.filepicker.get_file_list() != files
+                    or dataset_tab.get_variables() != variables.get(name)):
+                self.datasets.close(name)
+                dataset_tab.defer_files(files)
+                dataset_tab.set_variables(variables.get(name))
+                self.datasets.defer(name, dataset_tab.open_files)
 
     def close_tab(self, index):
         if index == self.count() - 2:
             self.setCurrentIndex(index - 1)
         self.datasets.close(self.tabText(index))  # Broadcast the remove event
         to_remove = self.widget(index)
+        if isinstance(to_remove, DatasetTab):
+            to_remove.drop_aggregated()
         self.removeTab(index)
         to_remove.deleteLater()
 
@@ -63,9 +118,34 @@ class DatasetTabs(QTabWidget):
         index = self.indexOf(tab)
         if index == -1:
             return  # hmm, tab wasn't found
+        if path == "":
+            tab.preview.show_message("Select file(s)!")
+        else:
+            tab.preview.show_progress(0)  # until the dataset is opened and scanned, see dataset_opened
         # Here, ok to pass on empty path, DatasetContainer.open delegates properly
         self.datasets.open(self.tabText(index), path)
 
+    def find_tab(self, name):
+        """ Get the DatasetTab of the dataset called name, or None. """
+        tabs = [self.widget(index) for index in range(self.count()) if self.tabText(index) == name]
+        return tabs[0] if tabs and isinstance(tabs[0], DatasetTab) else None
+
+    def dataset_opened(self, name):
+        tab = self.find_tab(name)
+        if tab is not None:
+            tab.preview.show_metadata(self.datasets.metadata[name])
+
+    def drop_aggregated(self):
+        """ Remove the files the datasets were aggregated to, see DatasetTab.drop_aggregated. """
+        for index in range(self.count()):
+            if isinstance(self.widget(index), DatasetTab):
+                self.widget(index).drop_aggregated()
+
+    def dataset_error(self, name, message):
+        tab = self.find_tab(name)
+        if tab is not None:
+            tab.preview.show_message(message)
+
 
 class DatasetTabBar(QTabBar):
     """ The QTabBar controls the actual tabs
@@ -1,8 +1,93 @@
-import os
-
 import netCDF4 as nc
-from PyQt5.QtCore import pyqtSlot
-from PyQt5.QtWidgets import QWidget, QHBoxLayout, QVBoxLayout, QLabel, QProgressBar, QPlainTextEdit
+from PyQt5.QtCore import Qt, QAbstractTableModel, QModelIndex
+from PyQt5.QtWidgets import QWidget, QHBoxLayout, QVBoxLayout, QLabel, QProgressBar, QTableView, QLineEdit
+from PyQt5.QtWidgets import QHeaderView, QAbstractItemView
+
+COLUMNS = ["variable", "dimensions", "shape", "dtype", "units", "chunking", "compression", "size"]
+
+# rows are handed to the view this many at a time, as they're scrolled into view
+FETCH_ROWS = 200
+
+
+def human_size(nbytes):
+    """ Bytes as a short string, eg. "1.5 MB". """
+    if nbytes is None:
+        return ""
+    for unit in ["B", "kB", "MB", "GB"]:
+        if nbytes < 1024:
+            return "%.0f %s" % (nbytes, unit) if unit == "B" else "%.1f %s" % (nbytes, unit)
+        nbytes /= 1024.
+    return "%.1f TB" % nbytes
+
+
+class VariablesModel(QAbstractTableModel):
+    """ Table of the variables of a dataset, from the metadata scanned when it was opened (see
+    pyntpg.datasets_container.scan_metadata), so nothing is read from the file here.
+
+    Files with thousands of variables stay quick to show: the cells are only made into text when
+    the view asks for them, rows are fetched FETCH_ROWS at a time as they're scrolled to (see
+    fetchMore), and filtering just picks the matching names again.
+    """
+
+    def __init__(self):
+        super(VariablesModel, self).__init__()
+        self.variables = {}  # name -> variable metadata
+        self.matching = []  # names of the variables matching the filter, in file order
+        self.fetched = 0  # number of the matching rows handed to the view so far
+        self.filter = ""
+
+    def set_metadata(self, metadata):
+        self.variables = metadata["variables"] if metadata else {}
+        self.set_filter(self.filter)
+
+    def set_filter(self, text):
+        """ Only show the variables whose name contains text, ignoring case. """
+        self.beginResetModel()
+        self.filter = text
+        text = text.lower()
+        self.matching = [name for name in self.variables if text in name.lower()]
+        self.fetched = min(FETCH_ROWS, len(self.matching))
+        self.endResetModel()
+
+    def rowCount(self, parent=QModelIndex()):
+        return 0 if parent.isValid() else self.fetched
+
+    def columnCount(self, parent=QModelIndex()):
+        return 0 if parent.isValid() else len(COLUMNS)
+
+    def canFetchMore(self, parent=QModelIndex()):
+        return not parent.isValid() and self.fetched < len(self.matching)
+
+    def fetchMore(self, parent=QModelIndex()):
+        more = min(FETCH_ROWS, len(self.matching) - self.fetched)
+        if parent.isValid() or more <= 0:
+            return
+        self.beginInsertRows(QModelIndex(), self.fetched, self.fetched + more - 1)
+        self.fetched += more
+        self.endInsertRows()
+
+    def headerData(self, section, orientation, role=Qt.DisplayRole):
+        if role == Qt.DisplayRole and orientation == Qt.Horizontal:
+            return COLUMNS[section]
+        return None
+
+    def data(self, index, role=Qt.DisplayRole):
+        if not index.isValid() or role not in (Qt.DisplayRole, Qt.ToolTipRole):
+            return None
+        name = self.matching[index.row()]
+        var = self.variables[name]
+        column = COLUMNS[index.column()]
+        if column == "variable":
+            return name
+        elif column == "dimensions":
+            return "(%s)" % ", ".join(var["dimensions"])
+        elif column == "shape":
+            return " x ".join(str(length) for length in var["shape"])
+        elif column == "chunking":
+            return "contiguous" if var.get("chunking") is None else " x ".join(str(c) for c in var["chunking"])
+        elif column == "size":
+            return human_size(var.get("nbytes"))
+        return str(var.get(column, ""))
 
 
 class NcinfoPreview(QWidget):
@@ -21,18 +106,36 @@ class NcinfoPreview(QWidget):
         status_layout.setSpacing(0)
         status_layout.setContentsMargins(0, 0, 0, 0)
         status.setLayout(status_layout)
-        label = QLabel("Dataset Summary:")
-        label.setContentsMargins(0, 6, 10, 6)
-        status_layout.addWidget(label)
+        self.label = QLabel("Dataset Summary:")
+        self.label.setContentsMargins(0, 6, 10, 6)
+        status_layout.addWidget(self.label)
         self.progress = QProgressBar()
         self.progress.setRange(0, 0)
         self.progress.setVisible(False)
         status_layout.addWidget(self.progress)
+        self.filter = QLineEdit()
+        self.filter.setPlaceholderText("filter variables")
+        self.filter.setClearButtonEnabled(True)
+        status_layout.addWidget(self.filter)
         self.layout.addWidget(status)
 
-        self.textbox = QPlainTextEdit()
-        self.textbox.setReadOnly(True)
-        self.layout.addWidget(self.textbox)
+        self.message = QLabel()
+        self.message.setWordWrap(True)
+        self.message.setVisible(False)
+        self.layout.addWidget(self.message)
+
+        self.model = VariablesModel()
+        self.filter.textChanged.connect(self.model.set_filter)
+        self.table = QTableView()
+        self.table.setModel(self.model)
+        self.table.verticalHeader().setVisible(False)
+        # every row the same height, rather than measuring each one
+        self.table.verticalHeader().setSectionResizeMode(QHeaderView.Fixed)
+        self.table.verticalHeader().setDefaultSectionSize(self.fontMetrics().height() + 4)
+        self.table.horizontalHeader().setStretchLastSection(True)
+        self.table.setSelectionBehavior(QAbstractItemView.SelectRows)
+        self.table.setWordWrap(False)
+        self.layout.addWidget(self.table)
 
     def show_progress(self, max):
         """ Show the progress bar.
@@ -42,43 +145,36 @@ class NcinfoPreview(QWidget):
         self.progress.setRange(0, max)
         self.progress.setValue(0)
 
-    @pyqtSlot(str)
-    def update(self, netcdf_filepath):
-        """ Update the text displayed inside the preview widget.
+    def show_metadata(self, metadata):
+        """ Display the summary of a dataset, as scanned when it was opened.
+        :param metadata: dict, see pyntpg.datasets_container.scan_metadata
         :return: None
         """
-        if (isinstance(netcdf_filepath, str) 
-                or isinstance(netcdf_filepath, basestring)) and os.path.exists(netcdf_filepath):
-            try:
-                text = self.make_nc_preview(nc.Dataset(netcdf_filepath))
-            except IOError as e:
-                text = repr(e)
-            self.textbox.setPlainText(text)
-        else:
-            self.textbox.setPlainText("Select file(s)! %s" % netcdf_filepath)
+        self.model.set_metadata(metadata)
+        self.table.resizeColumnsToContents()  # of the rows fetched so far only
+        self.label.setText("Dataset Summary: %d variables" % len(metadata["variables"]))
+        self.message.setVisible(False)
         self.progress.setVisible(False)
 
-    @staticmethod
-    def make_nc_preview(netcdf_obj):
-        """ Create a string which provides a sufficient summary or
-        preview of the netCDF object.
-
-        :param netcdf_obj: A netCDF4 object to be previewed
-        :return: A string to summarize the netCDF4 object
+    def show_message(self, text):
+        """ Display text instead of a summary, eg. when there is no dataset or it couldn't be opened.
+        :return: None
         """
-        result = ""
-        for var in netcdf_obj.variables.values():
-            result += "%s(%s): [%s]\n" % (var.name, ",".join(var.dimensions), getattr(var, "units", ""))
-        return result
+        self.model.set_metadata(None)
+        self.label.setText("Dataset Summary:")
+        self.message.setText(text)
+        self.message.setVisible(True)
+        self.progress.setVisible(False)
 
 
 # For testing individual widget
 if __name__ == "__main__":
     import sys
     from PyQt5.QtWidgets import QApplication
+    from pyntpg.datasets_container import scan_metadata
 
     app = QApplication(sys.argv)
     main = NcinfoPreview()
-    main.update_text(nc.Dataset('/home/scodresc/Downloads/g13_magneto_512ms_20160326_20160326.nc'))
+    main.show_metadata(scan_metadata(nc.Dataset('/home/scodresc/Downloads/g13_magneto_512ms_20160326_20160326.nc')))
     main.show()
     exit(app.exec_())
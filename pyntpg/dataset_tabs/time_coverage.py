@@ -0,0 +1,241 @@
+"""
+Index of the time covered by each file, so that out of thousands of granules only those
+overlapping a time window of interest need to be aggregated (see overlapping), and of those, only
+the records in the window (see trim_records).
+
+The coverage of a file is the first and last values of its time variable, only those two values
+are read, or if there isn't one, times parsed from its filename. Coverages are kept, along with
+the modification time and size of the file they were found for, in a small JSON file (INDEX_PATH,
+or the environment variable PYNTPG_TIME_INDEX) so that each file is only ever scanned once.
+"""
+import json
+import logging
+import os
+import re
+import threading
+from datetime import datetime, timedelta
+
+import netCDF4 as nc
+import numpy as np
+from ncagg.aggrelist import InputFileNode
+
+from pyntpg.datasets_container import netcdf_lock, file_stat
+
+logger = logging.getLogger(__name__)
+
+ENV_VAR = "PYNTPG_TIME_INDEX"
+INDEX_PATH = os.environ.get(ENV_VAR) or os.path.join(os.path.expanduser("~"), ".pyntpg_time_coverage.json")
+
+# coverages are stored as numbers in these units
+EPOCH_UNITS = "seconds since 1970-01-01"
+
+# filename times, eg. GOES-R granules "..._s20180850039000_e20180850039599_c...nc" (year, day of year,
+# time, tenths of seconds), or failing that a date, "..._20160326.nc", covering the whole day.
+FILENAME_START_END = re.compile(r"_s(\d{13})(\d)?_e(\d{13})(\d)?")
+FILENAME_DATE = re.compile(r"(?<!\d)(\d{8})(?!\d)")
+
+# path -> {"stat": [mtime, size], "coverage": [first, last] in EPOCH_UNITS, or None if unknown}
+index = None
+index_lock = threading.Lock()  # scans run in aggregation worker threads
+
+
+def load():
+    """ Read the index from INDEX_PATH, if not done already. """
+    global index
+    if index is None:
+        try:
+            with open(INDEX_PATH) as f:
+                index = json.load(f)
+        except (IOError, ValueError):
+            index = {}  # no index yet, or unreadable, start over
+    return index
+
+
+def save():
+    """ Write the index to INDEX_PATH. """
+    try:
+        with open(INDEX_PATH, "w") as f:
+            json.dump(index, f)
+    except IOError as e:
+        logger.warning("Couldn't save the time coverage index to %s: %r", INDEX_PATH, e)
+
+
+def to_epoch(dates):
+    """ Datetimes as numbers in EPOCH_UNITS. """
+    return [float(value) for value in nc.date2num(dates, EPOCH_UNITS)]
+
+
+def find_time_variable(dataset):
+    """
+    Get the variable holding the times of a dataset: the coordinate variable of the unlimited
+    dimension if it has time units, otherwise the first 1D variable with time units.
+
+    :param dataset: netCDF4.Dataset
+    :return: netCDF4.Variable, or None
+    """
+    def is_time(variable):
+        return variable.ndim == 1 and " since " in getattr(variable, "units", "")
+
+    for name, dimension in dataset.dimensions.items():
+        if dimension.isunlimited() and name in dataset.variables and is_time(dataset.variables[name]):
+            return dataset.variables[name]
+    for variable in dataset.variables.values():
+        if is_time(variable):
+            return variable
+    return None
+
+
+def read_coverage(path):
+    """
+    Read the first and last time of the file at path from its time variable. If the first or last
+    value is missing (ie. a fill value), the whole variable is read instead.
+
+    :param path: path to a netCDF file
+    :return: [first, last] in EPOCH_UNITS, or None if there's no time variable
+    """
+    with netcdf_lock, nc.Dataset(path) as dataset:
+        variable = find_time_variable(dataset)
+        if variable is None or variable.shape[0] == 0:
+            return None
+        values = np.ma.stack([variable[0], variable[-1]])
+        if np.ma.is_masked(values):
+            values = np.ma.compressed(variable[:])
+            if values.size == 0:
+                return None
+            values = [values.min(), values.max()]
+        dates = nc.num2date(values, variable.units, getattr(variable, "calendar", "standard"))
+        return to_epoch(dates)
+
+
+def filename_coverage(path):
+    """
+    Parse the time covered by a file from its name, see FILENAME_START_END and FILENAME_DATE.
+
+    :param path: path to a file
+    :return: [first, last] in EPOCH_UNITS, or None if the name has no times
+    """
+    name = os.path.basename(path)
+    match = FILENAME_START_END.search(name)
+    if match is not None:
+        start, start_tenths, end, end_tenths = match.groups()
+        return to_epoch([datetime.strptime(start, "%Y%j%H%M%S") + timedelta(seconds=int(start_tenths or 0) / 10.),
+                         datetime.strptime(end, "%Y%j%H%M%S") + timedelta(seconds=int(end_tenths or 0) / 10.)])
+    match = FILENAME_DATE.search(name)
+    if match is not None:
+        try:
+            day = datetime.strptime(match.group(1), "%Y%m%d")
+        except ValueError:
+            return None  # just some 8 digit number
+        return to_epoch([day, day + timedelta(days=1)])
+    return None
+
+
+def scan(paths):
+    """
+    Get the coverage of each of paths, scanning (and adding to the index) those that weren't yet
+    or changed since.
+
+    :param paths: list of paths to netCDF files
+    :return: dict {path: [first, last] in EPOCH_UNITS, or None if unknown}
+    """
+    coverages = {}
+    with index_lock:
+        load()
+        scanned = 0
+        for path in paths:
+            key = os.path.abspath(path)
+            try:
+                stat = list(file_stat(path))
+            except OSError:
+                coverages[path] = None  # missing, let the aggregation complain about it
+                continue
+            entry = index.get(key)
+            if entry is None or entry["stat"] != stat:
+                try:
+                    coverage = read_coverage(path)
+                except (IOError, OSError, ValueError) as e:
+                    logger.warning("Couldn't read the times of %s: %r", path, e)
+                    coverage = None
+                entry = index[key] = {"stat": stat, "coverage": coverage or filename_coverage(path)}
+                scanned += 1
+            coverages[path] = entry["coverage"]
+        if scanned:
+            save()
+    return coverages
+
+
+def overlapping(paths, start, end):
+    """
+    Keep the files covering any time between start and end. Files whose coverage isn't known are
+    kept too, rather than silently left out.
+
+    :param paths: list of paths to netCDF files
+    :param start: datetime, or None for no lower bound
+    :param end: datetime, or None for no upper bound
+    :return: list of the paths overlapping, in the same order
+    """
+    coverages = scan(paths)
+    start = to_epoch([start])[0] if start is not None else float("-inf")
+    end = to_epoch([end])[0] if end is not None else float("inf")
+    return [path for path in paths
+            if coverages[path] is None or (coverages[path][0] <= end and coverages[path][1] >= start)]
+
+
+def record_bounds(path, start, end):
+    """
+    Find the records of the unlimited dimension of the file at path whose time is between start
+    and end, from its time variable (see find_time_variable).
+
+    :param path: path to a netCDF file
+    :param start: datetime, or None for no lower bound
+    :param end: datetime, or None for no upper bound
+    :return: tuple of (dimension name, first record, record after last), or None if the records
+        can't be told apart by time, ie. no time variable along the unlimited dimension, or times
+        missing or not in order
+    """
+    with netcdf_lock, nc.Dataset(path) as dataset:
+        variable = find_time_variable(dataset)
+        if variable is None or not dataset.dimensions[variable.dimensions[0]].isunlimited():
+            return None
+        values = np.ma.filled(np.ma.asarray(variable[:], dtype=float), np.nan)
+        if np.any(np.isnan(values)) or np.any(np.diff(values) < 0):
+            return None
+        calendar = getattr(variable, "calendar", "standard")
+        low = nc.date2num(start, variable.units, calendar) if start is not None else -np.inf
+        high = nc.date2num(end, variable.units, calendar) if end is not None else np.inf
+        return (variable.dimensions[0], int(np.searchsorted(values, low, "left")),
+                int(np.searchsorted(values, high, "right")))
+
+
+def trim_records(aggregation_list, start, end):
+    """
+    Slice each file of an ncagg aggregation list to its records between start and end, so that
+    only those are written to the aggregated file. Files without records in the window are left out
+    and files whose records can't be told apart by time (see record_bounds) are kept whole.
+
+    :param aggregation_list: list of ncagg nodes, from generate_aggregation_list
+    :param start: datetime, or None for no lower bound
+    :param end: datetime, or None for no upper bound
+    :return: list of the nodes left
+    """
+    trimmed = []
+    for node in aggregation_list:
+        bounds = record_bounds(node.filename, start, end) if isinstance(node, InputFileNode) else None
+        if bounds is None or bounds[0] not in node.config.dims:
+            trimmed.append(node)
+            continue
+        dimension, first, stop = bounds
+        dim = node.config.dims[dimension]
+        sliced = node.get_dim_slice(dim)
+        if not isinstance(sliced, slice):
+            trimmed.append(node)  # a single record, nothing to trim
+            continue
+        # within any slice ncagg already put on the node, eg. dropping records overlapping other files
+        # of a dimension with index_by
+        sliced_first, sliced_stop, _ = sliced.indices(node.dim_sizes[dimension])
+        first, stop = max(first, sliced_first), min(stop, sliced_stop)
+        if stop > first:
+            node.set_dim_slice_start(dim, first)
+            node.set_dim_slice_stop(dim, stop)
+            trimmed.append(node)
+    return trimmed
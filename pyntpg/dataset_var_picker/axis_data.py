@@ -0,0 +1,324 @@
+"""
+Axis configs from the pickers only reference the data to plot: which dataset and variable it
+comes from, and how to slice and flatten it. The functions here read the data those references
+describe, without needing any of the picker widgets, so that it can be done when it's actually
+needed (ie. when plotting) and from any thread.
+
+Axis config keys used:
+
+- "type": "index", "datetime", or "scatter" for x axes, absent for y axes.
+- "dataset", "variable": where to read from.
+- "slices": list of [start, stop] for each dimension of the variable. Whole variable if absent, and
+  a stop of None reads to the end of the dimension.
+- "flatten": list of bool for each dimension, whether to flatten it into the previous dimension.
+- "units": units of the variable, needed to convert numeric times to datetimes.
+- "start", "end": datetime bounds, datetime values outside are masked.
+- "length": number of points of an index axis, None for as many as the y axis of the line has.
+- "data": the values, once read. Axes that already have data are not read again. Index axes get a
+  range rather than an array where they can, see make_index.
+
+And of line configs, "compact": if True, the data of the line's axes is stored compactly for display,
+see compact_array and as_datetime64.
+"""
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+
+import netCDF4 as nc
+import numpy as np
+
+from pyntpg.profiling import span, timed
+
+try:
+    from cftime import DatetimeGregorian
+    datetime_types = (datetime, DatetimeGregorian)
+except ImportError:
+    # fallback compat if cftime < 1.2.0 installed.
+    datetime_types = (datetime,)
+
+# upper limit on the number of datasets read concurrently by resolve_lines
+MAX_READ_THREADS = 8
+
+# nanoseconds per unit of numeric times, to convert them straight to datetime64 for compact lines.
+UNIT_NANOSECONDS = {
+    "microseconds": 10 ** 3,
+    "milliseconds": 10 ** 6,
+    "seconds": 10 ** 9,
+    "minutes": 60 * 10 ** 9,
+    "hours": 3600 * 10 ** 9,
+    "days": 86400 * 10 ** 9,
+}
+
+
+def get_reshape(shape, flatten):
+    """
+    In order to actually convert the data from original multidim format into the flattened selection,
+    we will need to call numpy reshape with arguments.... this function determines those arguments.
+
+    :param shape: length of each dimension selected
+    :param flatten: list of bool for each dimension, True to flatten into the previous dimension
+    :return: list[int]
+    """
+    reshaping = []
+    for i, (dim_len, flatten_condition) in enumerate(zip(shape, flatten)):
+        if i == 0:
+            # the first dimension has to just be taken, since there's nothing behind to flatten against.
+            reshaping.append(dim_len)
+        elif flatten_condition or dim_len == 1:
+            # otherwise flatten.
+            # things are either explicitly marked to flatten, or if only size 1
+            # are flattened.
+            reshaping[-1] = reshaping[-1] * dim_len
+        else:
+            reshaping.append(dim_len)
+    return reshaping
+
+
+def make_oslice(slices, step=None):
+    """ Turn axis config "slices" into the tuple of slice objects to read the variable with.
+    :param slices: list of [start, stop] for each dimension, or None for everything
+    :param step: optional step along the first dimension
+    :return: tuple of slices
+    """
+    if slices is None:
+        return slice(None, None, step),
+    return tuple(slice(start, stop, step if i == 0 else None) for i, (start, stop) in enumerate(slices))
+
+
+def flattened_width(axis):
+    """
+    Number of points each record along the first dimension of axis makes once flattened, ie. how
+    many of the dimensions after the first are flattened into it (see get_reshape).
+
+    :param axis: axis config dict, with "slices" of explicit [start, stop] after the first dimension
+    :return: int
+    """
+    slices = axis.get("slices")
+    if not slices:
+        return 1
+    flatten = axis.get("flatten", [False] * len(slices))
+    return get_reshape([1] + [stop - start for start, stop in slices[1:]], flatten)[0]
+
+
+def make_index(rows, width=1, step=None):
+    """
+    Index of the points of a y axis whose first dimension was read with step, numbered as if no
+    records were skipped: rows records read, each flattened into width points.
+
+    :param rows: number of records read
+    :param width: number of points of each record, see flattened_width
+    :param step: optional step the records were read with
+    :return: range if the points are evenly spaced, otherwise 1D array
+    """
+    step = step or 1
+    if width == 1:
+        return range(0, rows * step, step)
+    elif step == 1:
+        return range(0, rows * width)
+    return (np.arange(rows)[:, None] * (step * width) + np.arange(width)).ravel()
+
+
+def read_flat(get_data, dataset, variable, slices, flatten, step=None):
+    """
+    Read the selection of variable and reshape it into the 1D or 2D array to plot.
+
+    :param get_data: function (dataset, variable, oslice) -> array, eg. Application.get_data
+    :param dataset: name of dataset to read from
+    :param variable: name of variable to read
+    :param slices: list of [start, stop] for each dimension
+    :param flatten: list of bool for each dimension
+    :param step: optional step along the first dimension
+    :return: array of values
+    """
+    data = get_data(dataset, variable, make_oslice(slices, step))
+    return data.reshape(tuple(get_reshape(data.shape, flatten)))
+
+
+def num2date(data, units):
+    """
+    Convert numeric times to python datetimes if the units allow, otherwise to cftime datetimes.
+    Python datetimes are quicker to make and, unlike cftime datetimes (which need the nc_time_axis
+    converter), can be plotted on the same axes as the datetime64 of compact lines.
+    """
+    try:
+        return nc.num2date(data, units, only_use_cftime_datetimes=False, only_use_python_datetimes=True)
+    except ValueError:
+        return nc.num2date(data, units)
+
+
+def as_datetime64(data, units):
+    """
+    Convert times to datetime64[ns], with NaT where masked, for compact lines. 8 bytes per time instead
+    of an object for each, and numeric times are converted without making any objects.
+
+    :param data: array of numeric times, or of datetimes
+    :param units: units of numeric times, eg. "seconds since 2000-01-01"
+    :return: datetime64[ns] array, or None if data can't be represented as datetime64
+    """
+    mask = np.ma.getmaskarray(data)
+    try:
+        if np.ma.getdata(data).dtype.kind in "iuf":
+            scale = UNIT_NANOSECONDS.get(units.partition(" since ")[0].strip().lower())
+            if scale is None:
+                return None
+            epoch = np.datetime64(num2date(0, units), "ns")
+            with np.errstate(invalid="ignore"):  # nan becomes NaT
+                times = epoch + (np.ma.getdata(data).astype(np.float64) * scale).astype("timedelta64[ns]")
+        else:
+            times = np.asarray(np.ma.getdata(data)).astype("datetime64[ns]")
+    except (TypeError, ValueError, AttributeError):
+        return None  # eg. a calendar or dates numpy datetimes can't represent
+    times[mask] = np.datetime64("NaT")
+    return times
+
+
+def read_datetime(get_data, dataset, variable, units, slices, start=None, end=None, step=None, compact=False):
+    """
+    Read the selection of a time variable as datetimes, masking values outside of [start, end].
+
+    :param get_data: function (dataset, variable, oslice) -> array, eg. Application.get_data
+    :param dataset: name of dataset to read from
+    :param variable: name of variable to read
+    :param units: units of variable, to convert numbers to datetimes, eg. "seconds since 2000-01-01"
+    :param slices: list of [start, stop] for each dimension of variable
+    :param start: optional datetime, earlier values are masked
+    :param end: optional datetime, later values are masked
+    :param step: optional step along the first dimension
+    :param compact: if True, get datetime64 with NaT for times masked or outside [start, end] if possible
+    :return: masked array of datetimes, flattened if variable is multidimensional
+    """
+    data = get_data(dataset, variable, make_oslice(slices, step))
+
+    times = as_datetime64(data, units) if compact else None
+    if times is not None:
+        times = times.ravel()
+        if start is not None:
+            times[times < np.datetime64(start)] = np.datetime64("NaT")
+        if end is not None:
+            times[times > np.datetime64(end)] = np.datetime64("NaT")
+        return times
+
+    mask = np.ma.getmaskarray(data)  # hopefully none!
+
+    if not isinstance(data.item(0), datetime_types):
+        # not datetime already, convert through num2date
+        # by assumption value has a units attribute since
+        # show_var_condition, would not allow the variable to be displayed
+        # unless it was already a datetime or had num2date parseable units field
+        with span("num2date", size=np.size(data)):
+            data = num2date(data, units)
+
+    if np.ndim(data) > 1:
+        data = data.flatten()
+        mask = mask.flatten()
+
+    start = datetime.min if start is None else start
+    end = datetime.max if end is None else end
+
+    if np.any(mask):
+        # if any data values are masked, must go through and remove the Nones from the data array...
+        # the None values are introduced by the nc.num2date call on masked elements
+        mask_date_detector = np.vectorize(lambda x: x is None or x < start or x > end)
+        return np.ma.masked_where(mask_date_detector(data), data)
+    else:
+        # otherwise, this approach seems to be much more efficient.
+        return np.ma.masked_where((data < start) | (data > end), data)
+
+
+def compact_array(data):
+    """
+    Downcast data for display: floats wider than float32 to float32, with masked values as nan
+    (which matplotlib leaves gaps for the same way), and masks with nothing masked dropped.
+
+    :param data: array, possibly masked
+    :return: compacted array
+    """
+    mask = np.ma.getmask(data)
+    if not np.any(mask):
+        data, mask = np.ma.getdata(data), np.ma.nomask
+    if np.ma.getdata(data).dtype.kind == "f":
+        if data.dtype.itemsize > 4:
+            data = data.astype(np.float32)
+        if mask is not np.ma.nomask:
+            data = data.filled(np.nan)
+    return data
+
+
+def read_axis(axis, get_data, step=None, compact=False):
+    """
+    Read the data referenced by an axis config.
+
+    :param axis: axis config dict, see module docstring
+    :param get_data: function (dataset, variable, oslice) -> array, eg. Application.get_data
+    :param step: optional step along the first dimension, eg. to decimate
+    :param compact: if True, store the data compactly, see compact_array and as_datetime64
+    :return: array of values
+    """
+    if axis.get("type") == "index":
+        return range(0, axis["length"], step or 1)
+    elif axis.get("type") == "datetime":
+        return read_datetime(get_data, axis["dataset"], axis["variable"], axis.get("units"), axis.get("slices"),
+                             axis.get("start"), axis.get("end"), step, compact)
+    elif axis.get("slices") is not None:
+        data = read_flat(get_data, axis["dataset"], axis["variable"], axis["slices"],
+                         axis.get("flatten", [False] * len(axis["slices"])), step)
+    else:
+        data = get_data(axis["dataset"], axis["variable"], make_oslice(None, step))
+    return compact_array(data) if compact else data
+
+
+@timed("resolve_lines")
+def resolve_lines(lines, get_data, step=None, max_workers=None):
+    """
+    Read the data for all the axes of lines that don't have it yet, setting axis["data"].
+
+    Axes from different datasets (ie. different files) are read concurrently on a thread pool,
+    while all the axes of one dataset are read one after the other by the same thread, since a
+    netCDF file handle can't be read from several threads at once. If reading an axis fails,
+    the exception is kept in axis["error"] instead, see check_resolved.
+
+    :param lines: list of line config dicts, modified in place
+    :param get_data: function (dataset, variable, oslice) -> array, eg. Application.get_data
+    :param step: optional step along the first dimension, eg. to decimate
+    :param max_workers: optional number of threads, default one per dataset up to MAX_READ_THREADS
+    :return: lines
+    """
+    by_dataset = OrderedDict()
+    for line in lines:
+        for axis in (line["xaxis"], line["yaxis"]):
+            if "data" not in axis and axis.get("type") != "index":
+                by_dataset.setdefault(axis.get("dataset"), []).append((axis, line.get("compact", False)))
+
+    def read_all(axes):
+        for axis, compact in axes:
+            try:
+                axis["data"] = read_axis(axis, get_data, step, compact)
+            except Exception as e:
+                axis["error"] = e
+
+    if len(by_dataset) <= 1:
+        for axes in by_dataset.values():
+            read_all(axes)
+    else:
+        with ThreadPoolExecutor(max_workers=max_workers or min(len(by_dataset), MAX_READ_THREADS)) as pool:
+            list(pool.map(read_all, by_dataset.values()))
+
+    # index axes number the points of y as read, so that with step and flattened dimensions they
+    # still line up with them, see make_index.
+    for line in lines:
+        xaxis, yaxis = line["xaxis"], line["yaxis"]
+        if "data" not in xaxis and "error" not in xaxis and xaxis.get("type") == "index":
+            if "data" in yaxis:
+                width = flattened_width(yaxis)
+                xaxis["data"] = make_index(np.shape(yaxis["data"])[0] // width, width, step)
+            else:
+                xaxis["error"] = yaxis.get("error", ValueError("No y data to index"))
+
+    return lines
+
+
+def check_resolved(line):
+    """ Raise the exception from reading the data of line, if there was one. """
+    for axis in (line["xaxis"], line["yaxis"]):
+        if "error" in axis:
+            raise axis["error"]
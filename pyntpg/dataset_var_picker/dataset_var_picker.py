@@ -4,6 +4,8 @@ import numpy as np
 from PyQt5.QtCore import QCoreApplication, pyqtSlot
 from PyQt5.QtWidgets import QWidget, QComboBox, QVBoxLayout, QLabel, QFormLayout, QSizePolicy
 
+from pyntpg.profiling import span
+
 # from pyntpg.datasets_container import DatasetsContainer
 # from pyntpg.analysis.ipython_console import IPythonConsole
 
@@ -127,12 +129,16 @@ class DatasetVarPicker(QWidget, object):
     def dataset_selected(self, name):
         """ React to the user selecting a dataset by displaying the appropriate variables. """
         self.variable_widget.clear()
-        if name == CONSOLE_TEXT:
-            # When selecting CONSOLE_TEXT, get vars from IPython and connect slots
-            # to update for new variables.
-            self.variable_widget.addItems([v for v in self.ipython.get_plot_vars() if self.show_var_condition(name, v)])
-        else:
-            self.variable_widget.addItems([v for v in self.datasets.list_variables(name) if self.show_var_condition(name, v)])
+        with span("show_var_condition sweep", picker=type(self).__name__, dataset=name) as args:
+            if name == CONSOLE_TEXT:
+                # When selecting CONSOLE_TEXT, get vars from IPython and connect slots
+                # to update for new variables.
+                variables = self.ipython.get_plot_vars()
+            else:
+                variables = self.datasets.list_variables(name)
+            shown = [v for v in variables if self.show_var_condition(name, v)]
+            args.update(variables=len(variables), shown=len(shown))
+        self.variable_widget.addItems(shown)
 
     @pyqtSlot(str, str)
     def show_var_condition(self, dataset, variable):
@@ -200,7 +206,7 @@ class DatasetVarPicker(QWidget, object):
         if dataset == CONSOLE_TEXT:
             shape = np.shape(self.ipython.get_var_value(variable))
         else:
-            shape = np.shape(self.datasets.datasets[dataset].variables[variable])
+            shape = self.datasets.get_variable_metadata(dataset, variable)["shape"]
 
         return shape
 
@@ -213,23 +219,32 @@ class DatasetVarPicker(QWidget, object):
             shape = np.shape(self.ipython.get_var_value(variable))
             names = np.arange(len(shape))
         else:
-            shape = np.shape(self.datasets.datasets[dataset].variables[variable])
-            names = self.datasets.datasets[dataset].variables[variable].dimensions
+            metadata = self.datasets.get_variable_metadata(dataset, variable)
+            shape = metadata["shape"]
+            names = metadata["dimensions"]
 
         return OrderedDict(zip(names, shape))
 
+    def get_units(self, dataset=None, variable=None):
+        """ Get the units of the variable selected.
+        :return: str units, or None if it has none
+        """
+        if dataset is None and variable is None:
+            # if arguments are none, use the current selected.
+            dataset, variable = self.selected()
+
+        if dataset == CONSOLE_TEXT:
+            return getattr(self.get_value(dataset, variable), "units", None)
+        return self.datasets.get_variable_metadata(dataset, variable)["units"] or None
+
     def get_config(self):
         dataset, variable = self.selected()
-        ncvar = self.get_ncvar()
-        if ncvar is not None and hasattr(ncvar, "units"):
-            units = ncvar.units
-        else:
-            units = ""
+        units = self.get_units(dataset, variable) or ""
 
+        # only a reference to the data, it's read when needed, see pyntpg.dataset_var_picker.axis_data
         return {
             "dataset": dataset,
             "variable": variable,
-            "data": self.get_data(),
             "units": units
         }
 
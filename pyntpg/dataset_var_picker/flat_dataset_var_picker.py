@@ -6,6 +6,7 @@ from PyQt5.QtWidgets import QWidget, QVBoxLayout, QSpinBox, QLabel, QCheckBox
 from PyQt5.QtWidgets import QFormLayout
 
 from pyntpg.clear_layout import clear_layout
+from pyntpg.dataset_var_picker.axis_data import get_reshape, read_flat
 from pyntpg.dataset_var_picker.dataset_var_picker import DatasetVarPicker, CONSOLE_TEXT
 from pyntpg.horizontal_pair import HorizontalPair
 from pyntpg.vertical_scroll_area import VerticalScrollArea
@@ -148,8 +149,9 @@ class DimensionFlattenPicker(QWidget):
             shape = np.shape(self.ipython.get_var_value(variable))
             names = np.arange(len(shape))
         else:
-            shape = np.shape(self.datasets.datasets[dataset].variables[variable])
-            names = self.datasets.datasets[dataset].variables[variable].dimensions
+            metadata = self.datasets.get_variable_metadata(dataset, variable)
+            shape = metadata["shape"]
+            names = metadata["dimensions"]
 
         self.shape = shape
         enable_slicing = len(shape) > 1
@@ -216,31 +218,14 @@ class FlatDatasetVarPicker(DatasetVarPicker):
         :param slice_specification: OrderedDict[slice, bool]
         :return: list[int]
         """
-        reshaping = []
-        for i, (the_slice, flatten_condition) in enumerate(slice_specification.values()):
-            dim_len = the_slice.stop - the_slice.start
-            if i == 0:
-                # the first dimension has to just be taken, since there's nothing behind to flatten against.
-                reshaping.append(dim_len)
-            elif flatten_condition or dim_len == 1:
-                # otherwise flatten.
-                # things are either explicitly marked to flatten, or if only size 1
-                # are flattened.
-                reshaping[-1] = reshaping[-1] * dim_len
-            else:
-                reshaping.append(dim_len)
-        return reshaping
+        return get_reshape([the_slice.stop - the_slice.start for the_slice, _ in slice_specification.values()],
+                           [flatten_condition for _, flatten_condition in slice_specification.values()])
 
     def get_data(self, _=None):
         dataset, variable = self.selected()
-        oslices = [v[0] for v in self.slices.values()]
-        data = QCoreApplication.instance().get_data(dataset, variable, oslice=oslices)
-
-        reshaping = self.get_reshape(self.slices)
-        assert len(reshaping) <= len(data.shape), "Reshaping must have fewer dims than data, " \
-                                                  "but found rehape {} vs {}".format(reshaping, data.shape)
-
-        return data.reshape(tuple(reshaping))
+        config = self.get_config()
+        return read_flat(QCoreApplication.instance().get_data, dataset, variable,
+                         config["slices"], config["flatten"])
 
     def get_config(self):
         default = super(FlatDatasetVarPicker, self).get_config()
@@ -253,10 +238,9 @@ class FlatDatasetVarPicker(DatasetVarPicker):
         dim_labels = {}
         # ... TODO
 
+        # and the selection to read, as plain lists so the config stays serializable.
+        default.update({
+            "slices": [[the_slice.start, the_slice.stop] for the_slice, _ in self.slices.values()],
+            "flatten": [flatten_condition for _, flatten_condition in self.slices.values()]
+        })
         return default
-
-
-
-
-
-
@@ -3,7 +3,7 @@ from datetime import datetime, timedelta
 
 import netCDF4 as nc
 import numpy as np
-from PyQt5.QtCore import pyqtSignal, pyqtSlot, QMutex
+from PyQt5.QtCore import QCoreApplication, pyqtSignal, pyqtSlot, QMutex
 from PyQt5.QtWidgets import QWidget, QDateTimeEdit, QFormLayout
 
 try:
@@ -13,16 +13,10 @@ except ImportError:
     # netcdf4 version 1.4.0 removes netcdftime to a separate package "cftime"
     from cftime._cftime import _dateparse
 
+from pyntpg.dataset_var_picker.axis_data import datetime_types, read_datetime
 from pyntpg.dataset_var_picker.dataset_var_picker import CONSOLE_TEXT
 from pyntpg.dataset_var_picker.dataset_var_picker import DatasetVarPicker
 
-try:
-    from cftime import DatetimeGregorian
-    datetime_types = (datetime, DatetimeGregorian)
-except ImportError:
-    # fallback compat if cftime < 1.2.0 installed.
-    datetime_types = (datetime,)
-
 
 def datetime_units(units):
     """ Detect if the str units is a parsable datetime units format. """
@@ -107,9 +101,8 @@ class DatetimePicker(DatasetVarPicker):
             bounds = np.array([np.nanmin(full_data), np.nanmax(full_data)])
 
         if not isinstance(bounds.item(0), datetime_types):
-            value = self.get_value()
             # must have units if not already datetime because of show_var condition
-            bounds = nc.num2date(bounds, value.units)
+            bounds = nc.num2date(bounds, self.get_units(dataset, variable))
 
         # super annoying... cftime 1.2.0 returns a custom type that does not
         # inherit from datetime, so it bascially can't be passed to ANYTHING
@@ -153,48 +146,27 @@ class DatetimePicker(DatasetVarPicker):
         if not np.prod(list(dimensions.values())) == self.target_len:
             return False
 
-        value = self.get_value(dataset, variable)
+        units = self.get_units(dataset, variable)
         if dataset == CONSOLE_TEXT:
-            return ((hasattr(value, "units") and datetime_units(value.units))
-                    or isinstance(np.array(value).item(0), datetime_types))
+            return ((units is not None and datetime_units(units))
+                    or isinstance(np.array(self.get_value(dataset, variable)).item(0), datetime_types))
         else:
             # separate these out so don't try to read from the netcdf here.
-            return hasattr(value, "units") and datetime_units(value.units)
+            return units is not None and datetime_units(units)
 
     def get_data(self, _=None):
-        num_dims = len(self.get_original_shape())
-        oslices = [v[0] for v in self.slices.values()]
-
-        data = super(DatetimePicker, self).get_data(oslice=oslices[:num_dims])
-        mask = np.ma.getmaskarray(data)  # hopefully none!
-
-        if not isinstance(data.item(0), datetime_types):
-            # not datetime already, convert through num2date
-            # by assumption value has a units attribute since
-            # show_var_condition, would not allow the variable to be displayed
-            # unless it was already a datetime or had num2date parseable units field
-            value = self.get_value()
-            data = nc.num2date(data, value.units)
-
-        if len(self.slices) > 1:
-            data = data.flatten()
-            mask = mask.flatten()
-
-        start_bound_dt = self.start_time.dateTime().toPyDateTime()
-        end_bound_dt = self.end_time.dateTime().toPyDateTime()
-
-        if np.any(mask):
-            # if any data values are masked, must go through and remove the Nones from the data array...
-            # the None values are introduced by the nc.num2date call on masked elements
-            mask_date_detector = np.vectorize(lambda x: x is None or x < start_bound_dt or x > end_bound_dt)
-            return np.ma.masked_where(mask_date_detector(data), data)
-        else:
-            # otherwise, this approach seems to be much more efficient.
-            return np.ma.masked_where((data < start_bound_dt) | (data > end_bound_dt), data)
+        config = self.get_config()
+        return read_datetime(QCoreApplication.instance().get_data, config["dataset"], config["variable"],
+                             config["units"], config["slices"], config["start"], config["end"])
 
     def get_config(self):
         default = super(DatetimePicker, self).get_config()
-        default.update({"type": "datetime"})
+        num_dims = len(self.get_original_shape())
+        default.update({
+            "type": "datetime",
+            "units": self.get_units(),
+            "slices": [[the_slice.start, the_slice.stop] for the_slice, _ in self.slices.values()][:num_dims],
+            "start": self.start_time.dateTime().toPyDateTime(),
+            "end": self.end_time.dateTime().toPyDateTime()
+        })
         return default
-
-
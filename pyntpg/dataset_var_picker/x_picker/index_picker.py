@@ -1,4 +1,3 @@
-import numpy as np
 from PyQt5.QtCore import pyqtSlot, QMutex
 from PyQt5.QtWidgets import QWidget, QFormLayout, QSpinBox
 
@@ -47,7 +46,7 @@ class IndexPicker(QWidget):
     def get_config(self):
         return {
             "type": "index",
-            "data": np.arange(self.end_index.maximum())
+            "length": self.end_index.maximum()
         }
 
 
@@ -1,22 +1,48 @@
+import os
+import threading
+from collections import OrderedDict
+
 import netCDF4 as nc
 from PyQt5.QtCore import QObject, pyqtSignal, pyqtSlot
 
+from pyntpg.profiling import span
+from pyntpg.worker_thread import WorkerThread
+
+# The netCDF C library is not thread safe, even across different files, so any call into it
+# that might happen concurrently with another thread (eg. reading data to plot on a thread pool)
+# must hold this lock.
+netcdf_lock = threading.RLock()
+
 
 class DatasetsContainer(QObject):
 
     sig_rename = pyqtSignal(str, str)   # dataset renamed (from, to)
-    sig_opened = pyqtSignal(str)        # new dataset opened
+    sig_opened = pyqtSignal(str)        # new dataset opened, and its metadata scanned
+    sig_error = pyqtSignal(str, str)    # dataset couldn't be opened (name, message)
     sig_closed = pyqtSignal(str)        # dataset closed
+    sig_refreshed = pyqtSignal(str)     # dataset reopened because its file changed, see refresh
 
     def __init__(self):
         super(DatasetsContainer, self).__init__()
         self.datasets = {}  # datasets opened from netcdf files
+        self.deferred = {}  # datasets known but not opened until needed, name -> function to open it
+        self.stats = {}  # name -> (mtime, size) of the file of each dataset when opened, see refresh
+        self.metadata = {}  # name -> summary of the dimensions and variables of each dataset, see scan_metadata
+        self.opening = {}  # name -> WorkerThread opening the dataset in the background
+        # every WorkerThread started by open, until its result is delivered: superseded, closed or waited
+        # for ones too, Qt aborts if a running QThread is garbage collected, and crashes delivering the
+        # result of one that was.
+        self.workers = set()
 
     @pyqtSlot(str, str)
     def open(self, name, path):
         """
         Open a new dataset with name and path to file. Closes a dataset if path is empty.
 
+        The file is opened, and its header scanned, on a background thread so that slow filesystems
+        or big headers don't freeze the interface. sig_opened is emitted when that's done, or sig_error
+        if the file couldn't be opened. See wait to block until then.
+
         Note: this could be an existing dataset with a new file, or a never before seen dataset.
 
         :param name: string name of dataset
@@ -26,11 +52,114 @@ class DatasetsContainer(QObject):
         if path == "":
             self.close(name)
         else:
-            try:
-                self.datasets[name] = nc.Dataset(path)
-            except IOError:
-                return  # user probably tried to open a non-netcdf file..
-            self.sig_opened.emit(name)
+            worker = WorkerThread(lambda: open_and_scan(name, path))
+            worker.finished.connect(lambda result: self.delivered(worker, result))
+            self.workers.add(worker)
+            self.opening[name] = worker  # replaces, so ignores the result of, any previous open still going
+            worker.start()
+
+    def delivered(self, worker, result):
+        """ Take the result of a WorkerThread started by open, see opened. """
+        self.workers.discard(worker)
+        self.opened(worker, result)
+
+    def opened(self, worker, result):
+        """
+        Take the result of opening a dataset in the background, if it's still wanted.
+
+        :param worker: the WorkerThread that opened it
+        :param result: tuple of (netCDF4.Dataset, metadata, file stat), or the exception opening it
+        :return: None
+        """
+        worker.wait()  # result is emitted at the very end of run, it's done or just about
+        names = [name for name, opening in self.opening.items() if opening is worker]
+        if not names:
+            # superseded by another open, closed, or already taken by wait.
+            if not isinstance(result, Exception) and result[0] not in self.datasets.values():
+                with netcdf_lock:
+                    if result[0].isopen():  # eg. taken by wait, then replaced by another open
+                        result[0].close()
+            return
+        name = names[0]
+        self.opening.pop(name)
+        if isinstance(result, Exception):
+            self.sig_error.emit(name, repr(result))  # user probably tried to open a non-netcdf file..
+            return
+        previous = self.datasets.get(name)
+        if previous is not None and previous is not result[0]:
+            # the dataset was opened from another file, nothing reads from the previous handle any more
+            with netcdf_lock:
+                if previous.isopen():
+                    previous.close()
+        self.datasets[name], self.metadata[name], self.stats[name] = result
+        self.sig_opened.emit(name)
+
+    def wait(self, names):
+        """
+        Block until the datasets named that are being opened in the background are opened.
+
+        :param names: iterable of string names of datasets
+        :return: None
+        """
+        for name in names:
+            worker = self.opening.get(name)
+            if worker is not None:
+                worker.wait()
+                self.opened(worker, worker.result)
+
+    def refresh(self, name):
+        """
+        Reopen a dataset if its file changed since it was opened, eg. because records are being appended
+        to it, so that reads see the new records (netCDF4 files don't otherwise). The previous handle
+        has to be closed first, HDF5 would otherwise reuse it, so anything keeping a reference to it
+        (eg. the IPython console) should pick up the new one on sig_refreshed.
+
+        :param name: string name of dataset
+        :return: True if reopened
+        """
+        if name not in self.datasets:
+            return False  # eg. console variables
+        with netcdf_lock:
+            path = self.datasets[name].filepath()
+        try:
+            stat = file_stat(path)
+            if stat == self.stats.get(name):
+                return False
+            with span("refresh dataset", dataset=name, path=path):
+                with netcdf_lock:
+                    if self.datasets[name].isopen():
+                        self.datasets[name].close()
+                    self.datasets[name] = nc.Dataset(path)
+                self.metadata[name] = scan_metadata(self.datasets[name])
+        except IOError:
+            return False  # eg. mid write, try again next time
+        self.stats[name] = stat
+        self.sig_refreshed.emit(name)
+        return True
+
+    def defer(self, name, opener):
+        """
+        Register a dataset whose files are known, but which shouldn't be opened (or aggregated) until
+        it's actually needed, eg. when restoring a saved session. See require.
+
+        :param name: string name of dataset
+        :param opener: function to call to open the dataset, expected to end up calling open
+        :return: None
+        """
+        self.deferred[name] = opener
+
+    def require(self, names):
+        """
+        Make sure the datasets named are opened, if any of them were deferred.
+
+        :param names: iterable of string names of datasets
+        :return: None
+        """
+        for name in names:
+            opener = self.deferred.pop(name, None)
+            if opener is not None:
+                opener()
+        self.wait(names)
 
     @pyqtSlot(str, str)
     def rename(self, before, after):
@@ -43,6 +172,11 @@ class DatasetsContainer(QObject):
         """
         # check that before is in keys, in case of, eg dataset rename
         # before any files have been opened...
+        if before in self.deferred.keys():
+            self.deferred[after] = self.deferred.pop(before)
+        for by_name in (self.stats, self.metadata, self.opening):
+            if before in by_name.keys():
+                by_name[after] = by_name.pop(before)
         if before in self.datasets.keys():
             self.datasets[after] = self.datasets.pop(before)
             self.sig_rename.emit(before, after)
@@ -56,10 +190,26 @@ class DatasetsContainer(QObject):
         :return: None
         """
         # here too, tab can be closed before any data was ever opened in it.
+        self.deferred.pop(name, None)
+        self.stats.pop(name, None)
+        self.metadata.pop(name, None)
+        self.opening.pop(name, None)  # result is dropped when it arrives
         if name in self.datasets.keys():
             self.datasets.pop(name)
             self.sig_closed.emit(name)
 
+    def get_variable_metadata(self, name, variable):
+        """
+        Describe a variable of a dataset from the header scanned when it was opened (see scan_metadata),
+        rather than asking the netCDF variable: that's slow with many variables, and would need
+        netcdf_lock, so wait on reads on other threads.
+
+        :param name: string name of dataset
+        :param variable: string name of variable
+        :return: dict of "dimensions", "shape", "dtype", "units", "chunking", "compression" and "nbytes"
+        """
+        return self.metadata[name]["variables"][variable]
+
     def list_datasets(self):
         # type: () -> list[str]
         """
@@ -86,3 +236,84 @@ class DatasetsContainer(QObject):
             return []
 
 
+def open_and_scan(name, path):
+    """
+    Open a netCDF file and scan its metadata, eg. on a background thread.
+
+    :param name: name of the dataset being opened
+    :param path: path to the file
+    :return: tuple of (netCDF4.Dataset, metadata, file stat), or the exception if it couldn't be opened
+    """
+    try:
+        with span("open dataset", dataset=name, path=path):
+            with netcdf_lock:
+                dataset = nc.Dataset(path)
+            return dataset, scan_metadata(dataset), file_stat(path)
+    except Exception as e:
+        return e
+
+
+def scan_metadata(dataset):
+    """
+    Summarize the header of an open dataset, so it's read once when opened instead of by everything
+    that wants to describe the dataset. netcdf_lock is taken for each variable rather than for the whole
+    scan, so that reads on other threads (eg. the GUI thread) aren't held up until a big header is done.
+
+    :param dataset: netCDF4.Dataset
+    :return: dict with "dimensions": {name: {"size", "unlimited"}} and
+        "variables": {name: {"dimensions", "shape", "dtype", "units", "chunking", "compression", "nbytes"}},
+        in file order, see scan_storage for the last three
+    """
+    # the length of each dimension is found once. Variable.shape asks for them again for each variable,
+    # and the length of an unlimited dimension is found by going through every variable, so with
+    # thousands of variables that's minutes instead of a fraction of a second.
+    with netcdf_lock:
+        sizes = OrderedDict((name, len(dimension)) for name, dimension in dataset.dimensions.items())
+        dimensions = OrderedDict((name, {
+            "size": sizes[name],
+            "unlimited": dimension.isunlimited(),
+        }) for name, dimension in dataset.dimensions.items())
+    variables = OrderedDict()
+    for name, variable in dataset.variables.items():
+        with netcdf_lock:
+            variables[name] = dict({
+                "dimensions": variable.dimensions,
+                "shape": tuple(sizes[dimension] for dimension in variable.dimensions),
+                "dtype": str(variable.dtype),
+                "units": getattr(variable, "units", ""),
+            }, **scan_storage(variable, sizes))
+    return {"dimensions": dimensions, "variables": variables}
+
+
+def scan_storage(variable, sizes):
+    """
+    How a variable is stored: "chunking", the chunk shape or None if contiguous, "compression", the
+    filters applied, eg. "zlib 7, shuffle", or "" if none, and "nbytes", its size uncompressed (the
+    netCDF library doesn't tell the size on disk).
+
+    :param variable: netCDF4.Variable
+    :param sizes: dict of the length of each dimension of the dataset
+    :return: dict
+    """
+    try:
+        chunking = variable.chunking()
+        filters = variable.filters() or {}
+    except (AttributeError, RuntimeError):
+        chunking, filters = "contiguous", {}  # eg. netCDF3 files, no chunking or filters
+    compression = [name for name, enabled in filters.items() if enabled is True]
+    if filters.get("zlib"):
+        compression[compression.index("zlib")] = "zlib %s" % filters.get("complevel")
+    size = 1
+    for dimension in variable.dimensions:
+        size *= sizes[dimension]
+    return {
+        "chunking": None if chunking == "contiguous" else list(chunking),
+        "compression": ", ".join(compression),
+        "nbytes": size * variable.dtype.itemsize if hasattr(variable.dtype, "itemsize") else None,
+    }
+
+
+def file_stat(path):
+    """ The modification time and size of file path, to tell if it changed. """
+    stat = os.stat(path)
+    return stat.st_mtime, stat.st_size
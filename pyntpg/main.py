@@ -1,4 +1,3 @@
-import inspect
 import logging
 import sys
 
@@ -8,20 +7,27 @@ from PyQt5.QtGui import QFont, QFontMetrics
 from PyQt5.QtGui import QKeySequence
 # Qt Imports
 from PyQt5.QtWidgets import QApplication, QMainWindow, QStyleFactory, QShortcut
-from PyQt5.QtWidgets import QMenu, QInputDialog, QSplitter
+from PyQt5.QtWidgets import QMenu, QInputDialog, QSplitter, QFileDialog, QMessageBox
 
 import pyntpg.analysis as analysis
-from pyntpg.analysis.ipython_console import IPythonConsole
+from pyntpg.analysis.console_proxy import ConsoleProxy
 # project imports
 from pyntpg.dataset_tabs.main_widget import DatasetTabs
 from pyntpg.dataset_var_picker.dataset_var_picker import CONSOLE_TEXT
-from pyntpg.datasets_container import DatasetsContainer
+from pyntpg.datasets_container import DatasetsContainer, netcdf_lock
 from pyntpg.plot_tabs.layout_picker import DimesnionChangeDialog
 from pyntpg.plot_tabs.main_widget import PlotTabs
 from pyntpg.plot_tabs.panel_configurer import PanelConfigurer
+from pyntpg.plot_tabs.plot_tab import PlotTab
+from pyntpg.plot_tabs.tab_config import dump_tab_config, load_tab_config, used_variables
+from pyntpg import memory_ledger, profiling
+from pyntpg.profiling import span
 
 logger = logging.getLogger(__name__)
 
+# plot sessions are saved as tab configs, see pyntpg.plot_tabs.tab_config
+SESSION_FILE_FILTER = "pyntpg session (*.json)"
+
 
 
 class MainWindow(QMainWindow):
@@ -52,6 +58,8 @@ class MainWindow(QMainWindow):
         self.setCentralWidget(main_widget)
 
         self.wizard = None
+        self.profiling_window = None
+        self.memory_window = None
 
         # The menus have to be after the tabs were set up.
         self.make_menus()
@@ -65,14 +73,17 @@ class MainWindow(QMainWindow):
         menu_file.addAction("&New dataset", lambda: self.dataset_tabs.tab_changed(-1))
         menu_file.addAction("&New plot", lambda: self.plot_tabs.tab_changed(-1))
         menu_file.addSeparator()
+        menu_file.addAction("&Open plot session", self.open_session)
+        menu_file.addAction("&Save plot session", self.save_session)
+        menu_file.addSeparator()
         menu_file.addAction("&Quit", lambda: exit(0), Qt.CTRL + Qt.Key_Q)
         self.menuBar().addMenu(menu_file)
 
         # Edit menu
         menu_analysis = QMenu("&Analysis", self)
         menu_analysis.addAction("&Open IPython console", self.open_ipython)
-        for k, v in inspect.getmembers(analysis, inspect.isclass):
-            menu_analysis.addAction(k, lambda wiz=v: self.show_wizard(wiz))
+        for name in analysis.WIZARDS:
+            menu_analysis.addAction(name, lambda name=name: self.show_wizard(analysis.load_wizard(name)))
 
         self.menuBar().addMenu(menu_analysis)
 
@@ -80,6 +91,7 @@ class MainWindow(QMainWindow):
         # things are moved around at all.
         menu_dataset = QMenu("&Dataset", self)
         menu_dataset.addAction("Open files", self.dataset_tabs.currentWidget().filepicker.add_file_clicked)
+        menu_dataset.addAction("Open directory", self.dataset_tabs.currentWidget().filepicker.add_directory_clicked)
         menu_dataset.addAction("Change dataset variable name", self.dataset_tabs.tabBar().mouseDoubleClickEvent)
         menu_dataset.addAction("Refresh preview", self.dataset_tabs.currentWidget().filepicker.emit_file_list)
         self.menuBar().addMenu(menu_dataset)
@@ -89,10 +101,19 @@ class MainWindow(QMainWindow):
         menu_plot.addAction("Change plot title", self.plot_tabs.tabBar().mouseDoubleClickEvent)
         menu_plot.addAction("Change layout dims", self.change_layout_dims)
         menu_plot.addAction("Set preview decimation", self.set_preview_decimation)
+        menu_plot.addAction("Follow files of latest plot", self.toggle_follow)
+        menu_plot.addAction("Set follow interval", self.set_follow_interval)
+        menu_plot.addSeparator()
+        menu_plot.addAction("Set memory budget", self.set_memory_budget)
+        menu_plot.addAction("Show memory usage", self.show_memory)
         self.menuBar().addMenu(menu_plot)
 
         # Help menu
         menu_help = QMenu("&Help", self)
+        action_profile = menu_help.addAction("Enable profiling", profiling.set_enabled)
+        action_profile.setCheckable(True)
+        action_profile.setChecked(profiling.enabled)
+        menu_help.addAction("Show profiling", self.show_profiling)
         self.menuBar().addMenu(menu_help)
 
     def change_layout_dims(self):
@@ -109,6 +130,82 @@ class MainWindow(QMainWindow):
         if result:
             PanelConfigurer.preview_decimation = result
 
+    def toggle_follow(self):
+        """ Slot for the menu option to start/stop following the files of the latest plot of the current tab.
+        :return: None
+        """
+        plot_tab = self.plot_tabs.currentWidget().widget()
+        if plot_tab.plot_widget is not None:
+            plot_tab.toggle_follow(plot_tab.plot_widget)
+
+    def set_follow_interval(self):
+        result, ok = QInputDialog.getDouble(None, "set follow interval", "check for new records every (s)",
+                                            PlotTab.follow_interval, 0.1, 86400., 1)
+        if ok:
+            PlotTab.follow_interval = result
+
+    def set_memory_budget(self):
+        """ Slot for the menu option to set the memory budget for plot data, see pyntpg.memory_ledger.
+        :return: None
+        """
+        result, ok = QInputDialog.getInt(None, "set memory budget", "budget for plot data (MB)",
+                                         memory_ledger.budget // 1024 ** 2, 1)
+        if ok:
+            memory_ledger.set_budget(result * 1024 ** 2)
+
+    def show_memory(self):
+        """ Slot for the menu option to show the memory held by plot data, see pyntpg.memory_ledger.
+        :return: None
+        """
+        from pyntpg.memory_window import MemoryWindow
+        if self.memory_window is None:
+            self.memory_window = MemoryWindow()
+        self.memory_window.show()
+        self.memory_window.raise_()
+
+    def save_session(self):
+        """ Save the current plot tab, and the files of the datasets, to a session file.
+        Only references to the data are saved, see pyntpg.plot_tabs.tab_config.
+        :return: None
+        """
+        path = QFileDialog.getSaveFileName(self, "Save plot session", "", SESSION_FILE_FILTER)[0]
+        if path:
+            config = self.plot_tabs.currentWidget().widget().get_tab_config()
+            config["datasets"] = self.dataset_tabs.get_datasets()
+            config["variables"] = self.dataset_tabs.get_variables()
+            with open(path, "w") as f:
+                dump_tab_config(config, f)
+
+    def open_session(self, path=None):
+        """ Restore a session file saved by save_session into a new plot tab. The datasets
+        aren't opened until they're needed, ie. when the plot is made or their tab is shown, and
+        those made of many files are aggregated with only the variables the session uses.
+        :param path: optional path to session file, otherwise asked for
+        :return: None
+        """
+        if not path:
+            path = QFileDialog.getOpenFileName(self, "Open plot session", "", SESSION_FILE_FILTER)[0]
+        if path:
+            try:
+                with open(path) as f:
+                    config = load_tab_config(f)
+            except (IOError, ValueError) as e:
+                QMessageBox.warning(self, "Open plot session", "Could not open {}: {}".format(path, e))
+                return
+            self.dataset_tabs.defer_datasets(config.get("datasets", {}), used_variables(config))
+            self.plot_tabs.tab_changed(-1)
+            self.plot_tabs.currentWidget().widget().set_tab_config(config)
+
+    def show_profiling(self):
+        """ Slot for the menu option to show the live table of profiling spans, see pyntpg.profiling.
+        :return: None
+        """
+        from pyntpg.profiling_window import ProfilingWindow
+        if self.profiling_window is None:
+            self.profiling_window = ProfilingWindow()
+        self.profiling_window.show()
+        self.profiling_window.raise_()
+
     def show_wizard(self, wiz):
         self.wizard = wiz()
         self.wizard.show()
@@ -151,7 +248,7 @@ class Application(QApplication):
                            % {"max_height": max_height, "min_height": min_height})
 
         self.datasets = DatasetsContainer()
-        self.ipython = IPythonConsole()
+        self.ipython = ConsoleProxy()  # the console itself is only started when first shown
         self.window = MainWindow(ipython=self.ipython)
 
     def notify(self, receiver, event):
@@ -182,11 +279,32 @@ class Application(QApplication):
         :param oslice: Optional slice to apply retrieving data
         :return: List of values
         """
-        # TODO: is this thread safe?
+        # may be called from several threads at once, see pyntpg.dataset_var_picker.axis_data.resolve_lines
+        with span("get_data", dataset=dataset, variable=variable) as args:
+            if dataset == CONSOLE_TEXT:
+                data = np.array(self.ipython.get_var_value(variable))[oslice]
+            else:
+                with netcdf_lock:
+                    data = self.datasets.datasets[dataset].variables[variable][oslice]
+            args.update(bytes=data.nbytes, shape=data.shape)
+        return data
+
+    def get_variable_info(self, dataset, variable):
+        """ Get the shape and dtype of a variable without reading it, eg. to estimate memory needed.
+
+        :param dataset: name of dataset, or CONSOLE_TEXT
+        :param variable: name of variable
+        :return: tuple of shape tuple and numpy dtype
+        """
         if dataset == CONSOLE_TEXT:
-            return np.array(self.ipython.get_var_value(variable))[oslice]
-        else:
-            return self.datasets.datasets[dataset].variables[variable][oslice]
+            value = np.asarray(self.ipython.get_var_value(variable))
+            return value.shape, value.dtype
+        value = self.datasets.get_variable_metadata(dataset, variable)
+        try:
+            dtype = np.dtype(value["dtype"])
+        except TypeError:
+            dtype = np.dtype(object)  # variable length strings, "<class 'str'>"
+        return value["shape"], dtype
 
 
 # from http://pyqt.sourceforge.net/Docs/PyQt5/gotchas.html#crashes-on-exit
@@ -199,8 +317,9 @@ class Application(QApplication):
 app = None
 def main():
     global app
-    app = Application(sys.argv)
-    app.show()
+    with span("startup"):
+        app = Application(sys.argv)
+        app.show()
     exit(app.exec_())
 
 
@@ -0,0 +1,199 @@
+"""
+Accounting of the memory held by the data behind plots. The data of each line drawn is recorded
+against the window it's drawn in (a plot window or a preview) and released when the window closes,
+so the ledger can show the bytes held per line, per window and per dataset the data was read from.
+Memory held elsewhere, eg. variables in the IPython console, is included through sources.
+
+Before reading the data for a plot, the bytes it will take are estimated from the shapes and dtypes
+of the variables (see estimate_nbytes). If that would go over the budget, the data is read decimated
+instead (see decimation). The budget is set with the environment variable PYNTPG_MEMORY_BUDGET (in
+MB) or from the Plot menu, and defaults to DEFAULT_BUDGET_FRACTION of the physical memory.
+"""
+import math
+import os
+import sys
+from datetime import datetime
+
+import numpy as np
+
+ENV_VAR = "PYNTPG_MEMORY_BUDGET"
+
+DEFAULT_BUDGET_FRACTION = 0.25  # of physical memory
+FALLBACK_BUDGET = 2 * 1024 ** 3  # bytes, if the physical memory can't be found
+# once the budget is used up, new plots are still decimated to fit this fraction of it rather than refused.
+MIN_AVAILABLE_FRACTION = 0.05
+
+# datetime axes are object arrays, each element a pointer to a datetime (or cftime) object.
+DATETIME_NBYTES = np.dtype(object).itemsize + sys.getsizeof(datetime.now())
+
+
+def get_default_budget():
+    """ DEFAULT_BUDGET_FRACTION of the physical memory, in bytes. """
+    try:
+        return int(os.sysconf("SC_PAGE_SIZE") * os.sysconf("SC_PHYS_PAGES") * DEFAULT_BUDGET_FRACTION)
+    except (AttributeError, ValueError, OSError):
+        return FALLBACK_BUDGET  # eg. on windows, no sysconf
+
+
+budget = int(float(os.environ[ENV_VAR]) * 1024 ** 2) if os.environ.get(ENV_VAR) else get_default_budget()
+
+# owner (eg. a PlotWidget) -> {"name": name to show, "lines": {line key -> {"label": str, "datasets": {name: bytes}}}}
+entries = {}
+
+# name -> function returning dict of {item name: bytes}, for memory held outside of plots.
+sources = {}
+
+
+def set_budget(nbytes):
+    global budget
+    budget = int(nbytes)
+
+
+def add_source(name, fn):
+    """ Include the memory reported by fn, a function returning {item name: bytes}, as name. """
+    sources[name] = fn
+
+
+def data_nbytes(data):
+    """ Bytes held by an array read for an axis, including its mask and, for datetimes, the objects. """
+    if data is None or isinstance(data, range):
+        return 0  # index axes are ranges, see pyntpg.dataset_var_picker.axis_data.read_axis
+    nbytes = np.size(data) * (DATETIME_NBYTES if np.asarray(data).dtype == object else np.asarray(data).itemsize)
+    mask = np.ma.getmask(data)
+    if mask is not np.ma.nomask:
+        nbytes += mask.nbytes
+    return nbytes
+
+
+def line_datasets_nbytes(line):
+    """ Bytes of the data read for each axis of a resolved line config, by dataset read from.
+    :param line: line config, see pyntpg.dataset_var_picker.axis_data
+    :return: dict {dataset name: bytes}
+    """
+    datasets = {}
+    for axis in (line["xaxis"], line["yaxis"]):
+        dataset = axis.get("dataset") or ""  # index axes aren't read from a dataset
+        datasets[dataset] = datasets.get(dataset, 0) + data_nbytes(axis.get("data"))
+    return datasets
+
+
+def record(owner, name, lines):
+    """
+    Record the data of resolved lines as held by owner, replacing what was recorded for the same lines.
+
+    :param owner: hashable, eg. the PlotWidget drawing the lines
+    :param name: name of owner to show
+    :param lines: list of resolved line configs, keyed by their "line-id" if they have one
+    :return: None
+    """
+    entry = entries.setdefault(owner, {"name": name, "lines": {}})
+    for line in lines:
+        entry["lines"][line.get("line-id", line.get("label"))] = {
+            "label": line.get("label", ""),
+            "datasets": line_datasets_nbytes(line)
+        }
+
+
+def grow(owner, lines):
+    """ Add the data of resolved lines to what's recorded for the same lines held by owner, eg. records
+    appended to lines already drawn. """
+    entry = entries.get(owner)
+    if entry is None:
+        return
+    for line in lines:
+        recorded = entry["lines"].get(line.get("line-id", line.get("label")))
+        if recorded is None:
+            continue
+        for dataset, nbytes in line_datasets_nbytes(line).items():
+            recorded["datasets"][dataset] = recorded["datasets"].get(dataset, 0) + nbytes
+
+
+def release(owner, line_keys=None):
+    """ Forget the data held by owner, or only that of the lines with line_keys. """
+    if line_keys is None:
+        entries.pop(owner, None)
+    elif owner in entries:
+        for key in line_keys:
+            entries[owner]["lines"].pop(key, None)
+
+
+def get_sources():
+    """ Get the memory reported by each of the sources, {source name: {item name: bytes}}. """
+    reported = {}
+    for name, fn in sources.items():
+        try:
+            reported[name] = fn()
+        except Exception:
+            reported[name] = {}  # a broken source shouldn't stop plotting
+    return reported
+
+
+def used(exclude=None):
+    """ Total bytes recorded and reported by sources, optionally excluding what's held by owner exclude. """
+    return (sum(nbytes for owner, entry in entries.items() if owner is not exclude
+                for line in entry["lines"].values() for nbytes in line["datasets"].values())
+            + sum(nbytes for items in get_sources().values() for nbytes in items.values()))
+
+
+def by_dataset():
+    """ Total bytes recorded for the data read from each dataset, {dataset name: bytes}. """
+    datasets = {}
+    for entry in entries.values():
+        for line in entry["lines"].values():
+            for dataset, nbytes in line["datasets"].items():
+                if dataset:
+                    datasets[dataset] = datasets.get(dataset, 0) + nbytes
+    return datasets
+
+
+def estimate_nbytes(lines, get_variable_info):
+    """
+    Estimate the bytes it will take to resolve lines, from the shapes and dtypes of their variables,
+    without reading anything. Axes already resolved aren't counted.
+
+    :param lines: list of line configs
+    :param get_variable_info: function (dataset, variable) -> (shape, dtype), eg. Application.get_variable_info
+    :return: estimated bytes
+    """
+    nbytes = 0
+    for line in lines:
+        for axis in (line["xaxis"], line["yaxis"]):
+            if "data" in axis:
+                continue
+            if axis.get("type") == "index":
+                continue  # read as a range, nothing held
+            try:
+                shape, dtype = get_variable_info(axis["dataset"], axis["variable"])
+            except (KeyError, ValueError):
+                continue  # it'll fail when read instead
+            slices = axis.get("slices") or [[0, None]] * len(shape)
+            size = 1
+            for (start, stop), length in zip(slices, shape):
+                size *= len(range(*slice(start, stop).indices(length)))
+            itemsize = np.dtype(dtype).itemsize
+            if line.get("compact"):
+                # see pyntpg.dataset_var_picker.axis_data.compact_array and as_datetime64
+                if axis.get("type") == "datetime":
+                    itemsize = 8
+                elif np.dtype(dtype).kind == "f":
+                    itemsize = min(itemsize, 4)
+            elif axis.get("type") == "datetime":
+                itemsize = DATETIME_NBYTES
+            nbytes += size * itemsize
+    return nbytes
+
+
+def decimation(estimate, exclude=None):
+    """
+    Get the step along the first dimension to read with so that data estimated to take estimate bytes
+    fits in what's left of the budget.
+
+    :param estimate: bytes, see estimate_nbytes
+    :param exclude: optional owner whose data will be released, eg. a window being redrawn
+    :return: int step, or None if everything fits
+    """
+    available = budget - used(exclude=exclude)
+    if estimate <= available:
+        return None
+    available = max(available, budget * MIN_AVAILABLE_FRACTION, 1)
+    return max(2, int(math.ceil(float(estimate) / available)))
@@ -0,0 +1,75 @@
+from PyQt5.QtCore import Qt, QTimer
+from PyQt5.QtGui import QKeySequence
+from PyQt5.QtWidgets import QWidget, QVBoxLayout, QTreeWidget, QTreeWidgetItem, QLabel, QShortcut, QHeaderView
+
+from pyntpg import memory_ledger
+
+REFRESH_INTERVAL = 1000  # milliseconds between refreshes of the tree
+COLUMNS = ["held by", "MB"]
+
+
+def megabytes(nbytes):
+    return "{:.1f}".format(nbytes / 1024. ** 2)
+
+
+class MemoryWindow(QWidget):
+    """ Live view of pyntpg.memory_ledger: the memory held by the data of each line, by each plot
+    window, from each dataset, and by the other sources, against the budget.
+    """
+
+    def __init__(self):
+        super(MemoryWindow, self).__init__()
+        self.setWindowTitle("pyntpg memory")
+        self.layout = QVBoxLayout()
+        self.setLayout(self.layout)
+
+        self.status = QLabel()
+        self.layout.addWidget(self.status)
+
+        self.tree = QTreeWidget()
+        self.tree.setHeaderLabels(COLUMNS)
+        self.tree.header().setSectionResizeMode(0, QHeaderView.Stretch)
+        self.tree.header().setStretchLastSection(False)
+        self.layout.addWidget(self.tree)
+
+        QShortcut(QKeySequence("Ctrl+W"), self, self.close)
+
+        self.timer = QTimer(self)
+        self.timer.timeout.connect(self.refresh)
+        self.timer.start(REFRESH_INTERVAL)
+        self.refresh()
+
+    def add_group(self, name, items):
+        """ Add a top level item name with a child for each of items, a list of (name, bytes). """
+        group = QTreeWidgetItem([name, megabytes(sum(nbytes for _, nbytes in items))])
+        group.setTextAlignment(1, Qt.AlignRight)
+        for item_name, nbytes in items:
+            child = QTreeWidgetItem([item_name, megabytes(nbytes)])
+            child.setTextAlignment(1, Qt.AlignRight)
+            group.addChild(child)
+        self.tree.addTopLevelItem(group)
+        return group
+
+    def refresh(self):
+        used = memory_ledger.used()
+        self.status.setText("Using {} of {} MB budget".format(megabytes(used), megabytes(memory_ledger.budget)))
+
+        # keep the groups the user expanded, expanded.
+        expanded = set(self.tree.topLevelItem(i).text(0) for i in range(self.tree.topLevelItemCount())
+                       if self.tree.topLevelItem(i).isExpanded())
+        self.tree.clear()
+        groups = [("Window: {}".format(entry["name"]),
+                   [(line["label"], sum(line["datasets"].values())) for line in entry["lines"].values()])
+                  for entry in memory_ledger.entries.values()]
+        groups.append(("Datasets", sorted(memory_ledger.by_dataset().items())))
+        groups.extend((name, sorted(items.items())) for name, items in memory_ledger.get_sources().items())
+        for name, items in groups:
+            self.add_group(name, items).setExpanded(name in expanded)
+
+    def closeEvent(self, event):
+        self.timer.stop()
+        super(MemoryWindow, self).closeEvent(event)
+
+    def showEvent(self, event):
+        self.timer.start(REFRESH_INTERVAL)
+        super(MemoryWindow, self).showEvent(event)
@@ -145,6 +145,21 @@ class LayoutPicker(QWidget):
                 width_ratios.append(width_ratio)
         return {"height_ratios": height_ratios, "width_ratios": width_ratios}
 
+    def set_gridspec(self, specs):
+        """ The inverse of create_gridspec, lay out the panels to match the height_ratios
+        and width_ratios in specs, eg. when restoring a saved plot tab.
+        :param specs: dict of height_ratios and width_ratios, as from create_gridspec
+        :return: None
+        """
+        nrows = len(specs["height_ratios"])
+        ncols = max(len(width_ratio) for width_ratio in specs["width_ratios"])
+        self.make_splitters(ncols, nrows)
+        self.vsplitter.setSizes(specs["height_ratios"])
+        for i, width_ratio in enumerate(specs["width_ratios"]):
+            # rows with fewer panels have the rest closed, ie. zero width.
+            self.vsplitter.widget(i).setSizes(width_ratio + [0] * (ncols - len(width_ratio)))
+        self.recalculate_visible_vertical()
+
 
 class DimesnionChangeDialog(QDialog):
     def __init__(self):
@@ -1,9 +1,13 @@
 import copy
 
 from PyQt5.Qt import QCursor
-from PyQt5.QtWidgets import QAction, QListWidgetItem, QMenu, QInputDialog
+from PyQt5.QtCore import pyqtSignal
+from PyQt5.QtGui import QColor
+from PyQt5.QtWidgets import QAction, QListWidgetItem, QMenu, QInputDialog, QColorDialog
 from PyQt5.QtWidgets import QWidget, QHBoxLayout, QVBoxLayout, QLabel, QPushButton, QListWidget, QAbstractItemView
 
+from pyntpg.plot_tabs.misc_controls import MiscControls, STROKE_STYLES
+
 """ Change to now store the data to be plotting inside
 each ConfiguredListWidget instead of just metaish data
 describing what to plot.
@@ -43,6 +47,8 @@ class ListConfigured(QWidget):
     """ A list widget for displaying a preview of what is
     configured to be plotted on each panel.
     """
+    sig_restyle = pyqtSignal(int, dict)  # line-id and the changed style keys of a configured line
+
     def __init__(self):
         """ Initialize by creating the layout, adding label and list widget.
         :return: None
@@ -95,6 +101,7 @@ class ListConfigured(QWidget):
         :return: None
         """
         # TODO: sublcass item override comparison operators so sorting works
+        data["line-id"] = self.counter  # identifies the artists drawn for this line in an open plot
         item = QListWidgetItem()
         widget = ConfiguredListWidget(self, item, data, self.counter)
         self.counter += 1
@@ -134,14 +141,26 @@ class ListConfigured(QWidget):
         else:
             self.remove_button.setVisible(False)
 
-    def get_panel(self, npanel):
+    def get_panel(self, npanel, line_ids=None):
         """ Get the configurations attached to panel number npanel
         :param npanel: integer panel number configurations are being requested for
+        :param line_ids: optionally, only get the configurations with these line-ids
         :return: list of configurations on the requested panel
         """
+        return [widget.get_config() for widget in self.get_widgets()
+                if widget.config["panel-dest"] == npanel
+                and (line_ids is None or widget.config["line-id"] in line_ids)]
+
+    def get_configs(self):
+        """ Get the configurations of all the lines, without copying them. Don't modify!
+        :return: list of configurations, in the order listed
+        """
+        return [widget.config for widget in self.get_widgets()]
+
+    def get_widgets(self):
+        """ Get the ConfiguredListWidget of every line listed. """
         items = [self.list.item(i) for i in range(self.list.count())]
-        widgets = [self.list.itemWidget(item) for item in items]
-        return [line.get_config() for line in widgets if line.get_config()["panel-dest"] == npanel]
+        return [self.list.itemWidget(item) for item in items]
 
 
 class ConfiguredListWidget(QLabel):
@@ -168,6 +187,8 @@ class ConfiguredListWidget(QLabel):
         # Create the context menu shown on right click
         self.menu = QMenu()
         self.menu.addAction("Change panel", self.edit_action)
+        self.menu.addAction("Change color", self.change_color_action)
+        self.menu.addAction("Change style", self.change_style_action)
         self.menu.addAction("Duplicate", lambda: self.list.add_new_config(self.get_config()))
         self.remove_action = QAction("Remove", self)
         self.menu.addAction(self.remove_action)
@@ -199,6 +220,28 @@ class ConfiguredListWidget(QLabel):
             self.config["panel-dest"] = newpanel
             self.apply_data()
 
+    def change_color_action(self):
+        color = QColorDialog.getColor(QColor(self.config["color"]), None, "line color")
+        if color.isValid():
+            self.restyle({"color": color.name()})
+
+    def change_style_action(self):
+        current = self.config["linestyle"] or self.config["marker"]
+        style, ok = QInputDialog.getItem(None, "line style", "stroke style", STROKE_STYLES,
+                                         STROKE_STYLES.index(current) if current in STROKE_STYLES else 0, False)
+        if ok:
+            linestyle, marker = MiscControls.split_stroke_style(str(style))
+            self.restyle({"linestyle": linestyle, "marker": marker})
+
+    def restyle(self, style):
+        """ Update the style keys of the config and let the list know so an open plot can follow.
+        :param style: dict of style keys to update, eg. color, linestyle, marker
+        :return: None
+        """
+        self.config.update(style)
+        self.apply_data()
+        self.list.sig_restyle.emit(self.unique_id, style)
+
     def contextMenuEvent(self, _):
         """ Slot to react to right click on anything. Show the menu item.
         :param _: Ignore
@@ -208,6 +251,16 @@ class ConfiguredListWidget(QLabel):
 
     def make_id_string(self, config):
         """ The config key "string" corresponds to what will be shown in the list configured. """
+        id_string = self.make_axes_string(config)
+        if config.get("render-mode") in ["heatmap", "density"]:
+            id_string += " [%s]" % config["render-mode"]
+        if config.get("compact"):
+            id_string += " [compact]"
+        return id_string
+
+    @staticmethod
+    def make_axes_string(config):
+        """ Describe the axes of config, eg. "dataset::var (index)". """
         try:
             xaxis = config["xaxis"]
             yaxis = config["yaxis"]
@@ -36,6 +36,7 @@ class PlotTabs(QTabWidget):
     def close_tab(self, index):
         if index == self.count() - 2:
             self.setCurrentIndex(index - 1)
+        self.widget(index).widget().close_plots()
         self.widget(index).deleteLater()
         self.removeTab(index)
 
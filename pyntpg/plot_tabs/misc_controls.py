@@ -2,6 +2,12 @@ import random
 
 from PyQt5.QtGui import QColor
 from PyQt5.QtWidgets import QWidget, QVBoxLayout, QFormLayout, QPushButton, QComboBox, QSpinBox, QColorDialog
+from PyQt5.QtWidgets import QCheckBox
+
+
+# Stroke styles selectable. Those in MARKER_STYLES are drawn as markers only, the others as lines.
+STROKE_STYLES = ['-', '--', '-.', ':', '.', 'o', '*', '+', 'x', 's', 'D']
+MARKER_STYLES = ['.', 'o', '*', '+', 'x', 's', 'D']
 
 
 class MiscControls(QWidget):
@@ -23,9 +29,22 @@ class MiscControls(QWidget):
         style_picker_layout.addRow("Stroke Color", self.pick_color_button)
         # --------------------
         self.pick_line = QComboBox()
-        self.pick_line.addItems(['-', '--', '-.', ':', '.', 'o', '*', '+', 'x', 's', 'D'])
+        self.pick_line.addItems(STROKE_STYLES)
         style_picker_layout.addRow("Stroke Style", self.pick_line)
         # --------------------
+        self.pick_render = QComboBox()
+        self.pick_render.addItems(["lines", "heatmap", "density"])
+        self.pick_render.setToolTip("heatmap draws 2D y data as an image, one row per column, "
+                                    "instead of one line per column. density draws a scatter plot as "
+                                    "an image of the number of points per pixel, as is done anyway "
+                                    "for scatter plots of too many points to draw one by one")
+        style_picker_layout.addRow("Render as", self.pick_render)
+        # --------------------
+        self.pick_compact = QCheckBox()
+        self.pick_compact.setToolTip("store the data as float32 and times as datetime64, without masks, "
+                                     "using 2-8x less memory for display")
+        style_picker_layout.addRow("Compact data", self.pick_compact)
+        # --------------------
         self.pick_panel = QSpinBox()
         self.pick_panel.setMinimum(0)
         style_picker_layout.addRow("Panel destination", self.pick_panel)
@@ -71,19 +90,29 @@ class MiscControls(QWidget):
             random.randint(0, 25) * 10,
         )
 
-    def get_config(self):
-        """ Gather the selections from the config widgets of line style, marker, color, and
-        panel-dest into a dict for updating into the main line config.
-        :return: The config dict component for line style, marker, color, and panel-dest.
+    @staticmethod
+    def split_stroke_style(stroke_style):
+        """ Split one of STROKE_STYLES into the matplotlib linestyle and marker it corresponds to.
+
+        :param stroke_style: string, one of STROKE_STYLES
+        :rtype: tuple
+        :return: (linestyle, marker), one of which is the empty string
         """
-        if str(self.pick_line.currentText()) in ['.', 'o', '*', '+', 'x', 's', 'D']:
-            line_style = ""
-            line_marker = str(self.pick_line.currentText())
+        if stroke_style in MARKER_STYLES:
+            return "", stroke_style
         else:
-            line_style = str(self.pick_line.currentText())
-            line_marker = ""
+            return stroke_style, ""
+
+    def get_config(self):
+        """ Gather the selections from the config widgets of line style, marker, color, render-mode,
+        compact, and panel-dest into a dict for updating into the main line config.
+        :return: The config dict component for line style, marker, color, render-mode, compact, and panel-dest.
+        """
+        line_style, line_marker = self.split_stroke_style(str(self.pick_line.currentText()))
         return {"color": self.color_picked.name(),
                 "linestyle": line_style,
                 "marker": line_marker,
+                "render-mode": str(self.pick_render.currentText()),
+                "compact": self.pick_compact.isChecked(),
                 "panel-dest": self.pick_panel.value(),
                 }
\ No newline at end of file
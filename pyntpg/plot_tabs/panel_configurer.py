@@ -1,13 +1,14 @@
 import traceback
 
-from PyQt5.QtCore import pyqtSignal, pyqtSlot, QObject
+from PyQt5.QtCore import QCoreApplication, pyqtSignal, pyqtSlot, QObject
 from PyQt5.QtWidgets import QWidget, QHBoxLayout, QSizePolicy
 
+from pyntpg import memory_ledger
+from pyntpg.dataset_var_picker.axis_data import resolve_lines, check_resolved
 from pyntpg.dataset_var_picker.flat_dataset_var_picker import FlatDatasetVarPicker
 # X picker new for testing
 from pyntpg.dataset_var_picker.x_picker.x_picker import XPicker
 from pyntpg.plot_tabs.misc_controls import MiscControls
-from pyntpg.plot_tabs.plot_widget import PlotWidget, plot_lines
 
 
 class PanelConfigurer(QWidget):
@@ -51,6 +52,8 @@ class PanelConfigurer(QWidget):
         self.misc_controls.preview.clicked.connect(self.show_preview)
         self.layout.addWidget(self.misc_controls)
 
+        self.previews = []  # preview windows open, dropped when they close
+
     def emit_signal_new_config(self):
         try:
             config_dict = self.make_config_dict()
@@ -60,16 +63,40 @@ class PanelConfigurer(QWidget):
             print(traceback.format_exc())
 
     def show_preview(self):
-        self.preview = PlotWidget()
-        figure = self.preview.get_figure()
-        config_dict = self.make_config_dict(decimate=slice(None, None, self.preview_decimation))
-        if config_dict:
-            plot_lines(figure.add_subplot(111), [config_dict])
-        self.preview.show()
-
-    def make_config_dict(self, decimate=slice(None, None, None)):
+        from pyntpg.plot_tabs.plot_widget import PlotWidget, plot_lines
+
+        try:
+            config_dict = self.make_config_dict()
+            app = QCoreApplication.instance()
+            budget_step = memory_ledger.decimation(memory_ledger.estimate_nbytes([config_dict], app.get_variable_info))
+            if budget_step is not None and budget_step > self.preview_decimation:
+                self.signal_status.emit("Preview over the memory budget, decimated by {}".format(budget_step))
+            resolve_lines([config_dict], app.get_data, step=max(self.preview_decimation, budget_step or 1))
+            check_resolved(config_dict)
+        except Exception as e:
+            self.signal_status.emit("Config error: {}".format(repr(e)))
+            print(traceback.format_exc())
+            return
+        preview = PlotWidget()
+        preview.setWindowTitle("Preview")
+        preview.closing.connect(memory_ledger.release)
+        preview.closing.connect(self.previews.remove)
+        memory_ledger.record(preview, "Preview", [config_dict])
+        self.previews.append(preview)
+        plot_lines(preview.get_figure().add_subplot(111), [config_dict])
+        preview.show()
+
+    def close_previews(self):
+        """ Close all the preview windows open. """
+        for preview in list(self.previews):
+            preview.close()
+
+    def make_config_dict(self):
         """ Make a dictionary of the properties selected
         in the configurer, intended to be passed to list_configured.
+
+        The axes only reference the data selected, see pyntpg.dataset_var_picker.axis_data
+        for reading it.
         :return: Dictionary describing line to plot
         """
         base = self.misc_controls.get_config()
@@ -1,10 +1,44 @@
 import cerberus
 
 
-config_schema = {
-    "y-axis": {},
-    "z-axis": {},
+# an axis config only references the data, see pyntpg.dataset_var_picker.axis_data
+axis_schema = {
+    "type": {"type": "string", "allowed": ["index", "datetime", "scatter"]},
+    "dataset": {"type": "string"},
+    "variable": {"type": "string"},
+    "units": {"type": "string", "nullable": True},
+    "slices": {"type": "list", "schema": {"type": "list", "items": [
+        {"type": "integer"}, {"type": "integer", "nullable": True}
+    ]}},
+    "flatten": {"type": "list", "schema": {"type": "boolean"}},
+    "start": {"type": "datetime", "nullable": True},
+    "end": {"type": "datetime", "nullable": True},
+    "length": {"type": "integer", "nullable": True},
+}
 
+line_schema = {
+    "xaxis": {"type": "dict", "required": True, "schema": axis_schema, "allow_unknown": True},
+    "yaxis": {"type": "dict", "required": True, "schema": axis_schema, "allow_unknown": True},
+    "panel-dest": {"type": "integer", "required": True, "min": 0},
+    "line-id": {"type": "integer"},
+    "label": {"type": "string"},
+    "color": {"type": "string"},
+    "linestyle": {"type": "string"},
+    "marker": {"type": "string"},
+    "render-mode": {"type": "string", "allowed": ["lines", "heatmap", "density"]},
+    "compact": {"type": "boolean"},
+}
+
+# a plot tab config, see pyntpg.plot_tabs.tab_config
+config_schema = {
+    "datasets": {"type": "dict", "valuesrules": {"type": "list", "schema": {"type": "string"}}},
+    "variables": {"type": "dict", "valuesrules": {"type": "list", "schema": {"type": "string"}}},
+    "layout": {"type": "dict", "required": True, "schema": {
+        "height_ratios": {"type": "list", "required": True, "schema": {"type": "number"}},
+        "width_ratios": {"type": "list", "required": True, "schema": {"type": "list", "schema": {"type": "number"}}},
+    }},
+    "lines": {"type": "list", "required": True, "schema": {"type": "dict", "schema": line_schema,
+                                                            "allow_unknown": True}},
 }
 
 
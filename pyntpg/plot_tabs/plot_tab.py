@@ -1,24 +1,73 @@
-import matplotlib.gridspec as gridspec
-import matplotlib.pyplot as plt
+import copy
+import itertools
+
 from PyQt5.Qt import QKeySequence, QShortcut
-from PyQt5.QtCore import pyqtSignal, pyqtSlot
-from PyQt5.QtWidgets import QWidget, QGridLayout, QSizePolicy, QVBoxLayout, QStatusBar
-from matplotlib.axes._axes import Axes
-from matplotlib.backends.backend_qt5agg import FigureCanvasQTAgg as FigureCanvas
-from matplotlib.backends.backend_qt5agg import NavigationToolbar2QT as NavigationToolbar
-from matplotlib.figure import Figure
+from PyQt5.QtCore import QCoreApplication, QTimer, pyqtSignal, pyqtSlot
+from PyQt5.QtWidgets import QWidget, QGridLayout, QSizePolicy, QStatusBar
 
+from pyntpg import memory_ledger
+from pyntpg.dataset_var_picker.axis_data import resolve_lines, check_resolved, flattened_width
 from pyntpg.plot_tabs.layout_picker import LayoutPicker
 from pyntpg.plot_tabs.list_configured import ListConfigured
 from pyntpg.plot_tabs.panel_configurer import PanelConfigurer
-from pyntpg.plot_tabs.plot_widget import plot_lines
 
 # messages sent to the plot status bar will be displayed for the following number of milliseconds.
 STATUS_BAR_TIMEOUT = 10000  # milliseconds
 
+# plot windows are numbered in their titles, to tell them apart, eg. in the memory ledger.
+window_numbers = itertools.count(1)
+
+def first_slice(line):
+    """ The [start, stop] along the first dimension of the y axis of line, or None if not sliced from a dataset. """
+    slices = line["yaxis"].get("slices")
+    return slices[0] if slices else None
+
+
+def follow_from(line, get_variable_info):
+    """
+    The record to follow line from, ie. the length of its y variable when it's plotted, if the line
+    reaches the last record. Lines sliced to stop before then aren't followed, records appended to the
+    file are past what was picked.
+
+    :param line: line config
+    :param get_variable_info: function (dataset, variable) -> (shape, dtype), eg. Application.get_variable_info
+    :return: int number of records, or None if line isn't followed
+    """
+    span = first_slice(line)
+    if span is None:
+        return None
+    try:
+        length = get_variable_info(line["yaxis"]["dataset"], line["yaxis"]["variable"])[0][0]
+    except (KeyError, ValueError, IndexError):
+        return None
+    return length if span[1] is None or span[1] >= length else None
+
+
+def tail_config(config, start, stop):
+    """
+    Copy of a line config to read the records [start, stop) along the first dimension, eg. those
+    appended to a file being followed. Datetime axes are no longer limited to the end picked.
+
+    :param config: line config
+    :param start: first record
+    :param stop: record to stop before
+    :return: new line config
+    """
+    tail = copy.deepcopy(config)
+    for axis in (tail["xaxis"], tail["yaxis"]):
+        if axis.get("slices"):
+            axis["slices"][0] = [start, stop]
+        if axis.get("type") == "index":
+            axis["length"] = None
+        elif axis.get("type") == "datetime":
+            axis["end"] = None
+    return tail
+
+
 class PlotTab(QWidget):
     """ Class PlotTab is a container for the contents of each plot tab.
     """
+    follow_interval = 5.  # seconds between checks for records appended to the files of followed plots
     def __init__(self):
         """ Initialize layout, add main component widgets, and wire+connect the plot button.
         :return: None
@@ -51,8 +100,12 @@ class PlotTab(QWidget):
 
         # connect the ListConfigured plot button to self.make_plot
         self.list_configured.plot_button.clicked.connect(self.make_plot)
+        # restyling a line updates the artists already drawn, if the plot is open
+        self.list_configured.sig_restyle.connect(self.restyle_line)
 
-        self.figure = None  # will be reference to widget in which plot appears when created.
+        self.plot_widget = None  # the most recent plot window, updated in place by make_plot while it's open.
+        self.figure = None  # and its figure
+        self.plot_widgets = []  # every plot window open from this tab, dropped when they close
 
     @pyqtSlot(str)
     def show_status_bar_message(self, message):
@@ -61,98 +114,333 @@ class PlotTab(QWidget):
     def make_plot(self):
         """ Connected to the plot button. On click, it:
         - gets the gridspec ratios from layout_picker
-        - creates the matplotlib gridspec
+        - if the plot window is still open with the same layout, only draws the lines that
+          were added and removes the lines that were removed since it was plotted
+        - otherwise, creates the matplotlib gridspec
         - adds lines to each gridspec from the list_configured
         - shows the figure in a new window
         :return: None
         """
-        # create widget where plot and toolbar will go
-        self.plot_widget = QWidget()
-        QShortcut(QKeySequence("Ctrl+W"), self.plot_widget, self.plot_widget.close)  # close shortcut
-        QShortcut(QKeySequence("X"), self.plot_widget, lambda: self.toggle_share_axis("x"))  # toggle share x
-        QShortcut(QKeySequence("Y"), self.plot_widget, lambda: self.toggle_share_axis("y"))  # toggle share y
-        QShortcut(QKeySequence("R"), self.plot_widget, self.redraw)  # just completely redraw plot
-        layout = QVBoxLayout()
-        self.plot_widget.setLayout(layout)
+        # datasets restored from a saved session are only opened once they're needed, ie. now.
+        QCoreApplication.instance().datasets.require(
+            set(axis.get("dataset") for config in self.list_configured.get_configs()
+                for axis in (config["xaxis"], config["yaxis"]))
+        )
 
         specs = self.layout_picker.create_gridspec()
-        self.figure = Figure(dpi=self.plot_widget.physicalDpiY() * (2. / 3.), tight_layout=True)
-        self.create_figure(self.figure, specs)
-
-        # Now create and add canvas and toolbar to widget
-        plot = FigureCanvas(self.figure)
-        plot.setMinimumHeight(100)
-        plot.setMinimumWidth(10)
-        # See http://matplotlib.org/users/navigation_toolbar.html for navigation tips
-        nav = NavigationToolbar(plot, self.plot_widget)
-        layout.addWidget(plot)
-        layout.addWidget(nav)
-        self.plot_widget.show()
-
-    def create_figure(self, figure, specs):
-        vpanels = len(specs["height_ratios"])
-        outter_grid = gridspec.GridSpec(
-            vpanels, 1,
-            height_ratios=specs["height_ratios"],
-            width_ratios=[1]
-        )
-        npanel = 0  # Count through the panels so we know which on we are on
-        for i in range(vpanels):
-            hpanels = len(specs["width_ratios"][i])
-            inner_grid = gridspec.GridSpecFromSubplotSpec(
-                1, hpanels, subplot_spec=outter_grid[i],
-                height_ratios=[1],
-                width_ratios=specs["width_ratios"][i]
+        if (self.plot_widget is not None and self.plot_widget.isVisible()
+                and self.plot_widget.specs == specs and self.update_figure(self.plot_widget)):
+            self.plot_widget.raise_()
+            return
+
+        from pyntpg.plot_tabs.plot_widget import PlotWidget
+
+        # create widget where plot and toolbar will go. A previous plot window stays open
+        # alongside, but only the newest is updated in place.
+        plot_widget = PlotWidget()
+        plot_widget.setWindowTitle("Plot {}".format(next(window_numbers)))
+        plot_widget.closing.connect(memory_ledger.release)  # the data drawn goes with the window
+        plot_widget.closing.connect(self.plot_closed)
+        QShortcut(QKeySequence("Ctrl+W"), plot_widget, plot_widget.close)  # close shortcut
+        QShortcut(QKeySequence("X"), plot_widget, lambda: self.toggle_share_axis("x", plot_widget))  # toggle share x
+        QShortcut(QKeySequence("Y"), plot_widget, lambda: self.toggle_share_axis("y", plot_widget))  # toggle share y
+        QShortcut(QKeySequence("R"), plot_widget, lambda: self.redraw(plot_widget))  # relimit, redraw retained artists
+        QShortcut(QKeySequence("Shift+R"), plot_widget, lambda: self.rebuild(plot_widget))  # completely redraw plot
+        QShortcut(QKeySequence("F"), plot_widget, lambda: self.toggle_follow(plot_widget))  # follow growing files
+
+        self.plot_widget = plot_widget
+        self.plot_widgets.append(plot_widget)
+        self.figure = plot_widget.get_figure()
+        self.create_figure(plot_widget, specs)
+        plot_widget.show()
+
+    @pyqtSlot(object)
+    def plot_closed(self, plot_widget):
+        """ Slot for a plot window closing, forget it so that it (and the data drawn in it) can be freed.
+        :param plot_widget: the PlotWidget closing
+        :return: None
+        """
+        if plot_widget in self.plot_widgets:
+            self.plot_widgets.remove(plot_widget)
+        if plot_widget is self.plot_widget:
+            self.plot_widget = None
+            self.figure = None
+
+    def close_plots(self):
+        """ Close every plot window open from this tab, eg. when the tab is closed.
+        :return: None
+        """
+        for plot_widget in list(self.plot_widgets):
+            plot_widget.close()
+        self.panel_config.close_previews()
+
+    def create_figure(self, plot_widget, specs):
+        """ Add a subplot for each panel in specs to the figure of plot_widget and plot the lines
+        configured for it, keeping track of what was drawn where in plot_widget.
+        :param plot_widget: PlotWidget to draw in, expected to be empty
+        :param specs: gridspec ratios from LayoutPicker.create_gridspec
+        :return: None
+        """
+        from pyntpg.plot_tabs.plot_widget import draw_panels
+
+        figure = plot_widget.get_figure()
+        plot_widget.specs = specs
+
+        # read the data for every panel up front, from different files concurrently, so
+        # that the drawing below (which has to be on this thread) doesn't wait on each read in turn.
+        num_panels = sum(len(row) for row in specs["width_ratios"])
+        panel_lines = [self.list_configured.get_panel(npanel) for npanel in range(num_panels)]
+        lines = [line for lines in panel_lines for line in lines]
+        resolve_lines(lines, QCoreApplication.instance().get_data, step=self.budget_step(lines, plot_widget))
+        memory_ledger.release(plot_widget)
+        memory_ledger.record(plot_widget, plot_widget.windowTitle(), lines)
+        get_variable_info = QCoreApplication.instance().get_variable_info
+        # before drawing takes the axes
+        records = {line["line-id"]: follow_from(line, get_variable_info) for line in lines}
+
+        drawn, errors = draw_panels(figure, specs, panel_lines)
+        for npanel, (ax, panel_type, drawn_artists) in drawn.items():
+            for line, artists in zip(panel_lines[npanel], drawn_artists):
+                plot_widget.artists[line["line-id"]] = artists
+                plot_widget.line_panels[line["line-id"]] = npanel
+                if records[line["line-id"]] is not None:
+                    plot_widget.records[line["line-id"]] = records[line["line-id"]]
+            plot_widget.panel_axes[npanel] = ax
+            plot_widget.panel_types[npanel] = panel_type
+        for npanel, e in errors.items():
+            self.status_bar.showMessage("Problem with panel {}: {}".format(npanel, repr(e)), STATUS_BAR_TIMEOUT)
+
+    def update_figure(self, plot_widget):
+        """ Bring an open plot up to date with the lines configured by reading and drawing only the
+        lines that are new (or moved to another panel), and removing the lines no longer configured.
+
+        Changes that would need panels to be added to or removed from the figure can't be done in
+        place, in that case nothing is changed and False is returned.
+
+        :param plot_widget: PlotWidget previously drawn by create_figure
+        :return: True if plot_widget was updated, False if it needs to be plotted from scratch
+        """
+        from pyntpg.plot_tabs.plot_widget import plot_lines, axes_labels, relimit, remove_artists, remake_legend
+
+        num_panels = sum(len(row) for row in plot_widget.specs["width_ratios"])
+        configured = {config["line-id"]: config["panel-dest"] for config in self.list_configured.get_configs()
+                      if config["panel-dest"] < num_panels}  # lines on panels not in the layout aren't drawn
+        drawn = plot_widget.line_panels
+
+        removed = [line_id for line_id, npanel in drawn.items() if configured.get(line_id) != npanel]
+        added = [line_id for line_id, npanel in configured.items() if drawn.get(line_id) != npanel]
+        if not removed and not added:
+            return True
+
+        touched = set(drawn[line_id] for line_id in removed) | set(configured[line_id] for line_id in added)
+        if any((npanel in plot_widget.panel_axes) != (npanel in configured.values()) for npanel in touched):
+            return False  # a panel would appear or disappear, needs a new layout
+
+        for line_id in removed:
+            remove_artists(plot_widget.artists.pop(line_id))
+            plot_widget.line_panels.pop(line_id)
+            plot_widget.records.pop(line_id, None)
+        memory_ledger.release(plot_widget, removed)
+
+        panel_lines = {npanel: self.list_configured.get_panel(npanel, line_ids=added) for npanel in touched}
+        lines = [line for lines in panel_lines.values() for line in lines]
+        resolve_lines(lines, QCoreApplication.instance().get_data, step=self.budget_step(lines))
+        memory_ledger.record(plot_widget, plot_widget.windowTitle(), lines)
+        get_variable_info = QCoreApplication.instance().get_variable_info
+        records = {line["line-id"]: follow_from(line, get_variable_info) for line in lines}
+
+        for npanel in touched:
+            ax = plot_widget.panel_axes[npanel]
+            panel_type = plot_widget.panel_types[npanel]
+            lines = []
+            for line in panel_lines[npanel]:
+                try:
+                    check_resolved(line)
+                    lines.append(line)
+                except Exception as e:
+                    self.status_bar.showMessage("Problem with line {}: {}".format(line["label"], repr(e)),
+                                                STATUS_BAR_TIMEOUT)
+            for line_id, drawn_artists in zip([line["line-id"] for line in lines],
+                                              plot_lines(ax, lines, panel_type=panel_type)):
+                plot_widget.artists[line_id] = drawn_artists
+                plot_widget.line_panels[line_id] = npanel
+                if records[line_id] is not None:
+                    plot_widget.records[line_id] = records[line_id]
+
+            # labels and legend describe all of the lines on the panel, not just the new ones.
+            x_label, y_label = axes_labels(
+                [config for config in self.list_configured.get_configs() if config["panel-dest"] == npanel],
+                panel_type
             )
-            for j in range(hpanels):
-                ax = plt.Subplot(figure, inner_grid[j])
-                assert isinstance(ax, Axes)
-                lines = self.list_configured.get_panel(npanel)
-                if lines:
-                    try:
-                        plot_lines(ax, lines)
-                        figure.add_subplot(ax)
-                    except Exception as e:
-                        self.status_bar.showMessage("Problem with panel {}: {}".format(j, repr(e)), STATUS_BAR_TIMEOUT)
-                npanel += 1
-        figure.autofmt_xdate()
-
-    def toggle_share_axis(self, which_axis):
+            ax.set_xlabel(x_label, fontsize=15)
+            ax.set_ylabel(y_label, fontsize=15)
+            remake_legend(ax)
+            relimit(ax)
+
+        plot_widget.canvas.draw_idle()
+        self.status_bar.showMessage("Plot updated: {} line(s) added, {} removed".format(
+            len([line_id for line_id in added if line_id in plot_widget.artists]), len(removed)
+        ), STATUS_BAR_TIMEOUT)
+        return True
+
+    def budget_step(self, lines, exclude=None):
+        """ Get the decimation needed to keep the data of lines within the memory budget, see
+        pyntpg.memory_ledger, and warn in the status bar if there is any.
+        :param lines: list of line configs about to be resolved
+        :param exclude: optional PlotWidget being redrawn, whose data will be released
+        :return: step to resolve the lines with, or None to read everything
         """
-        Toggle on/off sharing x or y axis. When an axis is shared, zoom on one plot will zoom the same on all.
+        estimate = memory_ledger.estimate_nbytes(lines, QCoreApplication.instance().get_variable_info)
+        step = memory_ledger.decimation(estimate, exclude=exclude)
+        if step is not None:
+            self.status_bar.showMessage(
+                "Plot data would need {:.0f} MB, over the memory budget of {:.0f} MB: decimated by {}".format(
+                    estimate / 1024. ** 2, memory_ledger.budget / 1024. ** 2, step), STATUS_BAR_TIMEOUT)
+        return step
+
+    def toggle_follow(self, plot_widget):
+        """
+        Toggle following the files plotted in plot_widget: every follow_interval seconds, records appended
+        to them along the first dimension are read and added to the lines drawn, see follow.
+
+        :param plot_widget: PlotWidget to follow the files of
+        :return: None
+        """
+        if plot_widget.follow_timer is None:
+            plot_widget.follow_timer = QTimer(plot_widget)
+            plot_widget.follow_timer.timeout.connect(lambda: self.follow(plot_widget))
+            plot_widget.follow_timer.start(int(self.follow_interval * 1000))
+            self.status_bar.showMessage("Following the files of {} every {:g} s".format(
+                plot_widget.windowTitle(), self.follow_interval), STATUS_BAR_TIMEOUT)
+        else:
+            plot_widget.follow_timer.stop()
+            plot_widget.follow_timer.deleteLater()
+            plot_widget.follow_timer = None
+            self.status_bar.showMessage("Stopped following the files of {}".format(plot_widget.windowTitle()),
+                                        STATUS_BAR_TIMEOUT)
+
+    def follow(self, plot_widget):
+        """
+        Read the records appended to the files of the lines drawn in plot_widget since they were last read,
+        and append them to the artists drawn, without plotting anything again. Lines that can't be appended
+        to (heatmaps) are plotted again with all the records.
+
+        :param plot_widget: PlotWidget being followed
+        :return: None
+        """
+        from pyntpg.plot_tabs.plot_widget import plot_lines, append_to_artists, remove_artists, relimit
+
+        app = QCoreApplication.instance()
+        configs = {config["line-id"]: config for config in self.list_configured.get_configs()}
+        followed = [configs[line_id] for line_id in plot_widget.records if line_id in configs]
+        datasets = set(axis.get("dataset") for config in followed for axis in (config["xaxis"], config["yaxis"]))
+        changed = set(name for name in datasets if app.datasets.refresh(name))
 
-        Resources:
-         - https://stackoverflow.com/a/42974975
+        tails = []
+        for config in followed:
+            yaxis = config["yaxis"]
+            if not changed & {config["xaxis"].get("dataset"), yaxis.get("dataset")}:
+                continue
+            stop = plot_widget.records[config["line-id"]]
+            length = app.get_variable_info(yaxis["dataset"], yaxis["variable"])[0][0]
+            if length > stop:
+                tails.append((config, stop, length, tail_config(config, stop, length)))
+        tail_lines = [tail for _, _, _, tail in tails]
+        # the records appended are kept in addition to those already drawn, decimated if over the budget
+        resolve_lines(tail_lines, app.get_data, step=self.budget_step(tail_lines))
+
+        axes = set()
+        for config, stop, length, tail in tails:
+            try:
+                check_resolved(tail)
+            except Exception as e:
+                self.status_bar.showMessage("Problem following line {}: {}".format(config["label"], repr(e)),
+                                            STATUS_BAR_TIMEOUT)
+                continue
+            line_id = config["line-id"]
+            npanel = plot_widget.line_panels[line_id]
+            ax = plot_widget.panel_axes[npanel]
+            if tail["xaxis"].get("type") == "index":
+                index = tail["xaxis"]["data"]
+                offset = (stop - first_slice(config)[0]) * flattened_width(config["yaxis"])
+                if isinstance(index, range):
+                    tail["xaxis"]["data"] = range(index.start + offset, index.stop + offset, index.step)
+                else:
+                    tail["xaxis"]["data"] = index + offset
+            if append_to_artists(ax, plot_widget.artists[line_id], tail["xaxis"]["data"], tail["yaxis"]["data"]):
+                memory_ledger.grow(plot_widget, [tail])
+            else:
+                full = tail_config(config, first_slice(config)[0], length)
+                resolve_lines([full], app.get_data, step=self.budget_step([full]))
+                memory_ledger.record(plot_widget, plot_widget.windowTitle(), [full])
+                remove_artists(plot_widget.artists[line_id])
+                plot_widget.artists[line_id] = plot_lines(ax, [full], panel_type=plot_widget.panel_types[npanel])[0]
+            plot_widget.records[line_id] = length
+            axes.add(ax)
+
+        for ax in axes:
+            if ax.get_autoscale_on():  # otherwise the user zoomed in on something, leave it be
+                relimit(ax)
+        if axes:
+            plot_widget.canvas.draw_idle()
+
+    def get_tab_config(self):
+        """ Get the layout and lines configured in this tab, see pyntpg.plot_tabs.tab_config.
+        :return: tab config dict, without datasets
+        """
+        return {
+            "layout": self.layout_picker.create_gridspec(),
+            "lines": [copy.deepcopy(config) for config in self.list_configured.get_configs()]
+        }
+
+    def set_tab_config(self, config):
+        """ Restore the layout and lines from a tab config, see pyntpg.plot_tabs.tab_config.
+        Nothing is read until the plot is made.
+        :param config: tab config dict
+        :return: None
+        """
+        self.layout_picker.set_gridspec(config["layout"])
+        for line in config["lines"]:
+            self.list_configured.add_new_config(copy.deepcopy(line))
+
+    @pyqtSlot(int, dict)
+    def restyle_line(self, line_id, style):
+        """ Slot for a configured line being restyled, update it in the open plots without replotting.
+        :param line_id: "line-id" of the restyled line
+        :param style: dict of the changed style properties
+        :return: None
+        """
+        for plot_widget in self.plot_widgets:
+            plot_widget.restyle(line_id, style)
+
+    def toggle_share_axis(self, which_axis, plot_widget):
+        """
+        Toggle on/off sharing x or y axis. When an axis is shared, zoom on one plot will zoom the same on all.
 
         :param which_axis: string "x" or "y" to specify which axis to share.
+        :param plot_widget: PlotWidget to toggle sharing in
         :return: None
         """
-        axes = self.figure.get_axes()
-        if len(axes) <= 1:
-            return  # case: nothing to do.
+        plot_widget.toggle_share(which_axis.lower())
 
-        if which_axis.lower() == "x":
-            grouper = axes[0].get_shared_x_axes()
-        elif which_axis.lower() == "y":
-            grouper = axes[0].get_shared_y_axes()
-        else:
-            return  # case: unrecognized axis
+    def redraw(self, plot_widget):
+        """
+        Recompute the limits of every panel from the lines already drawn and redraw them,
+        without reading or plotting anything again.
 
-        if len(grouper.get_siblings(axes[0])) > 1:
-            # case already joined: need to unjoin.
-            for ax in axes[1:]:
-                grouper.remove(ax)
-        else:
-            # case not joined: join
-            grouper.join(*axes)
+        :param plot_widget: PlotWidget to redraw
+        :return: None
+        """
+        plot_widget.relimit()
 
-    def redraw(self):
+    def rebuild(self, plot_widget):
         """
         Sometimes things just get messed up... start fresh.
 
+        :param plot_widget: PlotWidget to plot again from scratch
         :return: None
         """
-        self.figure.clear()
-        self.create_figure(self.figure, self.layout_picker.create_gridspec())
-        self.figure.canvas.draw()
-        self.figure.canvas.flush_events()
+        plot_widget.clear()
+        self.create_figure(plot_widget, self.layout_picker.create_gridspec())
+        plot_widget.canvas.draw()
+        plot_widget.canvas.flush_events()
@@ -1,37 +1,194 @@
-from PyQt5.QtCore import pyqtSignal
+"""
+Drawing line configs with matplotlib, in a window (PlotWidget) or any figure (draw_panels, plot_lines).
+
+Importing this module imports matplotlib and its Qt backend, which are slow to import, so the plot tabs
+only import it once something is plotted.
+"""
+from weakref import WeakKeyDictionary
+
+from PyQt5.QtCore import Qt, pyqtSignal
 from PyQt5.QtGui import QColor
 from PyQt5.QtWidgets import QWidget, QVBoxLayout
 from matplotlib.axes._axes import Axes
 from matplotlib.backends.backend_qt5agg import FigureCanvasQTAgg as FigureCanvas
 from matplotlib.backends.backend_qt5agg import NavigationToolbar2QT as NavigationToolbar
+from matplotlib import gridspec
+from matplotlib.collections import LineCollection
+from matplotlib.colors import LogNorm
 from matplotlib.figure import Figure
+from matplotlib.image import AxesImage
+from matplotlib.lines import Line2D
+from matplotlib.transforms import nonsingular
 import numpy as np
 import matplotlib.dates as mpldates
 
 # fix compatibility between matplotlib and cfimte > 1.2.0
 import nc_time_axis
 
+from pyntpg.dataset_var_picker.axis_data import check_resolved
+from pyntpg.profiling import span, timed
+
+# 2D y data with more columns than this is drawn as a single LineCollection
+# instead of one ax.plot call (and one Line2D) per column.
+LINE_COLLECTION_THRESHOLD = 16
+
+# scatter lines with more points than this are drawn as a DensityImage instead of one marker per point.
+DENSITY_THRESHOLD = 100000
+
+# Axes -> "legend" of the line configs its legend was made with, see plot_lines and remake_legend.
+legend_configs = WeakKeyDictionary()
+
 
 class PlotWidget(QWidget):
+    """ Window showing a figure and its navigation toolbar.
+
+    The matplotlib artists drawn for each configured line are retained in self.artists, keyed
+    by the line's "line-id", so that the plot can be restyled, relimited, etc. by updating the
+    existing artists instead of re-reading and re-plotting every line.
+
+    Closing the window tears it down: closing is emitted so owners can drop their references, then
+    the figure is cleared (freeing the artists and the data they hold) and the Qt widgets are deleted.
+    """
     closing = pyqtSignal(object)
 
     def __init__(self):
         super(PlotWidget, self).__init__()
+        self.setAttribute(Qt.WA_DeleteOnClose)
         self.layout = QVBoxLayout()
         self.setLayout(self.layout)
 
         self.figure = Figure(dpi=self.physicalDpiY() * (2. / 3.), tight_layout=True)
-        self.canvas = FigureCanvas(self.figure)
+        self.canvas = ProfiledCanvas(self.figure)
+        self.canvas.setMinimumHeight(100)
+        self.canvas.setMinimumWidth(10)
+        # See http://matplotlib.org/users/navigation_toolbar.html for navigation tips
         self.toolbar = NavigationToolbar(self.canvas, self)
 
         self.layout.addWidget(self.canvas)
         self.layout.addWidget(self.toolbar)
 
+        self.specs = None  # gridspec ratios the figure was laid out with
+        self.panel_axes = {}  # panel number -> Axes, for the panels which have lines drawn
+        self.panel_types = {}  # panel number -> xaxis type of the panel, see plot_lines
+        self.line_panels = {}  # line-id -> panel number the line is drawn on
+        self.artists = {}  # line-id -> list of artists drawn for that line
+        self.records = {}  # line-id -> records read along the first dimension of y, when following
+        self.follow_timer = None  # QTimer polling for records appended to the files, when following
+        self.shared = {"x": [], "y": []}  # (axes, callback id) linking limits between panels, if linked
+
     def get_figure(self):
         return self.figure
 
     def closeEvent(self, _):
         self.closing.emit(self)
+        self.teardown()
+
+    def teardown(self):
+        """ Free the figure and everything drawn in it, once the window is closed. """
+        for which_axis in self.shared:
+            for ax, cid in self.shared[which_axis]:
+                ax.callbacks.disconnect(cid)
+        self.clear()
+        self.specs = None
+        # the toolbar keeps the views zoomed/panned through, which reference the axes.
+        self.toolbar.update()
+
+    def restyle(self, line_id, style):
+        """
+        Apply a new style to the artists already drawn for a line and blit the panels they are on.
+
+        :param line_id: "line-id" of the line config to restyle
+        :param style: dict with any of "color", "linestyle", "marker"
+        :return: None
+        """
+        artists = self.artists.get(line_id, [])
+        restyle_artists(artists, style)
+        self.blit(set(artist.axes for artist in artists if artist.axes is not None))
+
+    def blit(self, axes):
+        """
+        Redraw only the inside of each of axes from the retained artists and blit them to the
+        screen. Nothing outside the frames (ticks, labels, other panels) is redrawn, so this
+        is only suitable for changes that don't touch the axis limits.
+
+        :param axes: iterable of Axes to update
+        :return: None
+        """
+        try:
+            renderer = self.canvas.get_renderer()
+            for ax in axes:
+                # the background patch covers what was previously drawn in the frame
+                in_frame = ([ax.patch] + ax.xaxis.get_gridlines() + ax.yaxis.get_gridlines()
+                            + sorted(ax.lines + ax.collections + ax.images + ax.patches, key=lambda a: a.get_zorder()))
+                legend = remake_legend(ax)  # rebuild the handles with the new styles
+                if legend is not None:
+                    in_frame.append(legend)
+                for artist in in_frame:
+                    artist.draw(renderer)
+                self.canvas.blit(ax.bbox)
+        except AttributeError:
+            # canvas not drawn yet or backend without blitting, just schedule a full draw.
+            self.canvas.draw_idle()
+
+    def relimit(self):
+        """ Recompute the data limits of every panel from the retained artists and redraw. """
+        for ax in self.figure.get_axes():
+            relimit(ax)
+        self.canvas.draw_idle()
+
+    def toggle_share(self, which_axis):
+        """
+        Toggle linking the x or y limits of all the panels. While linked, zoom or pan on one
+        panel is applied to all the others.
+
+        :param which_axis: string "x" or "y"
+        :return: None
+        """
+        axes = self.figure.get_axes()
+        if which_axis not in self.shared or len(axes) <= 1:
+            return  # case: unrecognized axis or nothing to do.
+
+        if self.shared[which_axis]:
+            # case already linked: unlink.
+            for ax, cid in self.shared[which_axis]:
+                ax.callbacks.disconnect(cid)
+            self.shared[which_axis] = []
+        else:
+            # case not linked: link, and start everything off from the first panel's limits.
+            self.shared[which_axis] = [
+                (ax, ax.callbacks.connect("%slim_changed" % which_axis, self.sync_limits)) for ax in axes
+            ]
+            self.sync_limits(axes[0])
+        self.canvas.draw_idle()
+
+    def sync_limits(self, changed_ax):
+        """ Callback for axes limits changing, copy the new limits to the other panels if linked. """
+        for ax in self.figure.get_axes():
+            if ax is changed_ax:
+                continue
+            # emit=False, otherwise each set would trigger this callback again.
+            if self.shared["x"]:
+                ax.set_xlim(changed_ax.get_xlim(), emit=False)
+            if self.shared["y"]:
+                ax.set_ylim(changed_ax.get_ylim(), emit=False)
+
+    def clear(self):
+        """ Remove everything from the figure, eg. to plot again from scratch. """
+        self.figure.clear()
+        self.panel_axes = {}
+        self.panel_types = {}
+        self.line_panels = {}
+        self.artists = {}
+        self.records = {}
+        self.shared = {"x": [], "y": []}
+
+
+class ProfiledCanvas(FigureCanvas):
+    """ FigureCanvas recording a span for each full draw, see pyntpg.profiling. """
+
+    def draw(self):
+        with span("canvas draw"):
+            super(ProfiledCanvas, self).draw()
 
 
 def expand_colors(color_name, num_needed):
@@ -49,33 +206,387 @@ def expand_colors(color_name, num_needed):
     return [QColor((r+x*dx) % 255, (g+x*2*dx) % 255, (b+x*3*dx) % 255).name() for x in range(num_needed)]
 
 
-def plot_lines(ax, lines):
+def restyle_artists(artists, style):
+    """
+    Update the style of the artists drawn for a single line config in place.
+
+    A 2D line config gets the same color variations it was drawn with, see expand_colors.
+
+    :param artists: list of artists returned by plot_lines for one line
+    :param style: dict with any of "color", "linestyle", "marker"
+    :return: None
+    """
+    lines = [a for a in artists if isinstance(a, Line2D)]
+    collections = [a for a in artists if isinstance(a, LineCollection)]
+    if "color" in style:
+        for line, color in zip(lines, expand_colors(style["color"], len(lines))):
+            line.set_color(color)
+        for collection in collections:
+            collection.set_color(expand_colors(style["color"], len(collection.get_segments())))
+    for line in lines:
+        if "linestyle" in style:
+            line.set_linestyle(style["linestyle"] or "None")
+        if "marker" in style:
+            line.set_marker(style["marker"] or "None")
+    for collection in collections:
+        if style.get("linestyle"):
+            collection.set_linestyle(style["linestyle"])
+
+
+def remove_artists(artists):
+    """ Remove artists returned by plot_lines from their axes, along with any colorbar made for them. """
+    for artist in artists:
+        colorbar = getattr(artist, "colorbar", None)
+        if colorbar is not None:
+            colorbar.remove()
+        artist.remove()
+
+
+def relimit(ax):
+    """ Like ax.relim followed by ax.autoscale_view, except collections are also taken into account
+    and autoscaling is turned back on if it was turned off by zooming or setting limits. """
+    ax.set_autoscale_on(True)
+    for image in ax.images:
+        if isinstance(image, DensityImage):
+            image.unbin()
+    ax.relim()
+    for collection in ax.collections:
+        ax.update_datalim(collection.get_datalim(ax.transData).get_points())
+    ax.autoscale_view()
+
+
+def plot_line_collection(ax, xdata, ydata, colors, **kwargs):
+    """
+    Draw every column of the 2D ydata against the shared xdata as a single LineCollection.
+
+    Calling ax.plot once per column creates a Line2D per column and re-validates (and for dates,
+    re-converts) xdata on every call, which gets very slow for spectra like variables with hundreds
+    of columns. Here xdata is converted to axis units once and shared by all of the segments.
+
+    :param ax: Matplotlib AxesSubplot object to plot on
+    :param xdata: 1D array of x values, may be datetimes
+    :param ydata: 2D array of y values, one line per column
+    :param colors: list of colors, one per column, see expand_colors
+    :param kwargs: other keyword arguments for LineCollection, eg. linestyle, label
+    :return: the LineCollection added to ax
+    """
+    ax.xaxis.update_units(xdata)
+    x = np.asarray(ax.convert_xunits(xdata), dtype=float)
+    # masked values become nan, which matplotlib leaves as gaps in the lines
+    y = np.ma.filled(np.ma.asarray(ydata, dtype=float), np.nan)
+
+    segments = np.empty((y.shape[-1], x.shape[0], 2))
+    segments[..., 0] = x
+    segments[..., 1] = y.T
+
+    collection = LineCollection(segments, colors=colors, **kwargs)
+    ax.add_collection(collection)
+    ax.autoscale_view()
+    return collection
+
+
+def sample_edges(centers):
+    """
+    Make the n+1 cell edges around n sample locations, halfway between neighboring samples and
+    extended by half a step at either end, for use with pcolormesh.
+
+    :param centers: 1D float array of sample locations, assumed sorted
+    :return: 1D float array of length len(centers) + 1
+    """
+    centers = np.asarray(centers, dtype=float)
+    if centers.shape[0] == 1:
+        return np.array([centers[0] - 0.5, centers[0] + 0.5])
+    mid = (centers[1:] + centers[:-1]) / 2.
+    return np.concatenate([[2 * centers[0] - mid[0]], mid, [2 * centers[-1] - mid[-1]]])
+
+
+def bin_to_resolution(edges, zdata, max_bins, axis):
+    """
+    Average zdata down to at most max_bins cells along axis. Cells are groups of neighboring
+    samples, so the result is what would end up on screen anyway if each pixel showed the
+    mean of the samples falling in it. Nan (ie. masked) values are left out of the means.
+
+    :param edges: 1D array of the len(zdata along axis) + 1 cell edges
+    :param zdata: 2D float array, nan where missing
+    :param max_bins: maximum number of cells to keep along axis
+    :param axis: 0 or 1, which axis of zdata to bin along
+    :return: (edges, zdata) binned
+    """
+    n = zdata.shape[axis]
+    if n <= max_bins:
+        return edges, zdata
+    starts = np.unique(np.linspace(0, n, max_bins + 1).astype(int))[:-1]
+    valid = ~np.isnan(zdata)
+    sums = np.add.reduceat(np.where(valid, zdata, 0.), starts, axis=axis)
+    counts = np.add.reduceat(valid.astype(int), starts, axis=axis)
+    with np.errstate(invalid="ignore", divide="ignore"):
+        means = sums / counts  # empty cells, 0/0, become nan
+    return np.append(edges[starts], edges[-1]), means
+
+
+def plot_heatmap(ax, xdata, ydata, label=None):
+    """
+    Draw 2D ydata of shape (x, channel), eg. particle flux vs energy channel, as an image
+    with pcolormesh instead of one line per channel.
+
+    Before drawing, the data is averaged down to the pixel resolution of ax so that large
+    arrays don't create millions of quads that would never be distinguishable anyway.
+
+    :param ax: Matplotlib AxesSubplot object to plot on
+    :param xdata: 1D array of x values, may be datetimes, assumed sorted
+    :param ydata: 2D array of values, shape (len(xdata), number of channels)
+    :param label: optional label for the colorbar
+    :return: the QuadMesh added to ax
+    """
+    ax.xaxis.update_units(xdata)
+    x = np.asarray(ax.convert_xunits(xdata), dtype=float)
+    z = np.ma.filled(np.ma.asarray(ydata, dtype=float), np.nan)
+
+    # size in pixels is known from the figure size and subplot position before the first draw
+    extent = ax.get_window_extent()
+    x_edges, z = bin_to_resolution(sample_edges(x), z, max(int(extent.width), 1), axis=0)
+    y_edges, z = bin_to_resolution(sample_edges(np.arange(z.shape[1])), z, max(int(extent.height), 1), axis=1)
+
+    mesh = ax.pcolormesh(x_edges, y_edges, np.ma.masked_invalid(z.T), shading="flat", rasterized=True)
+    ax.figure.colorbar(mesh, ax=ax, label=label)
+    return mesh
+
+
+class DensityImage(AxesImage):
+    """
+    Image of the number of points of a scatter line falling in each pixel, drawn instead of a marker
+    per point, which is unreadable and takes minutes to draw for millions of points.
+
+    The points are binned (see count_pixels) at the pixel resolution of the axes, over the view
+    limits only. Whenever the view changed since (zoom, pan, resized window), they are binned again
+    the next time the image is drawn, so zooming in shows the detail there is instead of big pixels.
+    """
+
+    def __init__(self, ax, x, y, **kwargs):
+        super(DensityImage, self).__init__(ax, origin="lower", interpolation="nearest", **kwargs)
+        self.binned = None  # (x limits, y limits, bins) the counts shown were binned for
+        self.set_points(x, y)
+
+    def set_points(self, x, y):
+        """ Set the points to bin, 1D float arrays without missing values. """
+        self.x = x
+        self.y = y
+        xmin, xmax = nonsingular(np.min(x), np.max(x)) if np.size(x) else (0., 1.)
+        ymin, ymax = nonsingular(np.min(y), np.max(y)) if np.size(y) else (0., 1.)
+        self.bounds = [xmin, xmax, ymin, ymax]
+        self.binned = None
+
+    def bin(self):
+        """ Bin the points in view into the pixels of the axes, unless they already are. """
+        xlim = sorted(self.axes.get_xlim())
+        ylim = sorted(self.axes.get_ylim())
+        extent = self.axes.get_window_extent()
+        bins = [max(int(extent.width), 1), max(int(extent.height), 1)]
+        if self.binned == (xlim, ylim, bins):
+            return
+        counts = count_pixels(self.x, self.y, bins, xlim, ylim)
+        self.set_data(np.ma.masked_equal(counts.T, 0))  # empty pixels are left transparent
+        # not set_extent, that would also make the view limits the data limits, which are the bounds.
+        self._extent = xlim + ylim
+        self.binned = (xlim, ylim, bins)
+
+    def unbin(self):
+        """ Go back to spanning the bounds of all the points, eg. so that relim sees all of them. """
+        self._extent = list(self.bounds)
+        self.binned = None
+
+    def draw(self, renderer, *args, **kwargs):
+        self.bin()
+        super(DensityImage, self).draw(renderer, *args, **kwargs)
+
+
+def plot_density(ax, xdata, ydata, label=None):
+    """
+    Draw a scatter line with lots of points as a DensityImage, with a colorbar of the counts.
+
+    :param ax: Matplotlib AxesSubplot object to plot on
+    :param xdata: 1D array of x values
+    :param ydata: 1D or 2D array of y values, first dimension along x
+    :param label: optional label for the colorbar
+    :return: the DensityImage added to ax
+    """
+    x, y = density_points(xdata, ydata)
+    image = DensityImage(ax, x, y, norm=LogNorm(), cmap="viridis")
+    ax.add_image(image)
+    image.set_extent(image.bounds)  # the data limits, and the view limits if autoscaling
+    ax.autoscale_view()  # before binning, rather than binning again with the margins on the first draw
+    image.bin()
+    image.autoscale_None()  # color limits from the counts first binned, kept the same through zooms
+    ax.figure.colorbar(image, ax=ax, label=label)
+    return image
+
+
+def count_pixels(x, y, bins, xlim, ylim):
+    """
+    Like np.histogram2d over a range, with equal bins, but several times quicker for millions of points:
+    the bin of each point is computed directly and the bins counted with np.bincount.
+
+    :param x: 1D float array of x values
+    :param y: 1D float array of y values
+    :param bins: [number of bins along x, number along y]
+    :param xlim: [min, max] of the bins along x, points outside are left out
+    :param ylim: [min, max] of the bins along y, points outside are left out
+    :return: 2D int array of counts, shape bins
+    """
+    nx, ny = bins
+    inside = (x >= xlim[0]) & (x <= xlim[1]) & (y >= ylim[0]) & (y <= ylim[1])
+    # the max goes in the last bin, as with np.histogram2d
+    ix = np.minimum(((x[inside] - xlim[0]) * (nx / (xlim[1] - xlim[0]))).astype(np.intp), nx - 1)
+    iy = np.minimum(((y[inside] - ylim[0]) * (ny / (ylim[1] - ylim[0]))).astype(np.intp), ny - 1)
+    return np.bincount(ix * ny + iy, minlength=nx * ny).reshape(nx, ny)
+
+
+def density_points(xdata, ydata):
+    """ Flatten scatter data into the 1D float arrays of the points to bin, leaving out any point where
+    either x or y is missing. 2D ydata is one point per value, against the x of its row. """
+    y = np.ma.filled(np.ma.asarray(ydata, dtype=float), np.nan)
+    x = np.ma.filled(np.ma.asarray(xdata, dtype=float), np.nan)
+    x = np.broadcast_to(x.reshape((-1,) + (1,) * (y.ndim - 1)), y.shape)
+    valid = ~(np.isnan(x) | np.isnan(y))
+    return x[valid], y[valid]
+
+
+def can_share_panel(panel_type, xaxis_type):
+    """ Place restrictions on the types of lines that can be plotted together,
+    eg, date can't be mixed with anything else.
+
+    :param panel_type: xaxis type of the panel, ie. of the first line plotted on it
+    :param xaxis_type: xaxis type of a line
+    :return: True if the line can be drawn on the panel
+    """
+    # we can't plot non datetime things on a datetime axis, and we also
+    # can't plot datetime things on a non datetime axis.
+    return (panel_type == "datetime") == (xaxis_type == "datetime")
+
+
+def axes_labels(lines, panel_type):
+    """ Create axes labels "var [units]" for the lines that can be drawn on a panel of panel_type.
+
+    :param lines: list of line config dicts, not modified
+    :param panel_type: xaxis type of the panel
+    :return: tuple of strings, (x label, y label)
+    """
+    x_label = {}  # keys will be units, value will be list of var names
+    y_label = {}  # keys will be units, value will be list of var names
+    for line in lines:
+        xaxis = line["xaxis"]
+        yaxis = line["yaxis"]
+        if not can_share_panel(panel_type, xaxis["type"]):
+            continue
+        if "units" in yaxis.keys() and "variable" in yaxis.keys():
+            units = yaxis["units"]
+            y_label[units] = y_label.get(units, []) + [yaxis["variable"]]
+        # smc@20181218: fix unnecessary label and units on datetime axis.
+        # if it's a datetime x-axis, don't display time [seconds since ...]
+        if "units" in xaxis.keys() and "variable" in xaxis.keys() and panel_type != "datetime":
+            units = xaxis["units"]
+            x_label[units] = x_label.get(units, []) + [xaxis["variable"]]
+    return (", ".join(["%s [%s]" % (" ".join(i[1]), i[0]) for i in x_label.items()]),
+            ", ".join(["%s [%s]" % (" ".join(i[1]), i[0]) for i in y_label.items()]))
+
+
+def drop_missing_x(xdata, ydata):
+    """ Remove the points where x is masked (or NaT, for compact datetimes) from both xdata and ydata.
+    :param xdata: 1D array of x values, or range for index axes
+    :param ydata: 1D or 2D array of y values, first dimension along x
+    :return: tuple of xdata, ydata
+    """
+    if isinstance(xdata, range):
+        return xdata, ydata  # nothing missing from an index, and no need to make it an array to check
+    missing = np.ma.getmaskarray(xdata)
+    if np.asarray(xdata).dtype.kind == "M":
+        missing = missing | np.isnat(np.ma.getdata(xdata))  # compact lines mark missing times with NaT
+    if np.any(missing):
+        # Motivation: Need to handle special case of masked dates on the x-axis.... masked items in
+        # a date array are either out of the range to plot, OR they are None because the underlying
+        # date from the file was a fill value.
+        # However, matplotlib cannot deal with None in the datetime array. So... we're going to need
+        # to remove the masked items from the x-axis data (xdata), however, the y-axis may have it's
+        # own independent mask, with other items masked... So remove from both x-axis and y-axis
+        # anywhere where x is masked.
+        ydata = np.compress(~missing, ydata, axis=0)
+        xdata = np.compress(~missing, np.ma.getdata(xdata))
+        assert np.shape(xdata)[0] == np.shape(ydata)[0]
+    return xdata, ydata
+
+
+def append_to_artists(ax, artists, xdata, ydata):
+    """
+    Extend the artists drawn by plot_lines for one line with more points, eg. records appended to
+    a file being followed, without plotting the line again.
+
+    :param ax: Axes the artists are on
+    :param artists: list of artists plot_lines drew for the line
+    :param xdata: 1D array of the new x values
+    :param ydata: 1D or 2D array of the new y values
+    :return: True if appended, False if the artists can't be appended to (eg. a heatmap)
+    """
+    if any(not isinstance(artist, (Line2D, LineCollection, DensityImage)) for artist in artists):
+        return False
+    for image in (artist for artist in artists if isinstance(artist, DensityImage)):
+        x, y = density_points(xdata, ydata)
+        image.set_points(np.concatenate([image.x, x]), np.concatenate([image.y, y]))
+    xdata, ydata = drop_missing_x(xdata, ydata)
+    columns = [ydata] if np.ndim(ydata) == 1 else [ydata[Ellipsis, i] for i in range(np.shape(ydata)[-1])]
+    lines = [artist for artist in artists if isinstance(artist, Line2D)]
+    for line, y in zip(lines, columns):
+        line.set_data(np.concatenate([np.asarray(line.get_xdata(orig=True)), np.asarray(xdata)]),
+                      np.ma.concatenate([line.get_ydata(orig=True), y]))
+    for collection in (artist for artist in artists if isinstance(artist, LineCollection)):
+        x = np.asarray(ax.convert_xunits(xdata), dtype=float)
+        collection.set_segments([
+            np.concatenate([segment, np.column_stack([x, np.ma.filled(np.ma.asarray(y, dtype=float), np.nan)])])
+            for segment, y in zip(collection.get_segments(), columns)
+        ])
+    return True
+
+
+def remake_legend(ax):
+    """
+    Make the legend of ax again the way plot_lines made it, eg. once lines are restyled or added.
+
+    :param ax: Matplotlib Axes
+    :return: the new Legend, or None if ax has no legend
+    """
+    legend = ax.get_legend()
+    if legend is None:
+        return None
+    legend.remove()
+    config = legend_configs.get(ax, {})
+    return ax.legend(**config) if type(config) is dict else ax.legend(*config)
+
+
+@timed("plot_lines")
+def plot_lines(ax, lines, panel_type=None):
     """  This is a pretty abusive function. We are taking full advantage of the matplotlib api
     and doing some hacky stuff to get lables working. We expect lines to be an array of dict
     objects representing lines to draw on the ax object. See the keys it looks for below to
     see what is needed.
     :param ax: Matplotlib AxesSubplot object to plot on
     :param lines:
-    :return:
+    :param panel_type: xaxis type of the panel, if lines are being added to one already drawn.
+        By default, the panel takes the type of the first line.
+    :return: list, for each line in lines, of the list of artists drawn for it (empty if skipped)
     """
     assert(isinstance(ax, Axes))
     once_per_axes = {}
-    panel_type = None
-    x_label = {}  # keys will be units, value will be list of var names
-    y_label = {}  # keys will be units, value will be list of var names
+    if panel_type is None and lines:
+        panel_type = lines[0]["xaxis"]["type"]
+    x_label, y_label = axes_labels(lines, panel_type)
+    drawn = []  # artists drawn for each line
     for line in lines:
+        artists = []
+        drawn.append(artists)
         assert isinstance(line, dict), "line config should be a dict"
         xaxis = line.pop("xaxis")
         yaxis = line.pop("yaxis")
-        # Place restrictions on the types of lines that can be plotted together,
-        # eg, date can't be mixed with anything else
-        if panel_type is None:
-            panel_type = xaxis["type"]
-        elif ((panel_type == "datetime" and xaxis["type"] != "datetime")
-              or (panel_type != "datetime" and xaxis["type"] == "datetime")):
-            # we can't plot non datetime things on a datetime axis, and we also
-            # can't plot datetime things on a non datetime axis. Just skip the line
-            # if that happens. Bad user!
+        if not can_share_panel(panel_type, xaxis["type"]):
+            # Just skip the line if that happens. Bad user!
             continue
 
         # remove the once per axes things
@@ -84,16 +595,6 @@ def plot_lines(ax, lines):
             if key in line.keys():
                 once_per_axes.update({key: line.pop(key)})
 
-        # create axes labels "var [units]", 
-        if "units" in yaxis.keys() and "variable" in yaxis.keys():
-            units = yaxis["units"]
-            y_label[units] = y_label.get(units, []) + [yaxis["variable"]]
-        # smc@20181218: fix unnecessary label and units on datetime axis.
-        # if it's a datetime x-axis, don't display time [seconds since ...]
-        if "units" in xaxis.keys() and "variable" in xaxis.keys() and panel_type != "datetime":
-            units = xaxis["units"]
-            x_label[units] = x_label.get(units, []) + [xaxis["variable"]]
-
         # then do the each axes calls
         [getattr(ax, key)(*val) for key, val in line.items() if hasattr(ax, key)]
         filter_keys = ["color", "linestyle", "marker", "xdata", "ydata", "label"]  # TODO some of these have moved out
@@ -105,39 +606,86 @@ def plot_lines(ax, lines):
             xdata = xaxis.pop("data", [])
             ydata = yaxis.pop("data", [])
 
-            if np.ma.count_masked(xdata):
-                # Motivation: Need to handle special case of masked dates on the x-axis.... masked items in
-                # a date array are either out of the range to plot, OR they are None because the underlying
-                # date from the file was a fill value.
-                # However, matplotlib cannot deal with None in the datetime array. So... we're going to need
-                # to remove the masked items from the x-axis data (xdata), however, the y-axis may have it's
-                # own independent mask, with other items masked... So remove from both x-axis and y-axis
-                # anywhere where x is masked.
-                ydata = np.compress(~np.ma.getmaskarray(xdata), ydata, axis=0)
-                xdata = np.ma.compressed(xdata)
-                assert np.shape(xdata)[0] == np.shape(ydata)[0]
+            xdata, ydata = drop_missing_x(xdata, ydata)
 
             nlines_per_line = 1 if len(np.shape(ydata)) == 1 else np.shape(ydata)[-1]
-            if nlines_per_line > 1:
+            if (line.get("render-mode") == "heatmap" and nlines_per_line > 1
+                    and panel_type in ["index", "datetime"]):
+                # 2D data vs a monotonic axis, draw as an image with one row per column of ydata.
+                artists.append(plot_heatmap(ax, xdata, ydata, label="%s [%s]" % (
+                    yaxis.get("variable", ""), yaxis.get("units", ""))))
+            elif panel_type == "scatter" and (line.get("render-mode") == "density"
+                                              or np.size(ydata) > DENSITY_THRESHOLD):
+                # too many points to draw (or make out) one by one, draw how many fall in each pixel.
+                artists.append(plot_density(ax, xdata, ydata, label="count"))
+            elif nlines_per_line > LINE_COLLECTION_THRESHOLD and not line_filtered.get("marker"):
+                # lots of columns, draw them all at once. LineCollection can't draw markers, so
+                # marker styles always go through the per column ax.plot below.
+                new_colors = expand_colors(line_filtered.pop("color"), nlines_per_line)
+                line_filtered.pop("marker", None)
+                artists.append(plot_line_collection(ax, xdata, ydata, new_colors, **line_filtered))
+            elif nlines_per_line > 1:
                 
                 # for 2D data, we have one color specified, but for each line, increment the color.
                 new_colors = expand_colors(line_filtered["color"], nlines_per_line)
                 for i, c in enumerate(new_colors):
                     line_filtered["color"] = c
-                    ax.plot(xdata, ydata[Ellipsis, i], **line_filtered)
+                    artists.extend(ax.plot(xdata, ydata[Ellipsis, i], **line_filtered))
             else:
-                ax.plot(xdata, ydata, **line_filtered)  # see http://stackoverflow.com/q/8979258
-
-        elif line["type"] == "spectrogram":
-            # specific to the spectrogram plot, we need to plot with the pcolormesh method
-            pass
+                artists.extend(ax.plot(xdata, ydata, **line_filtered))  # see http://stackoverflow.com/q/8979258
 
     # make the once per axes calls
     [getattr(ax, key)(**val) if type(val) is dict else getattr(ax, key)(*val)
      for key, val in once_per_axes.items() if hasattr(ax, key)]
+    if "legend" in once_per_axes:
+        legend_configs[ax] = once_per_axes["legend"]
 
     # and finally make the labels
-    ax.set_ylabel(", ".join(["%s [%s]"%(" ".join(i[1]), i[0]) for i in y_label.items()]), fontsize=15)
-    ax.set_xlabel(", ".join(["%s [%s]"%(" ".join(i[1]), i[0]) for i in x_label.items()]), fontsize=15)
+    ax.set_ylabel(y_label, fontsize=15)
+    ax.set_xlabel(x_label, fontsize=15)
 
+    return drawn
 
+
+def draw_panels(figure, specs, panel_lines):
+    """
+    Add a subplot to figure for each panel in specs that has lines and plot them. Needs no widgets,
+    so that figures can be drawn the same way in the plot window and in batch mode (see pyntpg.batch).
+
+    :param figure: matplotlib Figure to draw in
+    :param specs: gridspec ratios, see LayoutPicker.create_gridspec
+    :param panel_lines: list, for each panel in order, of the line configs to plot, with data resolved
+    :return: dict {npanel: (ax, panel_type, [artists drawn for each line])} of the panels drawn,
+        and dict {npanel: exception} of the panels that couldn't be
+    """
+    drawn = {}
+    errors = {}
+    vpanels = len(specs["height_ratios"])
+    outter_grid = gridspec.GridSpec(
+        vpanels, 1,
+        height_ratios=specs["height_ratios"],
+        width_ratios=[1]
+    )
+    npanel = 0  # Count through the panels so we know which on we are on
+    for i in range(vpanels):
+        hpanels = len(specs["width_ratios"][i])
+        inner_grid = gridspec.GridSpecFromSubplotSpec(
+            1, hpanels, subplot_spec=outter_grid[i],
+            height_ratios=[1],
+            width_ratios=specs["width_ratios"][i]
+        )
+        for j in range(hpanels):
+            lines = panel_lines[npanel] if npanel < len(panel_lines) else []
+            if lines:
+                ax = figure.add_subplot(inner_grid[j])
+                try:
+                    for line in lines:
+                        check_resolved(line)
+                    panel_type = lines[0]["xaxis"]["type"]
+                    drawn[npanel] = (ax, panel_type, plot_lines(ax, lines))
+                except Exception as e:
+                    figure.delaxes(ax)
+                    errors[npanel] = e
+            npanel += 1
+    figure.autofmt_xdate()
+    return drawn, errors
@@ -0,0 +1,92 @@
+"""
+The configuration of a plot tab as a plain dict, so that it can be saved to and loaded from JSON:
+
+    {
+        "datasets": {"dataset": ["file1.nc", "file2.nc"], ...},
+        "variables": {"dataset": ["flux", ...], ...},
+        "layout": {"height_ratios": [...], "width_ratios": [[...], ...]},
+        "lines": [line config, ...]
+    }
+
+"variables" are the variables declared for datasets whose files are aggregated, optional, see
+used_variables. "layout" is as from LayoutPicker.create_gridspec and "lines" as from ListConfigured, with their
+axes only referencing the data to plot (see pyntpg.dataset_var_picker.axis_data). Saved configs
+are validated against plot_config_schema.config_schema when loaded.
+"""
+import json
+from datetime import datetime
+
+from pyntpg.plot_tabs.plot_config_schema import config_schema, validate_config
+
+# keys of axis configs holding datetimes, which JSON doesn't have, so they're stored as iso strings.
+DATETIME_KEYS = ("start", "end")
+
+# keys of axis configs only meaningful in memory, not saved.
+TRANSIENT_KEYS = ("data", "error")
+
+
+def encode_default(value):
+    """ json.dump default, for the values in configs that aren't JSON types. """
+    if isinstance(value, datetime):
+        return value.isoformat()
+    raise TypeError("Can't save {!r} in a tab config".format(value))
+
+
+def dump_tab_config(config, fp):
+    """
+    Write a tab config to fp as JSON.
+
+    :param config: tab config dict, see module docstring
+    :param fp: file like object open for writing
+    :return: None
+    """
+    config = dict(config)
+    config["lines"] = [
+        dict(line, **{key: {k: v for k, v in line[key].items() if k not in TRANSIENT_KEYS}
+                      for key in ("xaxis", "yaxis") if key in line})
+        for line in config.get("lines", [])
+    ]
+    json.dump(config, fp, indent=2, default=encode_default)
+
+
+def load_tab_config(fp):
+    """
+    Read a tab config written by dump_tab_config from fp.
+
+    :param fp: file like object open for reading
+    :return: tab config dict, see module docstring
+    :raises ValueError: if fp isn't JSON or the config isn't valid
+    """
+    config = json.load(fp)
+    for line in config.get("lines", []):
+        for axis in (line.get("xaxis", {}), line.get("yaxis", {})):
+            for key in DATETIME_KEYS:
+                if isinstance(axis.get(key), str):
+                    axis[key] = datetime.fromisoformat(axis[key])
+    return validate_config(config_schema, config)
+
+
+def used_variables(config):
+    """
+    Get the variables of each dataset needed to draw a tab config: those declared in its
+    "variables", and those its lines plot, so that datasets made of many files can be aggregated
+    with only these (see pyntpg.dataset_tabs.aggregation_config.subset_config).
+
+    :param config: tab config dict
+    :return: dict of dataset name to sorted list of variable names
+    """
+    variables = {name: set(names) for name, names in config.get("variables", {}).items()}
+    for line in config.get("lines", []):
+        for axis in (line.get("xaxis", {}), line.get("yaxis", {})):
+            if axis.get("dataset") and axis.get("variable"):
+                variables.setdefault(axis["dataset"], set()).add(axis["variable"])
+    return {name: sorted(names) for name, names in variables.items()}
+
+
+def get_panel(config, npanel):
+    """ Get the line configs of a tab config on panel number npanel, like ListConfigured.get_panel.
+    :param config: tab config dict
+    :param npanel: integer panel number
+    :return: list of line configs on the panel
+    """
+    return [line for line in config.get("lines", []) if line["panel-dest"] == npanel]
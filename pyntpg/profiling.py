@@ -0,0 +1,127 @@
+"""
+Opt-in timing of the hot paths, eg. opening datasets, reading data, converting times, plotting
+and drawing. Disabled by default, in which case a span costs one check of a flag. Enable by setting
+the environment variable PYNTPG_PROFILE (to anything but "" or "0") or from the Help menu.
+
+Recorded spans are shown live in the ProfilingWindow and can be dumped in the Chrome trace event
+format, to be viewed in eg. chrome://tracing or https://ui.perfetto.dev.
+
+Usage:
+
+    with span("get_data", dataset=dataset, variable=variable) as args:
+        data = ...
+        args["bytes"] = data.nbytes  # details only known at the end can be added to args
+"""
+import functools
+import json
+import os
+import threading
+import time
+from contextlib import contextmanager
+
+ENV_VAR = "PYNTPG_PROFILE"
+
+enabled = os.environ.get(ENV_VAR, "") not in ("", "0")
+
+# the spans recorded, each a dict with name, start and duration in seconds, thread id and name, and args.
+spans = []
+spans_lock = threading.Lock()  # spans are recorded from worker threads too
+
+epoch = time.perf_counter()
+
+
+def set_enabled(enable):
+    global enabled
+    enabled = bool(enable)
+
+
+@contextmanager
+def span(name, **args):
+    """
+    Time the body of the with statement as a span called name, if profiling is enabled.
+
+    :param name: name of the span, spans with the same name are aggregated in the ProfilingWindow
+    :param args: details to record with the span, eg. sizes
+    :return: context manager yielding the args dict, so more can be added to it
+    """
+    if not enabled:
+        yield args
+        return
+    start = time.perf_counter()
+    try:
+        yield args
+    finally:
+        duration = time.perf_counter() - start
+        with spans_lock:
+            spans.append({
+                "name": name,
+                "start": start - epoch,
+                "duration": duration,
+                "thread": threading.get_ident(),
+                "thread_name": threading.current_thread().name,
+                "args": args
+            })
+
+
+def timed(name):
+    """ Decorator to time every call of a function as a span called name. """
+    def decorator(fn):
+        @functools.wraps(fn)
+        def wrapper(*args, **kwargs):
+            with span(name):
+                return fn(*args, **kwargs)
+        return wrapper
+    return decorator
+
+
+def get_spans(since=0):
+    """ Get a copy of the spans recorded, optionally only those after the first since. """
+    with spans_lock:
+        return spans[since:]
+
+
+def clear():
+    with spans_lock:
+        del spans[:]
+
+
+def summarize(recorded):
+    """
+    Aggregate spans by name.
+
+    :param recorded: list of spans, eg. from get_spans
+    :return: dict of name -> dict of count, total, max (in seconds) and bytes (summed "bytes" args)
+    """
+    summary = {}
+    for recorded_span in recorded:
+        entry = summary.setdefault(recorded_span["name"], {"count": 0, "total": 0., "max": 0., "bytes": 0})
+        entry["count"] += 1
+        entry["total"] += recorded_span["duration"]
+        entry["max"] = max(entry["max"], recorded_span["duration"])
+        entry["bytes"] += recorded_span["args"].get("bytes", 0)
+    return summary
+
+
+def dump_trace(fp):
+    """
+    Write the spans recorded as Chrome trace event JSON to fp.
+
+    :param fp: file like object open for writing
+    :return: None
+    """
+    pid = os.getpid()
+    events = [{
+        "name": recorded_span["name"],
+        "cat": "pyntpg",
+        "ph": "X",  # complete event, ie. with a duration
+        "ts": recorded_span["start"] * 1e6,  # microseconds
+        "dur": recorded_span["duration"] * 1e6,
+        "pid": pid,
+        "tid": recorded_span["thread"],
+        "args": recorded_span["args"]
+    } for recorded_span in get_spans()]
+    # and metadata events naming the threads
+    events.extend({
+        "name": "thread_name", "ph": "M", "pid": pid, "tid": tid, "args": {"name": name}
+    } for tid, name in set((s["thread"], s["thread_name"]) for s in get_spans()))
+    json.dump({"traceEvents": events, "displayTimeUnit": "ms"}, fp, default=str)
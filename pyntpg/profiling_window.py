@@ -0,0 +1,85 @@
+from PyQt5.QtCore import Qt, QTimer
+from PyQt5.QtGui import QKeySequence
+from PyQt5.QtWidgets import QWidget, QVBoxLayout, QHBoxLayout, QTableWidget, QTableWidgetItem, QPushButton
+from PyQt5.QtWidgets import QFileDialog, QLabel, QShortcut, QHeaderView
+
+from pyntpg import profiling
+
+REFRESH_INTERVAL = 500  # milliseconds between refreshes of the table
+COLUMNS = ["span", "count", "total ms", "mean ms", "max ms", "MB"]
+
+
+class ProfilingWindow(QWidget):
+    """ Live table of the spans recorded by pyntpg.profiling, aggregated by name, with
+    buttons to clear them or save them as a Chrome trace.
+    """
+
+    def __init__(self):
+        super(ProfilingWindow, self).__init__()
+        self.setWindowTitle("pyntpg profiling")
+        self.layout = QVBoxLayout()
+        self.setLayout(self.layout)
+
+        self.status = QLabel()
+        self.layout.addWidget(self.status)
+
+        self.table = QTableWidget(0, len(COLUMNS))
+        self.table.setHorizontalHeaderLabels(COLUMNS)
+        self.table.horizontalHeader().setSectionResizeMode(0, QHeaderView.Stretch)
+        self.table.setEditTriggers(QTableWidget.NoEditTriggers)
+        self.table.sortItems(COLUMNS.index("total ms"), Qt.DescendingOrder)
+        self.layout.addWidget(self.table)
+
+        buttons = QWidget()
+        buttons_layout = QHBoxLayout()
+        buttons.setLayout(buttons_layout)
+        clear_button = QPushButton("Clear")
+        clear_button.clicked.connect(self.clear)
+        buttons_layout.addWidget(clear_button)
+        save_button = QPushButton("Save trace")
+        save_button.clicked.connect(self.save_trace)
+        buttons_layout.addWidget(save_button)
+        self.layout.addWidget(buttons)
+
+        QShortcut(QKeySequence("Ctrl+W"), self, self.close)
+
+        self.timer = QTimer(self)
+        self.timer.timeout.connect(self.refresh)
+        self.timer.start(REFRESH_INTERVAL)
+        self.refresh()
+
+    def refresh(self):
+        recorded = profiling.get_spans()
+        summary = profiling.summarize(recorded)
+        self.status.setText("Profiling {}, {} spans recorded".format(
+            "enabled" if profiling.enabled else "disabled", len(recorded)))
+
+        self.table.setSortingEnabled(False)
+        self.table.setRowCount(len(summary))
+        for row, (name, entry) in enumerate(summary.items()):
+            values = [name, entry["count"], entry["total"] * 1e3, entry["total"] * 1e3 / entry["count"],
+                      entry["max"] * 1e3, entry["bytes"] / 1e6]
+            for column, value in enumerate(values):
+                item = QTableWidgetItem()
+                # set numbers as numbers so that sorting by column works
+                item.setData(Qt.DisplayRole, round(value, 2) if isinstance(value, float) else value)
+                self.table.setItem(row, column, item)
+        self.table.setSortingEnabled(True)
+
+    def clear(self):
+        profiling.clear()
+        self.refresh()
+
+    def save_trace(self):
+        path = QFileDialog.getSaveFileName(self, "Save trace", "pyntpg_trace.json", "Chrome trace (*.json)")[0]
+        if path:
+            with open(path, "w") as f:
+                profiling.dump_trace(f)
+
+    def closeEvent(self, event):
+        self.timer.stop()
+        super(ProfilingWindow, self).closeEvent(event)
+
+    def showEvent(self, event):
+        self.timer.start(REFRESH_INTERVAL)
+        super(ProfilingWindow, self).showEvent(event)
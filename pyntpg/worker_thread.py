@@ -10,7 +10,9 @@ class WorkerThread(QThread):
     def __init__(self, fn, **kwargs):
         super(WorkerThread, self).__init__(**kwargs)
         self.fn = fn
+        self.result = None  # also kept here, for when waiting on the thread instead of the signal
 
     def run(self):
-        self.finished.emit(self.fn())
+        self.result = self.fn()
+        self.finished.emit(self.result)
 
@@ -6,22 +6,27 @@ setup(
     author="Stefan Codrescu",
     author_email="stefan.codrescu@noaa.gov",
     packages=find_packages(),
+    # module __getattr__ (pyntpg.analysis) and datetime.fromisoformat
+    python_requires='>=3.7',
     install_requires=[
         'ncagg',
         'numpy',
         'netCDF4',
         'cftime',
-        'nc-time-axis'
+        'nc-time-axis',
+        'cerberus'
     ],
     entry_points='''
         [console_scripts]
         pyntpg=pyntpg.main:main
+        pyntpg-batch=pyntpg.batch:main
     ''',
     classifiers=[
         "Development Status :: 4 - Beta",
         "Intended Audience :: Science/Research",
-        "Programming Language :: Python :: 2.7",
-        "Programming Language :: Python :: 3.6",
+        "Programming Language :: Python :: 3",
+        "Programming Language :: Python :: 3 :: Only",
+        "Programming Language :: Python :: 3.7",
         "License :: OSI Approved :: MIT License",
         "Operating System :: OS Independent",
     ]
@@ -0,0 +1,32 @@
+import netCDF4 as nc
+import numpy as np
+from ncagg.aggregator import Config, generate_aggregation_list
+
+from pyntpg.dataset_tabs.aggregation_config import estimate_nbytes, subset_config
+
+
+def make_files(directory, nfiles=2, records=10):
+    paths = []
+    for i in range(nfiles):
+        path = str(directory / ("f%d.nc" % i))
+        with nc.Dataset(path, "w") as dataset:
+            dataset.createDimension("time", None)
+            dataset.createDimension("channel", 4)
+            time = dataset.createVariable("time", np.float64, ("time",))
+            time.units = "seconds since 2020-01-01"
+            time[:] = np.arange(i * records, (i + 1) * records)
+            dataset.createVariable("flux", np.float32, ("time", "channel"))[:] = np.ones((records, 4))
+            dataset.createVariable("gain", np.int16, ("channel",))[:] = np.arange(4)
+        paths.append(path)
+    return paths
+
+
+def test_estimate_nbytes(tmp_path):
+    paths = make_files(tmp_path)
+    config = Config.from_nc(paths[0])
+    agg_list = generate_aggregation_list(config, paths)
+    # 20 records of time (8 bytes) and flux (4 channels of 4 bytes), and gain once (4 channels of 2 bytes)
+    assert estimate_nbytes(config, agg_list) == 20 * 8 + 20 * 4 * 4 + 4 * 2
+
+    config = subset_config(config, ["gain"])
+    assert estimate_nbytes(config, generate_aggregation_list(config, paths)) == 4 * 2
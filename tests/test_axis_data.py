@@ -0,0 +1,86 @@
+from datetime import datetime
+
+import numpy as np
+
+from pyntpg.dataset_var_picker.axis_data import (resolve_lines, check_resolved, make_index, flattened_width, get_reshape,
+                                                  make_oslice, as_datetime64)
+
+
+def make_get_data(values):
+    """ get_data reading from arrays, by variable name. """
+    def get_data(dataset, variable, oslice=slice(None)):
+        return values[variable][oslice]
+    return get_data
+
+
+def index_line(length, flatten):
+    return {
+        "xaxis": {"type": "index", "length": length},
+        "yaxis": {"dataset": "dataset", "variable": "flux", "slices": [[0, 100], [0, 4]], "flatten": flatten},
+    }
+
+
+def test_index_flattened_y_decimated():
+    flux = np.arange(400.).reshape(100, 4)
+    for length in (400, None):
+        line = index_line(length, [False, True])
+        resolve_lines([line], make_get_data({"flux": flux}), step=3)
+        check_resolved(line)
+        x, y = np.asarray(line["xaxis"]["data"]), line["yaxis"]["data"]
+        assert len(x) == len(y) == 34 * 4
+        # index of each point as if nothing was skipped, which for this variable is its value
+        np.testing.assert_array_equal(x, y)
+
+
+def test_index_stays_range():
+    flux = np.arange(400.).reshape(100, 4)
+    line = index_line(100, [False, False])
+    resolve_lines([line], make_get_data({"flux": flux}), step=3)
+    assert line["xaxis"]["data"] == range(0, 102, 3)
+    assert len(line["xaxis"]["data"]) == len(line["yaxis"]["data"])
+
+    line = index_line(400, [False, True])
+    resolve_lines([line], make_get_data({"flux": flux}))
+    assert line["xaxis"]["data"] == range(0, 400)
+
+
+def test_make_index():
+    assert make_index(5) == range(0, 5)
+    assert make_index(5, step=2) == range(0, 10, 2)
+    np.testing.assert_array_equal(make_index(2, 3, 4), [0, 1, 2, 12, 13, 14])
+
+
+def test_flattened_width():
+    assert flattened_width({"dataset": "dataset", "variable": "flux"}) == 1
+    assert flattened_width({"slices": [[0, 10], [0, 4], [0, 3]], "flatten": [False, True, True]}) == 12
+    assert flattened_width({"slices": [[0, 10], [0, 4], [0, 3]], "flatten": [False, False, True]}) == 1
+    assert flattened_width({"slices": [[0, 10], [2, 3], [0, 3]], "flatten": [False, False, True]}) == 3
+
+
+def test_get_reshape():
+    assert get_reshape([10, 4, 3], [False, False, False]) == [10, 4, 3]
+    assert get_reshape([10, 4, 3], [False, True, True]) == [120]
+    assert get_reshape([10, 4, 3], [False, False, True]) == [10, 12]
+    assert get_reshape([10, 1, 3], [False, False, False]) == [10, 3]  # length 1 dimensions are always flattened
+    assert get_reshape([10, 4], [True, False]) == [10, 4]  # nothing before the first to flatten it into
+
+
+def test_make_oslice():
+    assert make_oslice(None) == (slice(None),)
+    assert make_oslice(None, 5) == (slice(None, None, 5),)
+    assert make_oslice([[0, 10], [2, 4]]) == (slice(0, 10), slice(2, 4))
+    assert make_oslice([[0, 10], [2, None]], 3) == (slice(0, 10, 3), slice(2, None))
+
+
+def test_as_datetime64():
+    data = np.ma.masked_array([0., 1.5, 60.], mask=[False, True, False])
+    times = as_datetime64(data, "minutes since 2020-01-01")
+    assert times.dtype == np.dtype("datetime64[ns]")
+    np.testing.assert_array_equal(times, np.array(["2020-01-01T00:00", "NaT", "2020-01-01T01:00"], "datetime64[ns]"))
+
+    times = as_datetime64(np.array([datetime(2020, 1, 1, 12)], dtype=object), None)
+    np.testing.assert_array_equal(times, np.array(["2020-01-01T12:00"], "datetime64[ns]"))
+
+    assert as_datetime64(np.array([0, 1]), "furlongs since 2020-01-01") is None
+    np.testing.assert_array_equal(as_datetime64(np.array([0, 1]), "days since 2020-01-01 00:00:00 +10:00"),
+                                  np.array(["2019-12-31T14:00", "2020-01-01T14:00"], "datetime64[ns]"))
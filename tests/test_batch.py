@@ -0,0 +1,38 @@
+import argparse
+import os
+from collections import OrderedDict
+
+import pytest
+
+from pyntpg import batch
+from pyntpg.batch import parse_size, for_fileset, open_datasets
+from tests.test_aggregation_config import make_files
+
+
+def test_parse_size():
+    assert parse_size("16x9") == (16., 9.)
+    assert parse_size("7.5X4") == (7.5, 4.)
+    for size in ("16", "16x", "axb", "1x2x3"):
+        with pytest.raises(argparse.ArgumentTypeError):
+            parse_size(size)
+
+
+def test_for_fileset():
+    line = {
+        "xaxis": {"type": "index", "length": 50},
+        "yaxis": {"dataset": "a", "variable": "flux", "slices": [[10, 60], [0, 4]], "flatten": [False, True]},
+    }
+    adapted, = for_fileset([line])
+    assert adapted["yaxis"]["slices"] == [[0, None], [0, 4]]  # the whole first dimension
+    assert adapted["xaxis"]["length"] is None
+    assert line["yaxis"]["slices"][0] == [10, 60]  # not modified
+
+
+def test_open_datasets_cleanup(tmp_path, monkeypatch):
+    targets = []
+    make_target = batch.make_target
+    monkeypatch.setattr(batch, "make_target", lambda nbytes: targets.append(make_target(nbytes)) or targets[-1])
+    datasets = OrderedDict([("a", make_files(tmp_path)), ("b", [str(tmp_path / "missing.nc")])])
+    with pytest.raises(Exception):
+        open_datasets(datasets)
+    assert len(targets) == 1 and not os.path.exists(targets[0])
@@ -0,0 +1,18 @@
+from PyQt5.QtCore import QMutex
+
+from pyntpg.dataset_tabs.dataset_tab import AggregationWorker
+
+
+def test_aggregation_error(tmp_path):
+    filenames = []
+    for name in ("a.nc", "b.nc"):
+        path = tmp_path / name
+        path.write_bytes(b"not netCDF")
+        filenames.append(str(path))
+    worker = AggregationWorker(filenames, QMutex())
+    errors, finished = [], []
+    worker.sig_error.connect(lambda filename, message: errors.append(message))
+    worker.sig_finished.connect(finished.append)
+    worker.start_aggregation()
+    assert len(errors) == 1 and errors[0].startswith("Aggregation failed")
+    assert not finished
@@ -0,0 +1,32 @@
+import os
+
+import netCDF4 as nc
+import numpy as np
+
+os.environ.setdefault("QT_QPA_PLATFORM", "offscreen")
+from PyQt5.QtWidgets import QApplication
+
+from pyntpg.datasets_container import DatasetsContainer
+
+
+def make_file(path, records):
+    with nc.Dataset(path, "w") as dataset:
+        dataset.createDimension("time", None)
+        dataset.createVariable("temp", np.float32, ("time",))[:] = np.arange(records)
+    return path
+
+
+def test_open_replaces(tmp_path):
+    app = QApplication.instance() or QApplication([])
+    container = DatasetsContainer()
+    container.open("a", make_file(str(tmp_path / "a.nc"), 10))
+    container.wait(["a"])
+    first = container.datasets["a"]
+    container.open("a", make_file(str(tmp_path / "b.nc"), 20))
+    container.wait(["a"])
+    assert not first.isopen()
+    assert container.datasets["a"].isopen()
+    assert container.metadata["a"]["variables"]["temp"]["shape"] == (20,)
+    app.processEvents()  # the results wait took are still delivered, and ignored
+    assert container.datasets["a"].isopen()
+    container.datasets["a"].close()
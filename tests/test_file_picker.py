@@ -0,0 +1,23 @@
+import os
+
+os.environ.setdefault("QT_QPA_PLATFORM", "offscreen")
+from PyQt5.QtWidgets import QApplication
+
+from pyntpg.dataset_tabs import file_picker
+from pyntpg.dataset_tabs.file_picker import FilePicker
+
+
+def test_add_directory_twice(tmp_path, monkeypatch):
+    app = QApplication.instance() or QApplication([])
+    for name in ("a.nc", "b.nc", "c.txt"):
+        (tmp_path / name).write_bytes(b"")
+    monkeypatch.setattr(file_picker.QFileDialog, "getExistingDirectory", lambda *args: str(tmp_path))
+
+    picker = FilePicker()
+    picker.add_directory.click()
+    assert not picker.add_directory.isEnabled()
+    picker.add_directory.click()  # ignored while the first scan runs
+    while picker.scan is not None:
+        app.processEvents()
+    assert picker.add_directory.isEnabled()
+    assert sorted(os.path.basename(name) for name in picker.get_file_list()) == ["a.nc", "b.nc"]
@@ -0,0 +1,35 @@
+import numpy as np
+import pytest
+
+from pyntpg import memory_ledger
+
+
+@pytest.fixture
+def ledger(monkeypatch):
+    monkeypatch.setattr(memory_ledger, "budget", 1000)
+    monkeypatch.setattr(memory_ledger, "entries", {})
+    monkeypatch.setattr(memory_ledger, "sources", {})
+    return memory_ledger
+
+
+def test_decimation(ledger):
+    assert ledger.decimation(1000) is None
+    assert ledger.decimation(1001) == 2
+    assert ledger.decimation(3500) == 4
+
+
+def test_decimation_used(ledger):
+    ledger.add_source("console", lambda: {"x": 600})
+    assert ledger.decimation(400) is None
+    assert ledger.decimation(401) == 2
+    ledger.add_source("console", lambda: {"x": 2000})
+    # over the budget already, still fit in MIN_AVAILABLE_FRACTION of it
+    assert ledger.decimation(500) == 10
+
+
+def test_decimation_exclude(ledger):
+    line = {"label": "flux", "xaxis": {"type": "index", "data": range(10)},
+            "yaxis": {"dataset": "a", "variable": "flux", "data": np.zeros(100)}}
+    ledger.record("window", "Plot", [line])
+    assert ledger.decimation(800) == 4
+    assert ledger.decimation(800, exclude="window") is None
@@ -0,0 +1,21 @@
+import numpy as np
+
+from pyntpg.plot_tabs.plot_tab import follow_from
+
+
+def get_variable_info(dataset, variable):
+    return {"temp": ((1000,), np.dtype(np.float32))}[variable]
+
+
+def line(slices):
+    return {"xaxis": {"type": "index", "length": None}, "yaxis": {"dataset": "a", "variable": "temp", "slices": slices}}
+
+
+def test_follow_from():
+    assert follow_from(line([[0, 1000]]), get_variable_info) == 1000
+    assert follow_from(line([[200, None]]), get_variable_info) == 1000
+    assert follow_from(line([[0, 500]]), get_variable_info) is None  # stops before the last record
+    assert follow_from(line(None), get_variable_info) is None
+    missing = line([[0, 1000]])
+    missing["yaxis"]["variable"] = "flux"
+    assert follow_from(missing, get_variable_info) is None
@@ -0,0 +1,41 @@
+import matplotlib
+matplotlib.use("Agg")
+import numpy as np
+from matplotlib.figure import Figure
+
+from pyntpg.dataset_var_picker.axis_data import resolve_lines, check_resolved
+from pyntpg.plot_tabs.panel_configurer import PanelConfigurer
+from pyntpg.plot_tabs.plot_widget import plot_lines, remake_legend, restyle_artists
+
+
+def test_preview_flattened_y_index_x():
+    # previews are always decimated, see PanelConfigurer.show_preview
+    flux = np.arange(400.).reshape(100, 4)
+    line = {
+        "xaxis": {"type": "index", "length": 400},
+        "yaxis": {"dataset": "dataset", "variable": "flux", "slices": [[0, 100], [0, 4]], "flatten": [False, True]},
+        "label": "flux",
+    }
+    resolve_lines([line], lambda dataset, variable, oslice: flux[oslice], step=PanelConfigurer.preview_decimation)
+    check_resolved(line)
+    artists = plot_lines(Figure().add_subplot(111), [line])
+    xdata, ydata = artists[0][0].get_xdata(), artists[0][0].get_ydata()
+    assert len(xdata) == len(ydata) == 136
+    np.testing.assert_array_equal(xdata, ydata)
+
+
+def test_remake_legend():
+    ax = Figure().add_subplot(111)
+    line = {
+        "xaxis": {"type": "index", "data": range(3)},
+        "yaxis": {"dataset": "dataset", "variable": "temp", "data": np.arange(3.)},
+        "label": "temp", "color": "#ff0000", "legend": {"loc": "upper left", "fontsize": 7},
+    }
+    artists = plot_lines(ax, [line])[0]
+    restyle_artists(artists, {"color": "#0000aa"})
+    legend = remake_legend(ax)
+    assert legend is ax.get_legend()
+    assert [text.get_fontsize() for text in legend.get_texts()] == [7]  # made the way it was first made
+    assert legend.legend_handles[0].get_color() == "#0000aa"
+
+    assert remake_legend(Figure().add_subplot(111)) is None
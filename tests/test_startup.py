@@ -0,0 +1,23 @@
+import subprocess
+import sys
+
+# seconds importing pyntpg.main may take, with room for slow machines: it's about 0.2s with the
+# console, wizards and matplotlib's Qt backend imported on demand, nearer 2s with them imported up front.
+IMPORT_BUDGET = 1.
+
+# imported when first used rather than at startup
+DEFERRED = ["IPython", "qtconsole", "scipy", "matplotlib"]
+
+SCRIPT = """
+import sys, time
+start = time.perf_counter()
+import pyntpg.main
+print(time.perf_counter() - start)
+print(" ".join(name for name in %r if name in sys.modules))
+""" % (DEFERRED,)
+
+
+def test_import_budget():
+    elapsed, imported = subprocess.check_output([sys.executable, "-c", SCRIPT], universal_newlines=True).split("\n")[:2]
+    assert not imported.split(), "imported at startup: " + imported
+    assert float(elapsed) < IMPORT_BUDGET
@@ -0,0 +1,41 @@
+from datetime import datetime
+
+from ncagg.aggregator import Config, generate_aggregation_list
+
+from pyntpg.dataset_tabs.time_coverage import filename_coverage, to_epoch, trim_records
+from tests.test_aggregation_config import make_files
+
+
+def test_goes_r_filename():
+    coverage = filename_coverage("/data/OR_MAG-L1b-GEOF-M1_G16_s20180850039123_e20180850039599_c20180850040001.nc")
+    assert coverage == to_epoch([datetime(2018, 3, 26, 0, 39, 12, 300000), datetime(2018, 3, 26, 0, 39, 59, 900000)])
+
+
+def test_goes_r_filename_without_tenths():
+    coverage = filename_coverage("OR_SEIS-L1b-EHIS_G16_s2018085003912_e2018085003959_c2018085004000.nc")
+    assert coverage == to_epoch([datetime(2018, 3, 26, 0, 39, 12), datetime(2018, 3, 26, 0, 39, 59)])
+
+
+def test_date_filename():
+    assert filename_coverage("g13_magneto_512ms_20160326_20160326.nc") == to_epoch(
+        [datetime(2016, 3, 26), datetime(2016, 3, 27)])
+
+
+def test_no_times():
+    assert filename_coverage("flux.nc") is None
+    assert filename_coverage("run_12345678.nc") is None  # not a date
+
+
+def test_trim_records(tmp_path):
+    paths = make_files(tmp_path)  # records at 0-9 and 10-19 seconds
+    config = Config.from_nc(paths[0])
+    agg_list = generate_aggregation_list(config, paths)
+    dim = config.dims["time"]
+    agg_list[1].set_dim_slice_stop(dim, 8)  # as ncagg does, eg. records overlapping the next file
+
+    trimmed = trim_records(agg_list, datetime(2020, 1, 1, 0, 0, 5), datetime(2020, 1, 1, 0, 0, 30))
+    assert [node.get_dim_slice(dim) for node in trimmed] == [slice(5, 10), slice(0, 8)]
+
+    agg_list = generate_aggregation_list(config, paths)
+    agg_list[0].set_dim_slice_stop(dim, 3)
+    assert trim_records(agg_list, datetime(2020, 1, 1, 0, 0, 5), None) == agg_list[1:]